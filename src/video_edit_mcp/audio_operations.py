@@ -4,7 +4,7 @@ from moviepy.editor import CompositeAudioClip
 from typing import Dict, Any, List
 import os
 import logging
-from .utils import get_output_path, AudioStore
+from .utils import get_output_path, AudioStore, write_audio
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ def register_audio_tools(mcp):
     def audio_info(audio_path:str) -> Dict[str,Any]:
         try:
             
-            audio = AudioFileClip(audio_path)
+            audio = AudioStore.load(audio_path)
             return{
                 "success": True,
                 "audio_info": {
@@ -48,7 +48,7 @@ def register_audio_tools(mcp):
             
             audio = video.audio
             if return_path:
-                audio.write_audiofile(output_path)
+                write_audio(audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -91,7 +91,7 @@ def register_audio_tools(mcp):
             trimmed_audio = audio.subclip(start_time, end_time)
             
             if return_path:
-                trimmed_audio.write_audiofile(output_path)
+                write_audio(trimmed_audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -122,7 +122,7 @@ def register_audio_tools(mcp):
             concatenated_audio = concatenate_audioclips([audio_1, audio_2])
             
             if return_path:
-                concatenated_audio.write_audiofile(output_path)
+                write_audio(concatenated_audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -160,7 +160,7 @@ def register_audio_tools(mcp):
             looped_audio = audio_loop(audio, duration=duration)
             
             if return_path:
-                looped_audio.write_audiofile(output_path)
+                write_audio(looped_audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -198,7 +198,7 @@ def register_audio_tools(mcp):
             audio_adjusted = audio.volumex(volume_level)
             
             if return_path:
-                audio_adjusted.write_audiofile(output_path)
+                write_audio(audio_adjusted, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -227,7 +227,7 @@ def register_audio_tools(mcp):
             audio = AudioStore.load(audio_path)
             fadein_audio = audio.audio_fadein(fade_duration)
             if return_path:
-                fadein_audio.write_audiofile(output_path)
+                write_audio(fadein_audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -255,7 +255,7 @@ def register_audio_tools(mcp):
             audio = AudioStore.load(audio_path)
             fadeout_audio = audio.audio_fadeout(fade_duration)
             if return_path:
-                fadeout_audio.write_audiofile(output_path)
+                write_audio(fadeout_audio, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -285,7 +285,7 @@ def register_audio_tools(mcp):
             mixed_audio.fps = 44100
             if return_path:
                     try:
-                        mixed_audio.write_audiofile(output_path)
+                        write_audio(mixed_audio, output_path)
                         return {
                         "success": True,
                         "output_path": output_path,
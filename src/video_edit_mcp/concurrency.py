@@ -0,0 +1,200 @@
+import os
+import inspect
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .encoding import resolve_settings, bind_settings
+from .outputs import output_call, check_policy, output_dir, result_checksums
+from .jobs import JobManager, check_cancelled
+from .progress import ProgressChannel, bind_channel
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_render_slots: Optional[threading.BoundedSemaphore] = None
+_init_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.environ.get(name)!r}, using {default}")
+        return default
+
+
+def max_concurrent_renders() -> int:
+    """Encodes allowed at once; each ffmpeg encode already uses several cores"""
+    return _env_int("VIDEO_MCP_MAX_CONCURRENT_RENDERS", max(1, (os.cpu_count() or 2) // 2))
+
+
+def tool_executor() -> ThreadPoolExecutor:
+    """Threads that run tool bodies off the server's event loop.
+
+    Threads rather than processes: tools share the in-memory clip stores and
+    MoviePy clips can't be pickled, while the heavy lifting already happens in
+    ffmpeg subprocesses.
+    """
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            workers = _env_int("VIDEO_MCP_TOOL_WORKERS", max(32, 4 * max_concurrent_renders()))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video_mcp_tool")
+        return _executor
+
+
+@contextmanager
+def render_slot():
+    """Hold one of the VIDEO_MCP_MAX_CONCURRENT_RENDERS encode slots for the duration of the block"""
+    global _render_slots
+    with _init_lock:
+        if _render_slots is None:
+            _render_slots = threading.BoundedSemaphore(max_concurrent_renders())
+    # poll so a cancelled background job stops waiting for a slot
+    while not _render_slots.acquire(timeout=0.5):
+        check_cancelled()
+    try:
+        yield
+    finally:
+        _render_slots.release()
+
+
+def writes_files(*parameters: str):
+    """Mark a tool whose `parameters` name the files or folders it writes, for tools without an output_name"""
+    def mark(fn):
+        fn.output_parameters = parameters
+        return fn
+
+    return mark
+
+
+def _output_parameters(fn) -> tuple:
+    """Parameters naming what fn writes: its writes_files marker, else output_name if it has one"""
+    marked = getattr(fn, "output_parameters", None)
+    if marked is not None:
+        return tuple(marked)
+    return ("output_name",) if "output_name" in inspect.signature(fn).parameters else ()
+
+
+def _renders_file(fn) -> bool:
+    return bool(_output_parameters(fn))
+
+
+def _encodes_video(fn) -> bool:
+    # image, index and .npy writers have no encoder to configure
+    return "output_name" in _output_parameters(fn)
+
+
+# Encode options every file-writing tool accepts on top of its own parameters
+ENCODE_PARAMETERS = (("profile", str), ("preset", str), ("crf", int), ("threads", int), ("tune", str))
+
+
+def _run_tool(fn, policy, checksum, *args, **kwargs):
+    """Run a file-writing tool under its collision policy, adding output checksums when asked"""
+    with output_call(policy):
+        result = fn(*args, **kwargs)
+    if checksum and isinstance(result, dict) and result.get("success"):
+        result["checksums"] = result_checksums(result)
+    return result
+
+
+def _submit_job(fn, runner, kwargs):
+    output_name = kwargs.get("output_name")
+    output_path = os.path.join(output_dir(), output_name) if output_name else None
+    job = JobManager.submit(fn.__name__, runner, kwargs, output_path)
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "output_path": output_path,
+        "message": f"{fn.__name__} queued as job {job.id}; poll get_job_status for the result"
+    }
+
+
+def to_async(fn):
+    """Wrap a blocking tool function so it runs on the tool executor and the event loop stays free.
+
+    Tools that write files (an output_name, or parameters marked with
+    writes_files) also get an output collision policy, an optional checksum of
+    the outputs and a `background` flag: the call is queued as a job and returns
+    its job_id right away. Tools with an output_name encode video and also get
+    encode options (a render profile plus preset/crf/threads/tune overrides).
+    """
+    if asyncio.iscoroutinefunction(fn):
+        return fn
+    renders = _renders_file(fn)
+    encodes = _encodes_video(fn)
+    outputs = _output_parameters(fn)
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        context = contextvars.copy_context()
+        runner = fn
+        writes = False
+        background = kwargs.pop("background", False)
+        if renders:
+            options = {name: kwargs.pop(name, None) for name, _ in ENCODE_PARAMETERS} if encodes else {}
+            policy = kwargs.pop("on_collision", None)
+            checksum = kwargs.pop("checksum", False)
+            try:
+                bound = signature.bind_partial(*args, **kwargs)
+                bound.apply_defaults()
+                # calls that only store an object (or return data) write nothing, so nothing can collide
+                writes = bound.arguments.get("return_path", True) and any(bound.arguments.get(name) for name in outputs)
+                context.run(bind_settings, resolve_settings(**options))
+                policy = check_policy(policy) if writes else "overwrite"
+            except ValueError as e:
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "error_type": "ValueError",
+                    "message": "Invalid render options"
+                }
+            runner = functools.partial(_run_tool, fn, policy, checksum)
+        if background and writes:
+            bound = signature.bind(*args, **kwargs)
+            return context.run(_submit_job, fn, runner, dict(bound.arguments))
+        loop = asyncio.get_running_loop()
+        context.run(bind_channel, ProgressChannel.for_current_request())
+        return await loop.run_in_executor(tool_executor(), functools.partial(context.run, runner, *args, **kwargs))
+
+    if renders:
+        extra = [inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[kind])
+                 for name, kind in ENCODE_PARAMETERS] if encodes else []
+        extra += [
+            inspect.Parameter("on_collision", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[str]),
+            inspect.Parameter("checksum", inspect.Parameter.KEYWORD_ONLY, default=False, annotation=bool),
+            inspect.Parameter("background", inspect.Parameter.KEYWORD_ONLY, default=False, annotation=bool),
+        ]
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+    return wrapper
+
+
+def run_tools_in_executor(mcp) -> None:
+    """Make every tool registered on mcp from now on run in the tool executor"""
+    register = mcp.tool
+
+    @functools.wraps(register)
+    def tool(*args, **kwargs):
+        def register_async(fn):
+            options = dict(kwargs)
+            if options.get("description") and _encodes_video(fn):
+                options["description"] += (" Optional encode settings: profile (default, fast-draft, web, archive) with"
+                                           " preset/crf/threads/tune overrides.")
+            if options.get("description") and _renders_file(fn):
+                options["description"] += (" on_collision (overwrite, suffix, fail) decides what happens when an output"
+                                           " name exists; checksum=true adds sha256 of the outputs. Pass"
+                                           " background=true to queue the call as a job and get a job_id back"
+                                           " immediately.")
+            register(*args, **options)(to_async(fn))
+            return fn
+
+        return register_async
+
+    mcp.tool = tool
@@ -0,0 +1,587 @@
+import os
+import math
+import tempfile
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from moviepy.editor import ImageClip, CompositeVideoClip
+from moviepy.video.fx.rotate import rotate
+from moviepy.video.fx.crop import crop
+from moviepy.video.fx.fadein import fadein
+from moviepy.video.fx.fadeout import fadeout
+from moviepy.video.fx.blackwhite import blackwhite
+from moviepy.video.fx.mirror_x import mirror_x
+from .reader_pool import ReaderPool
+from .ffmpeg_utils import run_ffmpeg, parse_rate, write_concat_list, audio_codecs, can_copy_audio
+from .media_info import cached_probe, cached_keyframe_times
+from .progress import SegmentProgress
+from .encoding import ffmpeg_video_args, ffmpeg_audio_args
+from .outputs import atomic_output
+
+logger = logging.getLogger(__name__)
+
+# Operations an EditGraph can hold. Each maps to one ffmpeg filter (or input option)
+# when compiled and to the equivalent MoviePy effect when materialized as a clip.
+GRAPH_OPS = ("trim", "scale", "crop", "rotate", "fadein", "fadeout", "hflip", "gray", "overlay_image", "overlay_text")
+
+# Geometric ops the optimizer fuses into a single crop -> orientation -> scale "transform" op,
+# and ops that commute with them (temporal or per-pixel) so a fused run may span them.
+GEOMETRIC_OPS = ("scale", "crop", "rotate", "hflip")
+COMMUTING_OPS = ("trim", "fadein", "fadeout", "gray")
+
+# (quarter turns counterclockwise, mirrored before turning) -> ffmpeg filters
+ORIENTATION_FILTERS = {
+    (0, False): [],
+    (0, True): ["hflip"],
+    (1, False): ["transpose=cclock"],
+    (1, True): ["transpose=cclock_flip"],
+    (2, False): ["hflip", "vflip"],
+    (2, True): ["vflip"],
+    (3, False): ["transpose=clock"],
+    (3, True): ["transpose=clock_flip"],
+}
+
+
+def render_text_image(text: str, font_size: int, color: str) -> Image.Image:
+    """Render text onto a transparent RGBA image, used for text overlays instead of ImageMagick"""
+    font = None
+    for font_name in ("DejaVuSans.ttf", "Arial.ttf", "arial.ttf"):
+        try:
+            font = ImageFont.truetype(font_name, font_size)
+            break
+        except OSError:
+            continue
+    if font is None:
+        font = ImageFont.load_default()
+    left, top, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox((0, 0), text, font=font)
+    image = Image.new("RGBA", (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text((-left, -top), text, font=font, fill=color)
+    return image
+
+
+class EditGraph:
+    """Declarative chain of edits on a source video file.
+
+    Tools append operations instead of building nested MoviePy clips; the chain is
+    compiled into a single ffmpeg filtergraph when rendered, or materialized as a
+    MoviePy clip when a tool without a graph equivalent needs it.
+    """
+
+    def __init__(self, source: str, info: Dict[str, Any], ops: Tuple[Dict[str, Any], ...] = ()):
+        self.source = source
+        self.info = info
+        self.ops = tuple(ops)
+
+    @classmethod
+    def from_file(cls, video_path: str) -> "EditGraph":
+        probe, _ = cached_probe(video_path)
+        streams = probe.get("streams", [])
+        video_stream = next((st for st in streams if st.get("codec_type") == "video"
+                             and not st.get("disposition", {}).get("attached_pic")), None)
+        if video_stream is None:
+            raise ValueError(f"No video stream in {video_path}")
+        duration = video_stream.get("duration") or probe.get("format", {}).get("duration")
+        info = {
+            "width": int(video_stream["width"]),
+            "height": int(video_stream["height"]),
+            "duration": float(duration) if duration else None,
+            "fps": parse_rate(video_stream.get("avg_frame_rate")) or parse_rate(video_stream.get("r_frame_rate")),
+            "has_audio": any(st.get("codec_type") == "audio" for st in streams),
+            "audio_codecs": audio_codecs(probe),
+        }
+        return cls(os.path.abspath(video_path), info)
+
+    def then(self, op: str, **params) -> "EditGraph":
+        """Return a new graph with one more operation appended"""
+        if op not in GRAPH_OPS:
+            raise ValueError(f"Unknown graph operation: {op}")
+        return EditGraph(self.source, self.info, self.ops + (dict(op=op, **params),))
+
+    def output_size(self, ops: Optional[Tuple[Dict[str, Any], ...]] = None) -> Tuple[int, int]:
+        width, height = self.info["width"], self.info["height"]
+        for op in (self.ops if ops is None else ops):
+            if op["op"] == "transform":
+                if op["scale"]:
+                    width, height = op["scale"]
+                else:
+                    if op["crop"]:
+                        width, height = op["crop"][2], op["crop"][3]
+                    if op["quarter_turns"] % 2:
+                        width, height = height, width
+            elif op["op"] == "scale":
+                width, height = op["width"], op["height"]
+            elif op["op"] == "crop":
+                width, height = op["x2"] - op["x1"], op["y2"] - op["y1"]
+            elif op["op"] == "rotate":
+                angle = op["angle"] % 360
+                if angle in (90, 270):
+                    width, height = height, width
+                elif angle not in (0, 180):
+                    rad = math.radians(angle)
+                    width, height = (int(math.ceil(abs(width * math.cos(rad)) + abs(height * math.sin(rad)))),
+                                     int(math.ceil(abs(width * math.sin(rad)) + abs(height * math.cos(rad)))))
+        return width, height
+
+    def encoded_size(self) -> Tuple[int, int]:
+        """Frame size of the rendered file: output_size padded up to even dimensions for yuv420p"""
+        width, height = self.output_size()
+        return width + width % 2, height + height % 2
+
+    def output_duration(self, ops: Optional[Tuple[Dict[str, Any], ...]] = None) -> Optional[float]:
+        duration = self.info.get("duration")
+        for op in (self.ops if ops is None else ops):
+            if op["op"] == "trim":
+                end = op["end"] if duration is None else min(op["end"], duration)
+                duration = max(end - op["start"], 0.0)
+        return duration
+
+    def input_files(self) -> List[str]:
+        """Every file the render reads: the source plus overlay images"""
+        return [self.source] + [op["image_path"] for op in self.ops if op["op"] == "overlay_image"]
+
+    def describe(self) -> Dict[str, Any]:
+        width, height = self.output_size()
+        return {
+            "type": "edit_graph",
+            "source": self.source,
+            "operations": [dict(op) for op in self.ops],
+            "output_size": [width, height],
+            "output_duration": self.output_duration(),
+        }
+
+    def to_clip(self):
+        """Materialize the chain as a MoviePy clip, with geometric runs fused into one step per frame"""
+        clip = ReaderPool.video_clip(self.source)
+        for op in optimize_graph(self)[0].ops:
+            name = op["op"]
+            if name == "transform":
+                clip = _apply_transform(clip, op)
+            elif name == "trim":
+                clip = clip.subclip(op["start"], op["end"])
+            elif name == "scale":
+                clip = clip.resize(newsize=(op["width"], op["height"]))
+            elif name == "crop":
+                clip = crop(clip, op["x1"], op["y1"], op["x2"], op["y2"])
+            elif name == "rotate":
+                clip = rotate(clip, op["angle"])
+            elif name == "fadein":
+                clip = fadein(clip, op["duration"])
+            elif name == "fadeout":
+                clip = fadeout(clip, op["duration"])
+            elif name == "hflip":
+                clip = clip.fx(mirror_x)
+            elif name == "gray":
+                clip = clip.fx(blackwhite)
+            elif name in ("overlay_image", "overlay_text"):
+                if name == "overlay_text":
+                    image = np.array(render_text_image(op["text"], op["font_size"], op["color"]))
+                else:
+                    image = op["image_path"]
+                overlay = ImageClip(image).set_duration(op["duration"]).set_position((op["x"], op["y"]))
+                clip = CompositeVideoClip([clip, overlay])
+        return clip
+
+
+class _GeometryRun:
+    """A run of geometric ops folded into crop (input coords) -> orientation -> scale"""
+
+    def __init__(self, width: int, height: int):
+        self.in_size = (width, height)
+        self.crop = [0, 0, width, height]  # x, y, w, h
+        self.quarter_turns = 0
+        self.flip = False
+        self.scale = None
+        self.names = []
+
+    def oriented_size(self) -> Tuple[int, int]:
+        w, h = self.crop[2], self.crop[3]
+        return (h, w) if self.quarter_turns % 2 else (w, h)
+
+    def output_size(self) -> Tuple[int, int]:
+        return tuple(self.scale) if self.scale else self.oriented_size()
+
+    def apply(self, op: Dict[str, Any]) -> bool:
+        """Fold op into the run; False if it cannot be fused exactly"""
+        name = op["op"]
+        if name == "hflip":
+            # H . R^k . F^f == R^-k . F^(f+1)
+            self.quarter_turns = (-self.quarter_turns) % 4
+            self.flip = not self.flip
+        elif name == "rotate":
+            turns = (op["angle"] // 90) % 4
+            self.quarter_turns = (self.quarter_turns + turns) % 4
+            if self.scale and turns % 2:
+                self.scale = [self.scale[1], self.scale[0]]
+        elif name == "scale":
+            self.scale = [op["width"], op["height"]]
+        elif name == "crop":
+            x1, y1, x2, y2 = op["x1"], op["y1"], op["x2"], op["y2"]
+            if self.scale:
+                # Crop after scale: map back to pre-scale pixels, only when that is exact
+                oriented_w, oriented_h = self.oriented_size()
+                sx, sy = oriented_w / self.scale[0], oriented_h / self.scale[1]
+                mapped = [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
+                if any(abs(v - round(v)) > 1e-6 for v in mapped):
+                    return False
+                x1, y1, x2, y2 = (int(round(v)) for v in mapped)
+                self.scale = [op["x2"] - op["x1"], op["y2"] - op["y1"]]
+            # Undo the orientation (F^f . R^-k) to express the crop in pre-orientation pixels
+            w, h = self.oriented_size()
+            for _ in range((4 - self.quarter_turns) % 4):
+                # counterclockwise quarter turn of a w x h frame: (x, y) -> (y, w - x)
+                x1, y1, x2, y2 = y1, w - x2, y2, w - x1
+                w, h = h, w
+            if self.flip:
+                x1, x2 = w - x2, w - x1
+            self.crop = [self.crop[0] + x1, self.crop[1] + y1, x2 - x1, y2 - y1]
+            if self.scale and list(self.scale) == list(self.oriented_size()):
+                self.scale = None
+        self.names.append(name)
+        return True
+
+    def is_identity(self) -> bool:
+        return (self.crop == [0, 0, self.in_size[0], self.in_size[1]] and self.quarter_turns == 0
+                and not self.flip and (not self.scale or tuple(self.scale) == self.in_size))
+
+    def to_op(self) -> Dict[str, Any]:
+        full_frame = self.crop == [0, 0, self.in_size[0], self.in_size[1]]
+        scale = self.scale if self.scale and tuple(self.scale) != self.oriented_size() else None
+        return {
+            "op": "transform",
+            "crop": None if full_frame else list(self.crop),
+            "quarter_turns": self.quarter_turns,
+            "flip": self.flip,
+            "scale": list(scale) if scale else None,
+        }
+
+
+def _is_geometric(op: Dict[str, Any]) -> bool:
+    return op["op"] in GEOMETRIC_OPS and (op["op"] != "rotate" or op["angle"] % 90 == 0)
+
+
+def _transform_filters(op: Dict[str, Any]) -> List[str]:
+    filters = []
+    if op["crop"]:
+        x, y, w, h = op["crop"]
+        filters.append(f"crop={w}:{h}:{x}:{y}")
+    filters += ORIENTATION_FILTERS[(op["quarter_turns"], op["flip"])]
+    if op["scale"]:
+        filters.append(f"scale={op['scale'][0]}:{op['scale'][1]}")
+    return filters
+
+
+def optimize_graph(graph: EditGraph) -> Tuple[EditGraph, List[Dict[str, Any]]]:
+    """Fuse consecutive geometric ops so every frame is transformed once.
+
+    Runs of resize/crop/quarter-turn rotate/mirror (optionally interleaved with
+    trims, fades and grayscale, which commute with them) collapse into a single
+    crop -> transpose/flip -> scale step placed where the run starts. Returns the
+    optimized graph and a description of each fusion applied.
+    """
+    ops = []
+    fusions = []
+    run = None
+    run_index = None
+
+    def close_run() -> None:
+        nonlocal run, run_index
+        if run is None:
+            return
+        if run.is_identity():
+            ops[run_index] = None
+            fusions.append({"fused": run.names, "into": "removed (identity)"})
+        elif len(run.names) > 1:
+            fused = run.to_op()
+            ops[run_index] = fused
+            fusions.append({"fused": run.names, "into": ",".join(_transform_filters(fused))})
+        run = None
+        run_index = None
+
+    for op in graph.ops:
+        if _is_geometric(op):
+            if run is not None and run.apply(op):
+                continue
+            close_run()
+            width, height = graph.output_size(tuple(o for o in ops if o is not None))
+            run = _GeometryRun(width, height)
+            run.apply(op)
+            run_index = len(ops)
+            ops.append(op)
+        elif op["op"] in COMMUTING_OPS and run is not None:
+            ops.append(op)
+        else:
+            close_run()
+            ops.append(op)
+    close_run()
+    return EditGraph(graph.source, graph.info, tuple(o for o in ops if o is not None)), fusions
+
+
+def _apply_transform(clip, op: Dict[str, Any]):
+    """Apply a fused transform to a MoviePy clip: views for crop/flip/turns, one resize"""
+    from moviepy.video.fx.resize import resizer
+
+    def transform(frame, is_mask=False):
+        if op["crop"]:
+            x, y, w, h = op["crop"]
+            frame = frame[y:y + h, x:x + w]
+        if op["flip"]:
+            frame = frame[:, ::-1]
+        if op["quarter_turns"]:
+            frame = np.rot90(frame, op["quarter_turns"])
+        if op["scale"]:
+            if is_mask:
+                return resizer((255 * np.ascontiguousarray(frame)).astype("uint8"), op["scale"]) / 255.0
+            return resizer(np.ascontiguousarray(frame), op["scale"])
+        return frame
+
+    new_clip = clip.fl_image(transform)
+    if clip.mask is not None:
+        new_clip.mask = clip.mask.fl_image(lambda frame: transform(frame, is_mask=True))
+    return new_clip
+
+
+def _split_leading_trim(graph: EditGraph) -> Tuple[Optional[Tuple[float, float]], Tuple[Dict[str, Any], ...]]:
+    """Fold leading trims into one (start, end) range applied as input seeking"""
+    start, end = None, None
+    ops = list(graph.ops)
+    while ops and ops[0]["op"] == "trim":
+        op = ops.pop(0)
+        if start is None:
+            start, end = op["start"], op["end"]
+        else:
+            start, end = start + op["start"], min(start + op["end"], end)
+    return ((start, end) if start is not None else None), tuple(ops)
+
+
+def compile_ffmpeg_args(graph: EditGraph, output_path: str, work_dir: str,
+                        window: Optional[Tuple[float, float]] = None) -> List[str]:
+    """Compile an EditGraph into ffmpeg arguments that render it in a single pass.
+
+    With a (start, end) window in output time only that stretch of the video is
+    rendered, without audio; see segment_windows for when that is valid.
+    """
+    leading_trim, ops = _split_leading_trim(graph)
+    args = []
+    # -t goes on the output: as an input option ffmpeg also keeps the frame stamped exactly at the end
+    output_limit = []
+    if window:
+        offset = leading_trim[0] if leading_trim else 0.0
+        args += ["-ss", f"{offset + window[0]:.6f}"]
+        output_limit = ["-t", f"{window[1] - window[0]:.6f}"]
+    elif leading_trim:
+        args += ["-ss", f"{leading_trim[0]:.6f}"]
+        output_limit = ["-t", f"{leading_trim[1] - leading_trim[0]:.6f}"]
+    args += ["-i", graph.source]
+
+    # Durations/sizes are tracked against the ops already applied, starting after the input trim
+    done_ops = graph.ops[:len(graph.ops) - len(ops)]
+    video_label = "0:v"
+    audio_label = "0:a" if graph.info.get("has_audio") else None
+    # a window's frames keep their timestamps in the full output so fades and overlays line up
+    chain = [f"setpts=PTS+{window[0]:.6f}/TB"] if window else []
+    filter_parts = []
+    audio_filters = []
+    input_index = 1
+    step = 0
+
+    def flush() -> None:
+        nonlocal video_label, chain, step
+        if chain:
+            step += 1
+            out_label = f"v{step}"
+            filter_parts.append(f"[{video_label}]{','.join(chain)}[{out_label}]")
+            video_label = out_label
+            chain = []
+
+    for op in ops:
+        name = op["op"]
+        if name == "trim":
+            chain.append(f"trim=start={op['start']:.6f}:end={op['end']:.6f},setpts=PTS-STARTPTS")
+            audio_filters.append(f"atrim=start={op['start']:.6f}:end={op['end']:.6f},asetpts=PTS-STARTPTS")
+        elif name == "transform":
+            chain += _transform_filters(op)
+        elif name == "scale":
+            chain.append(f"scale={op['width']}:{op['height']}")
+        elif name == "crop":
+            chain.append(f"crop={op['x2'] - op['x1']}:{op['y2'] - op['y1']}:{op['x1']}:{op['y1']}")
+        elif name == "rotate":
+            angle = op["angle"] % 360
+            if angle == 90:
+                chain.append("transpose=cclock")
+            elif angle == 180:
+                chain.append("hflip,vflip")
+            elif angle == 270:
+                chain.append("transpose=clock")
+            elif angle != 0:
+                # MoviePy rotates counterclockwise and expands the frame; ffmpeg rotates clockwise
+                rad = -math.radians(angle)
+                chain.append(f"rotate={rad:.8f}:ow=rotw({rad:.8f}):oh=roth({rad:.8f}):c=black")
+        elif name == "fadein":
+            chain.append(f"fade=t=in:st=0:d={op['duration']:.6f}")
+        elif name == "fadeout":
+            duration = graph.output_duration(done_ops)
+            start = max((duration or 0.0) - op["duration"], 0.0)
+            chain.append(f"fade=t=out:st={start:.6f}:d={op['duration']:.6f}")
+        elif name == "hflip":
+            chain.append("hflip")
+        elif name == "gray":
+            chain.append("format=gray")
+        elif name in ("overlay_image", "overlay_text"):
+            if name == "overlay_text":
+                image_path = os.path.join(work_dir, f"text_{input_index}.png")
+                render_text_image(op["text"], op["font_size"], op["color"]).save(image_path)
+            else:
+                image_path = op["image_path"]
+            args += ["-i", image_path]
+            flush()
+            step += 1
+            out_label = f"v{step}"
+            filter_parts.append(f"[{video_label}][{input_index}:v]overlay=x={op['x']}:y={op['y']}"
+                                f":enable='between(t,0,{op['duration']:.6f})'[{out_label}]")
+            video_label = out_label
+            input_index += 1
+        done_ops = done_ops + (op,)
+
+    has_free_rotation = any(op["op"] == "rotate" and op["angle"] % 90 for op in graph.ops)
+    if has_free_rotation or graph.encoded_size() != graph.output_size():
+        # yuv420p needs even dimensions
+        chain.append("pad=ceil(iw/2)*2:ceil(ih/2)*2")
+    if window:
+        chain.append("setpts=PTS-STARTPTS")
+    chain.append("format=yuv420p")
+    flush()
+    maps = ["-map", f"[{video_label}]"]
+    copy_audio = False
+    if window:
+        maps.append("-an")
+    elif audio_label:
+        if audio_filters:
+            filter_parts.append(f"[{audio_label}]{','.join(audio_filters)}[aout]")
+            maps += ["-map", "[aout]"]
+        else:
+            maps += ["-map", "0:a?"]
+            copy_audio = _audio_passthrough(graph, output_path)
+            if copy_audio:
+                maps += ["-c:a", "copy"]
+    encode_audio = bool(audio_label) and not window and not copy_audio
+    args += ["-filter_complex", ";".join(filter_parts)] + maps + ffmpeg_video_args(output_path, audio=encode_audio)
+    return args + output_limit + [output_path]
+
+
+def _audio_passthrough(graph: EditGraph, output_path: str) -> bool:
+    """True when the source audio reaches the output unchanged and its codec fits the output container"""
+    codecs = graph.info.get("audio_codecs")
+    if codecs is None:
+        codecs = audio_codecs(cached_probe(graph.source)[0])
+    return can_copy_audio(codecs, output_path)
+
+
+def render_segments() -> int:
+    """Segments a graph render is split into by default (VIDEO_MCP_RENDER_SEGMENTS, default 1: a single pass).
+
+    Segmenting changes the GOP structure at the boundaries, so it is opt-in.
+    """
+    try:
+        return max(1, int(os.environ.get("VIDEO_MCP_RENDER_SEGMENTS", 1)))
+    except ValueError:
+        return 1
+
+
+def segment_windows(graph: EditGraph, segments: int) -> Optional[List[Tuple[float, float]]]:
+    """Split the output timeline into GOP-aligned (start, end) windows that can be encoded independently.
+
+    Returns None when the graph should render in one pass: fewer than two segments
+    of at least VIDEO_MCP_SEGMENT_MIN_SECONDS, or a trim after other operations
+    (windows are mapped to the source by a single offset).
+    """
+    leading_trim, ops = _split_leading_trim(graph)
+    duration = graph.output_duration()
+    min_seconds = float(os.environ.get("VIDEO_MCP_SEGMENT_MIN_SECONDS", 5))
+    if segments < 2 or not duration or any(op["op"] == "trim" for op in ops):
+        return None
+    segments = min(segments, int(duration // max(min_seconds, 1e-3)))
+    if segments < 2:
+        return None
+    offset = leading_trim[0] if leading_trim else 0.0
+    try:
+        keyframes = [k - offset for k in cached_keyframe_times(graph.source)]
+    except Exception as e:
+        logger.warning(f"No keyframes for {graph.source}, rendering in one pass: {e}")
+        return None
+    candidates = [k for k in keyframes if min_seconds <= k <= duration - min_seconds]
+    bounds = [0.0]
+    for i in range(1, segments):
+        target = duration * i / segments
+        later = [k for k in candidates if k >= bounds[-1] + min_seconds]
+        if not later:
+            break
+        bounds.append(min(later, key=lambda k: abs(k - target)))
+    bounds.append(duration)
+    if len(bounds) < 3:
+        return None
+    return list(zip(bounds, bounds[1:]))
+
+
+def _render_windows(graph: EditGraph, output_path: str, work_dir: str, windows: List[Tuple[float, float]]) -> None:
+    """Encode each window in its own ffmpeg process, join them losslessly and mux the audio back in"""
+    ext = os.path.splitext(output_path)[1] or ".mp4"
+    piece_paths = [os.path.join(work_dir, f"segment_{i}{ext}") for i in range(len(windows))]
+    progress = SegmentProgress(graph.output_duration(), len(windows))
+
+    def encode(index: int) -> None:
+        window = windows[index]
+        args = compile_ffmpeg_args(graph, piece_paths[index], work_dir, window)
+        run_ffmpeg(args, duration=window[1] - window[0], progress=progress.part(index))
+
+    # each encode waits for its own render slot, so this never exceeds the server's cap
+    with ThreadPoolExecutor(max_workers=len(windows), thread_name_prefix="video_mcp_segment") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, encode, i) for i in range(len(windows))]
+        for future in futures:
+            future.result()
+
+    list_path = os.path.join(work_dir, "segments.txt")
+    write_concat_list(piece_paths, list_path)
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    maps = ["-map", "0:v"]
+    copy_audio = True
+    if graph.info.get("has_audio"):
+        leading_trim, _ = _split_leading_trim(graph)
+        if leading_trim:
+            args += ["-ss", f"{leading_trim[0]:.6f}", "-t", f"{leading_trim[1] - leading_trim[0]:.6f}"]
+        args += ["-i", graph.source]
+        maps += ["-map", "1:a?"]
+        copy_audio = _audio_passthrough(graph, output_path)
+    # video is copied and audio copied or encoded, which is cheap enough to skip the render slot
+    codec_args = ["-c", "copy"] if copy_audio else ["-c:v", "copy"]
+    run_ffmpeg(args + maps + codec_args + ffmpeg_audio_args(output_path, bitrate=not copy_audio) + [output_path],
+               encode=False)
+
+
+def render_graph(graph: EditGraph, output_path: str, segments: Optional[int] = None) -> Dict[str, Any]:
+    """Render the whole chain natively, returning what was done (fusions applied, segments used, encoded frame size).
+
+    With segments (or VIDEO_MCP_RENDER_SEGMENTS) above 1, long renders are split
+    into GOP-aligned segments encoded in parallel.
+    """
+    graph, fusions = optimize_graph(graph)
+    windows = segment_windows(graph, render_segments() if segments is None else segments)
+    details: Dict[str, Any] = {}
+    if fusions:
+        details["optimizations"] = fusions
+    width, height = graph.output_size()
+    encoded_width, encoded_height = graph.encoded_size()
+    details["output_size"] = [encoded_width, encoded_height]
+    if (encoded_width, encoded_height) != (width, height):
+        details["padding"] = f"{width}x{height} padded with black to {encoded_width}x{encoded_height} (yuv420p needs even sizes)"
+    with tempfile.TemporaryDirectory(prefix="video_mcp_render_") as work_dir, atomic_output(output_path) as tmp_path:
+        if windows:
+            logger.info(f"Rendering {output_path} in {len(windows)} parallel segments")
+            _render_windows(graph, tmp_path, work_dir, windows)
+            details["segments"] = len(windows)
+        else:
+            args = compile_ffmpeg_args(graph, tmp_path, work_dir)
+            run_ffmpeg(args, duration=graph.output_duration())
+    return details
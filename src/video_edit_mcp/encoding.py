@@ -0,0 +1,118 @@
+import os
+import logging
+import contextvars
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Named encode settings. Keys left out fall back to the encoder's own defaults,
+# so "default" renders exactly like MoviePy/ffmpeg do without any settings.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "fast-draft": {"preset": "ultrafast", "crf": 28, "tune": "fastdecode", "audio_bitrate": "96k"},
+    "web": {"preset": "medium", "crf": 23, "pix_fmt": "yuv420p", "audio_bitrate": "128k", "faststart": True},
+    "archive": {"preset": "slow", "crf": 18, "audio_bitrate": "256k"},
+}
+
+SETTING_KEYS = ("preset", "crf", "threads", "tune", "pix_fmt", "audio_bitrate", "faststart")
+
+# Encoders that understand -preset/-crf/-tune, and containers whose default video encoder is libx264
+X26X_CODECS = ("libx264", "libx265")
+X264_CONTAINERS = (".mp4", ".m4v", ".mov", ".mkv")
+FASTSTART_CONTAINERS = (".mp4", ".m4v", ".mov")
+
+# Settings of the tool call running on this thread
+_settings: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("encode_settings", default=None)
+
+
+def default_profile() -> str:
+    return os.environ.get("VIDEO_MCP_RENDER_PROFILE", "default")
+
+
+def resolve_settings(profile: Optional[str] = None, **overrides) -> Dict[str, Any]:
+    """Settings for a profile (server default when None) with explicit non-None overrides on top"""
+    name = profile or default_profile()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown render profile {name!r}, expected one of {', '.join(PROFILES)}")
+    settings = dict(PROFILES[name])
+    threads = os.environ.get("VIDEO_MCP_ENCODER_THREADS")
+    if threads:
+        settings.setdefault("threads", int(threads))
+    settings.update({key: value for key, value in overrides.items() if key in SETTING_KEYS and value is not None})
+    settings["profile"] = name
+    return settings
+
+
+def bind_settings(settings: Optional[Dict[str, Any]]) -> None:
+    _settings.set(settings)
+
+
+def current_settings() -> Dict[str, Any]:
+    """Settings bound for the current tool call, else the server default profile"""
+    settings = _settings.get()
+    return settings if settings is not None else resolve_settings()
+
+
+def cache_recipe(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The parts of the settings that change the rendered bytes, for render cache keys"""
+    settings = current_settings() if settings is None else settings
+    return {key: settings[key] for key in SETTING_KEYS if key in settings and key != "threads"}
+
+
+def moviepy_kwargs(output_path: str, codec: Optional[str] = None, bitrate: Optional[str] = None) -> Dict[str, Any]:
+    """write_videofile keyword arguments for the current settings"""
+    settings = current_settings()
+    ext = os.path.splitext(output_path)[1].lower()
+    if codec is None:
+        codec = "libx264" if ext in X264_CONTAINERS else None
+    kwargs: Dict[str, Any] = {}
+    params: List[str] = []
+    if codec in X26X_CODECS:
+        if "preset" in settings:
+            kwargs["preset"] = settings["preset"]
+        if "crf" in settings and bitrate is None:
+            params += ["-crf", str(settings["crf"])]
+        if "tune" in settings:
+            params += ["-tune", settings["tune"]]
+    if "pix_fmt" in settings:
+        params += ["-pix_fmt", settings["pix_fmt"]]
+    if settings.get("faststart") and ext in FASTSTART_CONTAINERS:
+        params += ["-movflags", "+faststart"]
+    if "threads" in settings:
+        kwargs["threads"] = settings["threads"]
+    if "audio_bitrate" in settings:
+        kwargs["audio_bitrate"] = settings["audio_bitrate"]
+    if params:
+        kwargs["ffmpeg_params"] = params
+    return kwargs
+
+
+def ffmpeg_video_args(output_path: str, audio: bool = True) -> List[str]:
+    """ffmpeg output options for an encode into output_path with the current settings.
+
+    audio=False leaves out the audio bitrate, for outputs without audio or with copied audio.
+    """
+    settings = current_settings()
+    ext = os.path.splitext(output_path)[1].lower()
+    args: List[str] = []
+    if ext in X264_CONTAINERS and any(key in settings for key in ("preset", "crf", "tune")):
+        args += ["-c:v", "libx264"]
+        for key in ("preset", "crf", "tune"):
+            if key in settings:
+                args += [f"-{key}", str(settings[key])]
+    if "pix_fmt" in settings:
+        args += ["-pix_fmt", settings["pix_fmt"]]
+    if "threads" in settings:
+        args += ["-threads", str(settings["threads"])]
+    return args + ffmpeg_audio_args(output_path, bitrate=audio)
+
+
+def ffmpeg_audio_args(output_path: str, bitrate: bool = True) -> List[str]:
+    """ffmpeg options for the audio bitrate and container flags of the current settings"""
+    settings = current_settings()
+    args: List[str] = []
+    if bitrate and "audio_bitrate" in settings:
+        args += ["-b:a", settings["audio_bitrate"]]
+    if settings.get("faststart") and os.path.splitext(output_path)[1].lower() in FASTSTART_CONTAINERS:
+        args += ["-movflags", "+faststart"]
+    return args
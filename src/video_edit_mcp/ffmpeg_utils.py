@@ -0,0 +1,419 @@
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import logging
+import numpy as np
+from contextlib import nullcontext
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Optional, Tuple
+import moviepy.config as mpy_conf
+from .concurrency import render_slot
+from .jobs import check_cancelled, track_process
+from .progress import RenderProgress, follow_ffmpeg_progress
+from .outputs import atomic_output
+
+logger = logging.getLogger(__name__)
+
+
+def get_ffmpeg_binary() -> str:
+    """Return the ffmpeg binary MoviePy is configured to use"""
+    return mpy_conf.get_setting("FFMPEG_BINARY")
+
+
+def get_ffprobe_binary() -> Optional[str]:
+    """Locate ffprobe: FFPROBE_BINARY env var, next to ffmpeg, then PATH"""
+    env_binary = os.environ.get("FFPROBE_BINARY")
+    if env_binary:
+        return env_binary
+    ffmpeg_dir = os.path.dirname(get_ffmpeg_binary())
+    for name in ("ffprobe", "ffprobe.exe"):
+        candidate = os.path.join(ffmpeg_dir, name)
+        if ffmpeg_dir and os.path.isfile(candidate):
+            return candidate
+    return shutil.which("ffprobe")
+
+
+def require_ffprobe() -> str:
+    ffprobe = get_ffprobe_binary()
+    if not ffprobe:
+        raise RuntimeError("ffprobe not found. Install ffmpeg or set FFPROBE_BINARY")
+    return ffprobe
+
+
+def run_ffmpeg(args: List[str], encode: bool = True, duration: Optional[float] = None, progress=None) -> None:
+    """Run ffmpeg with the given arguments, raising RuntimeError on failure.
+
+    Encodes wait for a render slot; stream copies (encode=False) start right away.
+    Inside a background job the process is killed when the job is cancelled.
+    When someone is listening, ffmpeg's -progress output is reported against
+    `duration` (expected output seconds), to `progress` if given.
+    """
+    progress = progress or RenderProgress()
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"]
+    if progress.active:
+        cmd += ["-nostats", "-progress", "pipe:1"]
+    cmd += args
+    logger.debug(f"Running ffmpeg: {' '.join(cmd)}")
+    with render_slot() if encode else nullcontext(), tempfile.TemporaryFile() as stderr_file:
+        check_cancelled()
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE if progress.active else subprocess.DEVNULL, stderr=stderr_file)
+        with track_process(proc):
+            if progress.active:
+                follow_ffmpeg_progress(proc.stdout, progress, duration, "encode" if encode else "copy")
+                proc.stdout.close()
+            proc.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    check_cancelled()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr.decode(errors='replace').strip()}")
+
+
+def read_frame_at(video_path: str, time: float, size: Tuple[int, int]) -> np.ndarray:
+    """Decode the one RGB frame shown at `time`, scaled to `size`.
+
+    ffmpeg seeks to the keyframe before `time` and decodes from there, so the cost
+    is at most one GOP however far into the file the frame is. Scaling to the
+    clip's size (as MoviePy's reader does) keeps rotated and non-square-pixel
+    sources the same shape as frames decoded by the clip.
+    """
+    width, height = size
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-ss", f"{max(time, 0):.6f}",
+           "-i", video_path, "-map", "0:v:0", "-frames:v", "1", "-vf", f"scale={width}:{height}",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with track_process(proc):
+        data, stderr = proc.communicate()
+    check_cancelled()
+    if proc.returncode != 0 or len(data) < width * height * 3:
+        raise RuntimeError(f"ffmpeg could not decode a frame at {time:.3f}s of {video_path} ({proc.returncode}): "
+                           f"{stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(data, dtype=np.uint8, count=width * height * 3).reshape(height, width, 3)
+
+
+def parse_rate(rate: Optional[str]) -> Optional[float]:
+    """Frame rate from an ffprobe rational like "30000/1001", None if unknown"""
+    if not rate or rate == "0/0":
+        return None
+    num, _, den = rate.partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_media(path: str) -> Dict[str, Any]:
+    """Return ffprobe's JSON description (format and streams) of a media file"""
+    cmd = [require_ffprobe(), "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode(errors='replace').strip()}")
+    return json.loads(result.stdout.decode() or "{}")
+
+
+def get_video_packets(video_path: str) -> List[Tuple[float, bool]]:
+    """Return (pts seconds from container start, is_keyframe) for every packet of the first video stream.
+
+    Only packet headers are read, nothing is decoded.
+    """
+    cmd = [
+        require_ffprobe(), "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags:format=start_time",
+        "-of", "csv=p=0",
+        video_path,
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode(errors='replace').strip()}")
+
+    start_time = 0.0
+    packets = []
+    for line in result.stdout.decode().splitlines():
+        parts = line.strip().split(",")
+        if len(parts) == 1:
+            # format section: container start_time
+            try:
+                start_time = float(parts[0])
+            except ValueError:
+                pass
+        elif len(parts) >= 2:
+            try:
+                packets.append((float(parts[0]), "K" in parts[1]))
+            except ValueError:
+                continue
+    return sorted((round(pts - start_time, 6), key) for pts, key in packets)
+
+
+def keyframes_from_packets(packets: List[Tuple[float, bool]]) -> List[float]:
+    return [pts for pts, key in packets if key]
+
+
+def get_keyframe_times(video_path: str) -> List[float]:
+    """Return keyframe timestamps (seconds from container start) of the first video stream"""
+    return keyframes_from_packets(get_video_packets(video_path))
+
+
+def count_frames_between(packets: List[Tuple[float, bool]], start: float, end: Optional[float]) -> int:
+    """Number of video packets with start <= pts < end"""
+    pts_list = [pts for pts, _ in packets]
+    lo = bisect_left(pts_list, start - 1e-6)
+    hi = len(pts_list) if end is None else bisect_left(pts_list, end - 1e-6)
+    return max(hi - lo, 0)
+
+
+def snap_to_keyframe(time: float, keyframes: List[float], direction: str = "previous") -> float:
+    """Snap a time to a keyframe. direction is "previous", "next" or "nearest"."""
+    if not keyframes:
+        return time
+    if direction == "previous":
+        idx = bisect_right(keyframes, time + 1e-6) - 1
+        return keyframes[max(idx, 0)]
+    if direction == "next":
+        idx = bisect_left(keyframes, time - 1e-6)
+        return keyframes[idx] if idx < len(keyframes) else time
+    idx = bisect_left(keyframes, time)
+    candidates = keyframes[max(idx - 1, 0):idx + 1]
+    return min(candidates, key=lambda k: abs(k - time))
+
+
+def _is_keyframe(time: float, keyframes: List[float]) -> bool:
+    idx = bisect_left(keyframes, time - 1e-3)
+    return idx < len(keyframes) and abs(keyframes[idx] - time) < 1e-3
+
+
+def stream_copy_cut(video_path: str, start: float, end: Optional[float], output_path: str,
+                    packets: Optional[List[Tuple[float, bool]]] = None, video_only: bool = False) -> None:
+    """Cut [start, end) without re-encoding. start should be a keyframe time.
+
+    When packets are given and end falls on a keyframe, the video is cut at exactly
+    that frame; otherwise the cut ends on the first packet past end in decode order.
+    """
+    args = ["-ss", f"{start:.6f}", "-i", video_path]
+    if end is not None:
+        args += ["-t", f"{end - start:.6f}"]
+        if packets and _is_keyframe(end, keyframes_from_packets(packets)):
+            # -t is applied in decode order, which overshoots by the B-frame delay
+            args += ["-frames:v", str(count_frames_between(packets, start, end))]
+    if video_only:
+        args += ["-map", "0:v:0", "-an"]
+    else:
+        args += ["-map", "0:v?", "-map", "0:a?"]
+    with atomic_output(output_path) as tmp_path:
+        args += ["-c", "copy", "-avoid_negative_ts", "make_zero", tmp_path]
+        run_ffmpeg(args, encode=False, duration=end - start if end is not None else None)
+
+
+# Encoders used to re-encode partial GOPs so they can be joined with stream-copied
+# packets of the same codec. Intermediate pieces use a container that carries
+# codec parameters in-band so the pieces survive concatenation.
+SMART_CUT_ENCODERS = {
+    "h264": ("libx264", ".ts"),
+    "hevc": ("libx265", ".ts"),
+    "mpeg4": ("mpeg4", ".mkv"),
+    "vp8": ("libvpx", ".mkv"),
+    "vp9": ("libvpx-vp9", ".mkv"),
+}
+
+
+# Audio codecs each container holds as-is, so untouched source audio can be copied instead of re-encoded
+MP4_AUDIO_CODECS = ("aac", "mp3", "alac", "ac3", "eac3", "opus", "flac")
+AUDIO_COPY_CODECS = {
+    ".mp4": MP4_AUDIO_CODECS,
+    ".m4v": MP4_AUDIO_CODECS,
+    ".mov": MP4_AUDIO_CODECS + ("pcm_s16le", "pcm_s24le"),
+    ".mkv": None,
+    ".webm": ("opus", "vorbis"),
+    ".avi": ("mp3", "ac3", "pcm_s16le"),
+}
+
+
+def can_copy_audio(codecs: List[str], output_path: str) -> bool:
+    """Whether audio streams with these codecs can be stream-copied into output_path's container"""
+    ext = os.path.splitext(output_path)[1].lower()
+    if not codecs or ext not in AUDIO_COPY_CODECS:
+        return False
+    allowed = AUDIO_COPY_CODECS[ext]
+    return allowed is None or all(codec in allowed for codec in codecs)
+
+
+def audio_codecs(probe: Dict[str, Any]) -> List[str]:
+    return [st.get("codec_name") for st in probe.get("streams", []) if st.get("codec_type") == "audio"]
+
+
+def copy_audio_stream(source_path: str, output_path: str) -> None:
+    """Copy the first audio stream of source_path into output_path without re-encoding"""
+    run_ffmpeg(["-i", source_path, "-map", "0:a:0", "-vn", "-c", "copy", output_path], encode=False)
+
+
+def write_concat_list(paths: List[str], list_path: str) -> None:
+    """Write an ffmpeg concat demuxer list file"""
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def _partial_gop_encode_args(video_stream: Dict[str, Any]) -> List[str]:
+    """Encoder arguments that mimic the source stream closely enough to concatenate"""
+    encoder, _ = SMART_CUT_ENCODERS[video_stream["codec_name"]]
+    args = ["-c:v", encoder]
+    if video_stream.get("pix_fmt"):
+        args += ["-pix_fmt", video_stream["pix_fmt"]]
+    profile = (video_stream.get("profile") or "").lower()
+    x264_profiles = {"constrained baseline": "baseline", "baseline": "baseline", "main": "main", "high": "high",
+                     "high 10": "high10", "high 4:2:2": "high422", "high 4:4:4 predictive": "high444"}
+    if encoder == "libx264" and profile in x264_profiles:
+        args += ["-profile:v", x264_profiles[profile]]
+    if encoder in ("libx264", "libx265"):
+        args += ["-crf", "18"]
+    elif video_stream.get("bit_rate"):
+        args += ["-b:v", video_stream["bit_rate"]]
+    return args
+
+
+def smart_cut(video_path: str, start: float, end: Optional[float], output_path: str,
+              packets: Optional[List[Tuple[float, bool]]] = None) -> Dict[str, Any]:
+    """Frame-accurate cut of [start, end) that only re-encodes the partial GOPs at the cut points.
+
+    Frames from start up to the first keyframe and from the last keyframe up to end
+    are re-encoded with matching codec parameters, the whole GOPs in between are
+    stream-copied, and audio is copied from the source in one piece. Falls back to
+    re-encoding the whole range when the codec has no matching encoder.
+    """
+    if packets is None:
+        packets = get_video_packets(video_path)
+    keyframes = keyframes_from_packets(packets)
+    probe = probe_media(video_path)
+    video_stream = next((st for st in probe.get("streams", []) if st.get("codec_type") == "video"), None)
+    if video_stream is None:
+        raise RuntimeError("No video stream found")
+    has_audio = any(st.get("codec_type") == "audio" for st in probe.get("streams", []))
+
+    # Whole GOPs inside [start, end) can be copied: [first_keyframe, last_keyframe)
+    idx = bisect_left(keyframes, start - 1e-3)
+    first_keyframe = keyframes[idx] if idx < len(keyframes) else None
+    if end is None:
+        last_keyframe = None
+    else:
+        last_keyframe = snap_to_keyframe(end, keyframes, "previous") if keyframes else None
+        if _is_keyframe(end, keyframes):
+            last_keyframe = end
+    if first_keyframe is not None and end is not None and first_keyframe >= end:
+        first_keyframe = None
+    if first_keyframe is not None and last_keyframe is not None and last_keyframe < first_keyframe:
+        first_keyframe = None
+
+    if first_keyframe is not None and abs(first_keyframe - start) < 1e-3 and (end is None or last_keyframe == end):
+        stream_copy_cut(video_path, start, end, output_path, packets)
+        return {"reencoded_seconds": 0.0, "copied_seconds": (end - start) if end is not None else None}
+
+    codec = video_stream.get("codec_name")
+    if codec not in SMART_CUT_ENCODERS:
+        logger.info(f"No smart-cut encoder for codec {codec}, re-encoding the whole range")
+        args = ["-ss", f"{start:.6f}", "-i", video_path]
+        if end is not None:
+            args += ["-t", f"{end - start:.6f}"]
+        with atomic_output(output_path) as tmp_path:
+            run_ffmpeg(args + ["-map", "0:v?", "-map", "0:a?", tmp_path], duration=end - start if end is not None else None)
+        return {"reencoded_seconds": (end - start) if end is not None else None, "copied_seconds": 0.0}
+
+    _, piece_ext = SMART_CUT_ENCODERS[codec]
+    encode_args = _partial_gop_encode_args(video_stream)
+    # (start, end, copy) ranges in output order
+    ranges = []
+    if first_keyframe is None:
+        ranges.append((start, end, False))
+    else:
+        if first_keyframe - start > 1e-3:
+            ranges.append((start, first_keyframe, False))
+        copy_end = end if end is None else last_keyframe
+        if copy_end is None or copy_end - first_keyframe > 1e-3:
+            ranges.append((first_keyframe, copy_end, True))
+        if end is not None and end - last_keyframe > 1e-3:
+            ranges.append((last_keyframe, end, False))
+
+    reencoded = 0.0
+    copied = 0.0
+    with tempfile.TemporaryDirectory(prefix="video_mcp_smartcut_") as tmp_dir:
+        pieces = []
+        for i, (piece_start, piece_end, copy) in enumerate(ranges):
+            piece_path = os.path.join(tmp_dir, f"piece_{i}{piece_ext}")
+            if copy:
+                stream_copy_cut(video_path, piece_start, piece_end, piece_path, packets, video_only=True)
+            else:
+                args = ["-ss", f"{piece_start:.6f}", "-i", video_path]
+                if piece_end is not None:
+                    args += ["-t", f"{piece_end - piece_start:.6f}"]
+                run_ffmpeg(args + ["-map", "0:v:0", "-an"] + encode_args + [piece_path],
+                           duration=piece_end - piece_start if piece_end is not None else None)
+            if piece_end is not None:
+                if copy:
+                    copied += piece_end - piece_start
+                else:
+                    reencoded += piece_end - piece_start
+            pieces.append(piece_path)
+
+        list_path = os.path.join(tmp_dir, "pieces.txt")
+        write_concat_list(pieces, list_path)
+        args = ["-f", "concat", "-safe", "0", "-i", list_path]
+        if has_audio:
+            args += ["-ss", f"{start:.6f}"]
+            if end is not None:
+                args += ["-t", f"{end - start:.6f}"]
+            args += ["-i", video_path, "-map", "0:v:0", "-map", "1:a?"]
+        else:
+            args += ["-map", "0:v:0"]
+        with atomic_output(output_path) as tmp_path:
+            run_ffmpeg(args + ["-c", "copy", tmp_path], encode=False)
+
+    return {"reencoded_seconds": round(reencoded, 6), "copied_seconds": round(copied, 6)}
+
+
+# Stream parameters that must match for the concat demuxer to join files without re-encoding
+CONCAT_VIDEO_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt", "time_base", "r_frame_rate", "sample_aspect_ratio")
+CONCAT_AUDIO_KEYS = ("codec_name", "profile", "sample_rate", "channels", "channel_layout", "time_base")
+
+
+def concat_signature(probe: Dict[str, Any]) -> List[Tuple[str, Tuple]]:
+    """Per-stream parameters of a probed file that must match across concat inputs"""
+    signature = []
+    for stream in probe.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video" and not stream.get("disposition", {}).get("attached_pic"):
+            signature.append(("video", tuple(stream.get(k) for k in CONCAT_VIDEO_KEYS)))
+        elif codec_type == "audio":
+            signature.append(("audio", tuple(stream.get(k) for k in CONCAT_AUDIO_KEYS)))
+    return signature
+
+
+def find_concat_mismatch(paths: List[str]) -> Optional[str]:
+    """Return why the files cannot be stream-copy concatenated, or None if they can"""
+    reference = None
+    for path in paths:
+        signature = concat_signature(probe_media(path))
+        if not signature:
+            return f"{path} has no audio or video streams"
+        if reference is None:
+            reference = signature
+            continue
+        if [kind for kind, _ in signature] != [kind for kind, _ in reference]:
+            return f"{path} has a different stream layout"
+        for (kind, params), (_, ref_params) in zip(signature, reference):
+            keys = CONCAT_VIDEO_KEYS if kind == "video" else CONCAT_AUDIO_KEYS
+            for key, value, ref_value in zip(keys, params, ref_params):
+                if value != ref_value:
+                    return f"{path} {kind} {key} is {value}, expected {ref_value}"
+    return None
+
+
+def concat_copy(paths: List[str], output_path: str) -> None:
+    """Join files with the concat demuxer without re-encoding"""
+    with tempfile.TemporaryDirectory(prefix="video_mcp_concat_") as tmp_dir, atomic_output(output_path) as tmp_path:
+        list_path = os.path.join(tmp_dir, "inputs.txt")
+        write_concat_list(paths, list_path)
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-map", "0:v?", "-map", "0:a?",
+                    "-c", "copy", tmp_path], encode=False)
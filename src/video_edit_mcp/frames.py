@@ -0,0 +1,293 @@
+import io
+import os
+import base64
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from PIL import Image
+from .jobs import check_cancelled
+from .outputs import atomic_output
+from .reader_pool import ReaderPool
+from .media_info import cached_keyframe_times
+from .ffmpeg_utils import read_frame_at, snap_to_keyframe
+
+logger = logging.getLogger(__name__)
+
+# PIL format names and MIME types for encoded frames
+IMAGE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "png": ("PNG", "image/png", ".png"),
+}
+
+
+SEEK_MODES = ("auto", "decode", "seek", "keyframe")
+
+
+def sparse_seconds() -> float:
+    """Gap between samples above which auto mode seeks per frame (VIDEO_MCP_SPARSE_SECONDS)"""
+    return float(os.environ.get("VIDEO_MCP_SPARSE_SECONDS", 2.0))
+
+
+class FrameSequence:
+    """Frames of a clip sampled at fixed times, decoded only when read.
+
+    Stored in place of a list of arrays so memory stays bounded whatever the range;
+    holding the clip keeps its source alive in the store.
+
+    Frames come from the clip's reader, which decodes every frame between samples,
+    or, for unedited files, from one ffmpeg seek per sample ("seek"), which only
+    decodes from the keyframe before each sample. "keyframe" moves every sample to
+    the keyframe before it so each costs a single decoded frame. "auto" seeks when
+    samples are further apart than VIDEO_MCP_SPARSE_SECONDS.
+    """
+
+    def __init__(self, clip, start: float = 0, end: Optional[float] = None, fps: Optional[float] = None,
+                 times: Optional[List[float]] = None, seek_mode: str = "auto"):
+        if seek_mode not in SEEK_MODES:
+            raise ValueError(f"Unknown seek_mode {seek_mode!r}, expected one of {', '.join(SEEK_MODES)}")
+        self.clip = clip
+        self.size = clip.size
+        if times is not None:
+            if not times:
+                raise ValueError("timestamps must not be empty")
+            # the clip ends at its duration, so the last frame is shown just before it
+            if clip.duration is not None and any(t < 0 or t >= clip.duration for t in times):
+                raise ValueError(f"timestamps must be at least 0 and less than the clip duration ({clip.duration:.3f}s)")
+            if clip.duration is None and any(t < 0 for t in times):
+                raise ValueError("timestamps must not be negative")
+            self.times = [float(t) for t in times]
+        else:
+            if not fps or fps <= 0:
+                raise ValueError("fps must be positive")
+            end = clip.duration if end is None else end
+            end = min(end, clip.duration) if clip.duration is not None else end
+            if end is None or end <= start:
+                raise ValueError("end_time must be after start_time")
+            # same sampling as MoviePy's iter_frames over the subclip
+            self.times = [start + t for t in np.arange(0, end - start, 1.0 / fps)]
+        self.source = ReaderPool.source_video(clip)
+        self.seek_mode = seek_mode
+        if self.source and seek_mode == "keyframe":
+            keyframes = cached_keyframe_times(self.source)
+            self.times = sorted({snap_to_keyframe(t, keyframes, "previous") for t in self.times})
+        gaps = np.diff(sorted(self.times))
+        self.seeks = bool(self.source) and (
+            seek_mode in ("seek", "keyframe")
+            or (seek_mode == "auto" and len(gaps) > 0 and float(np.median(gaps)) >= sparse_seconds()))
+        self.start = min(self.times)
+        self.end = max(self.times)
+        self.duration = self.end - self.start
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _frame(self, t: float) -> np.ndarray:
+        fps = getattr(self.clip, "fps", None)
+        if fps and self.clip.duration is not None:
+            # times in the last frame interval read past the end of the stream; show the last frame
+            t = min(t, self.clip.duration - 1.0 / fps)
+        if self.seeks:
+            # seek to the frame MoviePy would show at t, a quarter frame early so rounding can't skip it
+            shown = int(fps * t + 0.00001) / fps
+            try:
+                return read_frame_at(self.source, max(shown - 0.25 / fps, 0), self.size)
+            except RuntimeError as e:
+                # past the last decodable frame; the reader repeats the last one
+                logger.debug(f"Seek failed, decoding instead: {e}")
+        return np.asarray(self.clip.get_frame(t), dtype=np.uint8)
+
+    def frames(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Yield (index, time, RGB frame) for a slice of the sequence, decoding in order"""
+        stop = len(self.times) if limit is None else min(len(self.times), offset + limit)
+        for index in range(max(offset, 0), stop):
+            t = self.times[index]
+            yield index, float(t), self._frame(t)
+
+
+def frame_writers() -> int:
+    """Threads encoding extracted frames (VIDEO_MCP_FRAME_WRITERS, default one per CPU)"""
+    return max(1, int(os.environ.get("VIDEO_MCP_FRAME_WRITERS", os.cpu_count() or 1)))
+
+
+def fitted_size(size: Tuple[int, int], max_size: Optional[int]) -> Tuple[int, int]:
+    """(width, height) scaled down so the longer side is at most max_size, keeping the aspect ratio"""
+    width, height = size
+    if not max_size or max(width, height) <= max_size:
+        return width, height
+    scale = max_size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_within(frame: np.ndarray, max_size: Optional[int]) -> Image.Image:
+    """PIL image of frame, downscaled so its longer side is at most max_size"""
+    image = Image.fromarray(frame[:, :, :3] if frame.ndim == 3 else frame)
+    size = fitted_size(image.size, max_size)
+    return image if size == image.size else image.resize(size, Image.LANCZOS)
+
+
+def check_image_format(image_format: str) -> str:
+    """PIL format name for image_format, if this Pillow build can write it"""
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format!r}, expected one of {', '.join(IMAGE_FORMATS)}")
+    pil_format = IMAGE_FORMATS[image_format][0]
+    Image.init()
+    if pil_format not in Image.SAVE:
+        raise ValueError(f"This Pillow build cannot write {image_format} images")
+    return pil_format
+
+
+def encode_image(frame: np.ndarray, image_format: str = "jpeg", quality: Optional[int] = 80,
+                 max_size: Optional[int] = None, png_level: Optional[int] = None) -> bytes:
+    """Encode one frame as JPEG/WebP/PNG bytes, downscaled to max_size first.
+
+    quality applies to JPEG and WebP, png_level (0-9) to PNG; None keeps Pillow's default.
+    """
+    pil_format = check_image_format(image_format)
+    options: Dict[str, Any] = {}
+    if pil_format in ("JPEG", "WEBP") and quality is not None:
+        options["quality"] = quality
+    elif pil_format == "PNG" and png_level is not None:
+        options["compress_level"] = png_level
+    buffer = io.BytesIO()
+    fit_within(frame, max_size).save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def encoded_page(sequence: FrameSequence, offset: int, limit: int, image_format: str, quality: int,
+                 max_size: Optional[int]) -> List[Dict[str, Any]]:
+    """One page of frames as base64 thumbnails"""
+    mime = IMAGE_FORMATS[image_format][1] if image_format in IMAGE_FORMATS else None
+    page = []
+    for index, t, frame in sequence.frames(offset, limit):
+        data = encode_image(frame, image_format, quality, max_size)
+        page.append({"index": index, "time": round(float(t), 6), "mime_type": mime,
+                     "data": base64.b64encode(data).decode("ascii")})
+    return page
+
+
+def write_npy(sequence: FrameSequence, path: str, offset: int = 0, limit: Optional[int] = None,
+              max_size: Optional[int] = None) -> Tuple[int, ...]:
+    """Write frames into a memory-mapped .npy of shape (n, height, width, 3), one frame in memory at a time"""
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must not be negative")
+    count = max(0, (len(sequence) if limit is None else min(len(sequence), offset + limit)) - offset)
+    width, height = fitted_size(sequence.size, max_size)
+    array = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(count, height, width, 3))
+    for index, _, frame in sequence.frames(offset, count):
+        check_cancelled()
+        array[index - offset] = np.asarray(fit_within(frame, max_size)) if max_size else frame[:, :, :3]
+    array.flush()
+    shape = array.shape
+    del array
+    return shape
+
+
+def write_frame_files(sequence: FrameSequence, folder: str, image_format: str = "png", quality: Optional[int] = None,
+                      png_level: Optional[int] = None, max_size: Optional[int] = None,
+                      workers: Optional[int] = None) -> List[str]:
+    """Write every frame of sequence into folder and return the paths.
+
+    Frames are decoded in order on this thread and encoded on a pool of writer
+    threads; at most two frames per writer wait in memory. "npy" writes one
+    frames.npy array instead of an image per frame.
+    """
+    if image_format == "npy":
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "frames.npy")
+        write_npy(sequence, path, max_size=max_size)
+        return [path]
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported frame format {image_format!r}, expected one of {', '.join(IMAGE_FORMATS)}, npy")
+    check_image_format(image_format)
+    os.makedirs(folder, exist_ok=True)
+    ext = IMAGE_FORMATS[image_format][2]
+    workers = workers or frame_writers()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def write(path: str, frame: np.ndarray) -> None:
+        try:
+            data = encode_image(frame, image_format, quality, max_size, png_level)
+            with open(path, "wb") as f:
+                f.write(data)
+        finally:
+            in_flight.release()
+
+    paths: List[str] = []
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-writer") as pool:
+        for index, _, frame in sequence.frames():
+            check_cancelled()
+            in_flight.acquire()
+            path = os.path.join(folder, f"frame_{index:04d}{ext}")
+            futures.append(pool.submit(write, path, frame))
+            paths.append(path)
+            # surface a failed write without waiting for the whole range to decode
+            while futures and futures[0].done():
+                futures.pop(0).result()
+        for future in futures:
+            future.result()
+    logger.info(f"Wrote {len(paths)} {image_format} frames to {folder} with {workers} writers")
+    return paths
+
+
+def _vtt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    return f"{hours:02d}:{minutes:02d}:{millis // 1000:02d}.{millis % 1000:03d}"
+
+
+def write_sprite_sheets(sequence: FrameSequence, sheet_path: Callable[[int], str], tile_width: int, columns: int,
+                        rows: int, image_format: str = "jpeg", quality: Optional[int] = 80,
+                        end: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Tile the frames of sequence into sprite sheets of columns x rows and return one entry per tile.
+
+    Frames are downscaled as they are decoded and each sheet is written as soon as
+    it is full, so only one sheet and one frame are in memory. sheet_path(n) names
+    sheet n. A tile covers the time from its frame to the next one (or `end`).
+    """
+    pil_format = check_image_format(image_format)
+    width, height = sequence.size
+    tile_height = max(1, round(tile_width * height / width))
+    per_sheet = columns * rows
+    options = {"quality": quality} if pil_format in ("JPEG", "WEBP") and quality is not None else {}
+    tiles: List[Dict[str, Any]] = []
+    sheet: Optional[Image.Image] = None
+    sheet_file, sheet_name = "", ""
+
+    def save(image: Image.Image, path: str) -> None:
+        with atomic_output(path) as tmp_path:
+            image.save(tmp_path, format=pil_format, **options)
+
+    for index, t, frame in sequence.frames():
+        check_cancelled()
+        slot = index % per_sheet
+        if slot == 0:
+            if sheet is not None:
+                save(sheet, sheet_file)
+            count = min(per_sheet, len(sequence) - index)
+            sheet_rows = -(-count // columns)
+            sheet = Image.new("RGB", (tile_width * min(columns, count), tile_height * sheet_rows))
+            sheet_file = sheet_path(index // per_sheet)
+            sheet_name = os.path.basename(sheet_file)
+        x, y = (slot % columns) * tile_width, (slot // columns) * tile_height
+        sheet.paste(Image.fromarray(frame[:, :, :3]).resize((tile_width, tile_height), Image.LANCZOS), (x, y))
+        next_time = sequence.times[index + 1] if index + 1 < len(sequence) else (end if end is not None else t)
+        tiles.append({"index": index, "start": t, "end": max(next_time, t), "sprite": sheet_name,
+                      "x": x, "y": y, "w": tile_width, "h": tile_height})
+    if sheet is not None:
+        save(sheet, sheet_file)
+    return tiles
+
+
+def webvtt_index(tiles: List[Dict[str, Any]]) -> str:
+    """WebVTT thumbnail track pointing each cue at its tile (sprite.jpg#xywh=x,y,w,h)"""
+    lines = ["WEBVTT", ""]
+    for tile in tiles:
+        lines.append(f"{_vtt_time(tile['start'])} --> {_vtt_time(tile['end'])}")
+        lines.append(f"{tile['sprite']}#xywh={tile['x']},{tile['y']},{tile['w']},{tile['h']}")
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+import os
+import re
+import glob
+import logging
+import subprocess
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoClip
+from .concurrency import render_slot
+from .jobs import check_cancelled, track_process
+from .progress import RenderProgress
+from .outputs import atomic_output
+from .encoding import ffmpeg_video_args
+from .ffmpeg_utils import get_ffmpeg_binary
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp", ".gif")
+SORT_ORDERS = ("natural", "name", "mtime")
+# fit: scale to fit and pad with black, fill: scale to cover and crop the centre, stretch: ignore aspect ratio
+RESIZE_MODES = ("fit", "fill", "stretch")
+
+
+def image_readers() -> int:
+    """Threads decoding images ahead of the encoder (VIDEO_MCP_IMAGE_READERS, default one per CPU)"""
+    return max(1, int(os.environ.get("VIDEO_MCP_IMAGE_READERS", os.cpu_count() or 1)))
+
+
+def natural_key(path: str) -> List:
+    """Sort key that orders frame_2 before frame_10"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", os.path.basename(path))]
+
+
+def list_images(path: str, pattern: Optional[str] = None, sort: str = "natural") -> List[str]:
+    """Image files in a folder (optionally matching a glob pattern) or matching a glob path, in sort order"""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort {sort!r}, expected one of {', '.join(SORT_ORDERS)}")
+    if os.path.isdir(path):
+        if pattern:
+            paths = glob.glob(os.path.join(glob.escape(path), pattern))
+        else:
+            with os.scandir(path) as entries:
+                paths = [entry.path for entry in entries if entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+    else:
+        paths = glob.glob(path, recursive=True)
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        raise FileNotFoundError(f"No images found in {path}" + (f" matching {pattern}" if pattern else ""))
+    if sort == "natural":
+        paths.sort(key=natural_key)
+    elif sort == "mtime":
+        paths.sort(key=lambda p: (os.path.getmtime(p), natural_key(p)))
+    else:
+        paths.sort()
+    return paths
+
+
+def parse_size(size: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(width, height) from "WIDTHxHEIGHT", None when not given"""
+    if not size:
+        return None
+    match = re.fullmatch(r"\s*(\d+)\s*[xX]\s*(\d+)\s*", size)
+    if not match:
+        raise ValueError(f"Invalid size {size!r}, expected WIDTHxHEIGHT")
+    return int(match.group(1)), int(match.group(2))
+
+
+def target_size(paths: List[str], size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Output frame size: the given size or the first image's, rounded down to even for yuv420p encoders"""
+    if size is None:
+        with Image.open(paths[0]) as image:
+            size = image.size
+    width, height = size
+    return max(2, width - width % 2), max(2, height - height % 2)
+
+
+def load_image(path: str, size: Tuple[int, int], resize_mode: str = "fit") -> np.ndarray:
+    """RGB array of an image resized to size under resize_mode"""
+    width, height = size
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            # let the JPEG decoder downscale by a power of two when the target is much smaller
+            image.draft("RGB", (width, height))
+        image = image.convert("RGB")
+        if image.size == size:
+            return np.asarray(image)
+        if resize_mode == "stretch":
+            return np.asarray(image.resize(size, Image.LANCZOS))
+        scale = (min if resize_mode == "fit" else max)(width / image.width, height / image.height)
+        scaled = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+        canvas = Image.new("RGB", size)
+        canvas.paste(scaled, ((width - scaled.width) // 2, (height - scaled.height) // 2))
+        return np.asarray(canvas)
+
+
+def prefetched(paths: List[str], load: Callable[[str], np.ndarray], workers: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield load(path) for every path in order while the next few images decode on a thread pool"""
+    workers = workers or image_readers()
+    ahead = workers * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-reader") as pool:
+        pending = deque()
+        remaining = iter(paths)
+        for path in remaining:
+            pending.append(pool.submit(load, path))
+            if len(pending) >= ahead:
+                break
+        while pending:
+            frame = pending.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append(pool.submit(load, next_path))
+            yield frame
+
+
+def image_sequence_clip(paths: List[str], fps: float, size: Tuple[int, int], resize_mode: str = "fit") -> VideoClip:
+    """Clip showing paths at fps, each image read only when one of its frames is requested"""
+    last = {}
+
+    def make_frame(t):
+        index = min(int(t * fps + 0.00001), len(paths) - 1)
+        if last.get("index") != index:
+            last["index"], last["frame"] = index, load_image(paths[index], size, resize_mode)
+        return last["frame"]
+
+    clip = VideoClip(make_frame, duration=len(paths) / fps)
+    clip.fps = fps
+    return clip
+
+
+def encode_image_sequence(paths: List[str], fps: float, output_path: str, size: Tuple[int, int],
+                          resize_mode: str = "fit") -> None:
+    """Encode images straight into output_path by piping raw frames to ffmpeg.
+
+    Images are decoded and resized ahead of the encoder on VIDEO_MCP_IMAGE_READERS
+    threads, so encoding starts with the first image instead of after probing all of them.
+    """
+    width, height = size
+    progress = RenderProgress(output_path)
+    with render_slot(), atomic_output(output_path) as tmp_path, tempfile.TemporaryFile() as stderr_file:
+        args = ffmpeg_video_args(tmp_path, audio=False)
+        if "-pix_fmt" not in args:
+            args += ["-pix_fmt", "yuv420p"]
+        cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", f"{fps}", "-i", "pipe:0",
+               "-an", *args, tmp_path]
+        logger.debug(f"Running ffmpeg: {' '.join(cmd)}")
+        check_cancelled()
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        with track_process(proc):
+            try:
+                for done, frame in enumerate(prefetched(paths, lambda p: load_image(p, size, resize_mode)), 1):
+                    check_cancelled()
+                    proc.stdin.write(frame.tobytes())
+                    progress.update("encode", done, len(paths), "frames")
+            except BrokenPipeError:
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+                proc.wait()
+        check_cancelled()
+        if proc.returncode != 0:
+            stderr_file.seek(0)
+            raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr_file.read().decode(errors='replace').strip()}")
+        progress.update("encode", len(paths), len(paths), "frames", final=True)
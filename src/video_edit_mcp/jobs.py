@@ -0,0 +1,189 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Job the current thread is working for, if any
+current_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("current_job", default=None)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's thread once cancel_job was called for it"""
+
+
+class Job:
+    def __init__(self, tool: str, arguments: Dict[str, Any], output_path: Optional[str]):
+        self.id = str(uuid.uuid4())
+        self.tool = tool
+        self.arguments = arguments
+        self.output_path = output_path
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = threading.Event()
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def add_process(self, proc) -> None:
+        with self._lock:
+            self._processes.add(proc)
+            cancelled = self.cancel_requested.is_set()
+        if cancelled:
+            proc.kill()
+
+    def remove_process(self, proc) -> None:
+        with self._lock:
+            self._processes.discard(proc)
+
+    def kill_processes(self) -> None:
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    def describe(self) -> Dict[str, Any]:
+        now = time.time()
+        info = {
+            "job_id": self.id,
+            "tool": self.tool,
+            "status": self.status,
+            "output_path": self.output_path,
+            "created_at": self.created_at,
+            "queued_seconds": round((self.started_at or now) - self.created_at, 2),
+            "running_seconds": round((self.finished_at or now) - self.started_at, 2) if self.started_at else None,
+        }
+        if self.progress is not None:
+            info["progress"] = self.progress
+        if self.result is not None:
+            info["result"] = self.result
+        if self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the job running on this thread has been cancelled"""
+    job = current_job.get()
+    if job is not None and job.cancel_requested.is_set():
+        raise JobCancelled(f"Job {job.id} was cancelled")
+
+
+@contextmanager
+def track_process(proc):
+    """Let cancel_job kill proc while the block runs"""
+    job = current_job.get()
+    if job is None:
+        yield
+        return
+    job.add_process(proc)
+    try:
+        yield
+    finally:
+        job.remove_process(proc)
+
+
+class JobManager:
+    """Background renders: each job runs a tool call on its own worker thread.
+
+    Finished jobs are kept for get_job_status until VIDEO_MCP_JOBS_KEPT newer
+    ones have finished.
+    """
+    _jobs: "OrderedDict[str, Job]" = OrderedDict()
+    _lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                workers = max(1, int(os.environ.get("VIDEO_MCP_JOB_WORKERS", 16)))
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video_mcp_job")
+            return cls._executor
+
+    @classmethod
+    def submit(cls, tool: str, fn: Callable[..., Dict[str, Any]], arguments: Dict[str, Any],
+               output_path: Optional[str] = None) -> Job:
+        job = Job(tool, arguments, output_path)
+        with cls._lock:
+            cls._jobs[job.id] = job
+            cls._prune()
+        context = contextvars.copy_context()
+        cls._pool().submit(context.run, cls._run, job, fn)
+        logger.info(f"Queued job {job.id} for {tool}")
+        return job
+
+    @classmethod
+    def _run(cls, job: Job, fn: Callable[..., Dict[str, Any]]) -> None:
+        if job.cancel_requested.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        token = current_job.set(job)
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = fn(**job.arguments)
+            job.result = result
+            if isinstance(result, dict) and result.get("output_path"):
+                job.output_path = result["output_path"]
+            failed = isinstance(result, dict) and result.get("success") is False
+            if failed:
+                job.error = result.get("error")
+            if job.cancel_requested.is_set():
+                job.status = "cancelled"
+            else:
+                job.status = "failed" if failed else "succeeded"
+        except Exception as e:
+            job.status = "cancelled" if job.cancel_requested.is_set() else "failed"
+            job.error = str(e)
+            logger.error(f"Job {job.id} ({job.tool}) failed: {e}")
+        finally:
+            # outputs are written to temp files renamed on success, so a failed job leaves nothing to clean up
+            current_job.reset(token)
+            job.finished_at = time.time()
+            logger.info(f"Job {job.id} ({job.tool}) {job.status}")
+
+    @classmethod
+    def _prune(cls) -> None:
+        keep = max(1, int(os.environ.get("VIDEO_MCP_JOBS_KEPT", 500)))
+        # jobs finish out of submission order, so the oldest finished go first
+        finished = sorted((job for job in cls._jobs.values() if job.finished_at is not None), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - keep)]:
+            del cls._jobs[job.id]
+
+    @classmethod
+    def get(cls, job_id: str) -> Job:
+        with cls._lock:
+            if job_id not in cls._jobs:
+                raise KeyError(f"No job with id {job_id}")
+            return cls._jobs[job_id]
+
+    @classmethod
+    def cancel(cls, job_id: str) -> Job:
+        job = cls.get(job_id)
+        if job.finished_at is None:
+            job.cancel_requested.set()
+            job.kill_processes()
+            if job.status == "queued":
+                job.status = "cancelled"
+        return job
+
+    @classmethod
+    def list(cls, status: Optional[str] = None) -> List[Job]:
+        with cls._lock:
+            return [job for job in cls._jobs.values() if status is None or job.status == status]
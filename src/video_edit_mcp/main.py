@@ -4,11 +4,14 @@ from .video_operations import register_video_tools
 from .audio_operations import register_audio_tools
 from .download_utils import register_download_and_utility_tools
 from .util_tools import register_util_tools
+from .concurrency import run_tools_in_executor
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 mcp = FastMCP()
+# Tool bodies block on encodes, so run them on worker threads to keep the server responsive
+run_tools_in_executor(mcp)
 
 # Register all tools from different modules
 register_video_tools(mcp)
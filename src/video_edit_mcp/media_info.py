@@ -0,0 +1,349 @@
+import os
+import glob
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from .ffmpeg_utils import probe_media, get_video_packets, get_keyframe_times, parse_rate
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored records change shape so old rows are ignored
+METADATA_VERSION = 1
+MEMORY_ENTRIES = 4096
+
+
+def _identity(path: str) -> Tuple[str, int, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _number(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MetadataCache:
+    """Probe results keyed by file identity (path, size, mtime, inode).
+
+    An in-memory LRU sits in front of a sqlite database at VIDEO_MCP_METADATA_DB
+    (default ~/.cache/video_mcp/metadata.sqlite) so results survive restarts.
+    A changed file gets a new identity; its old rows are replaced on the next put.
+    """
+    _lock = threading.Lock()
+    _memory: "OrderedDict[Tuple, Any]" = OrderedDict()
+    _db: Optional[sqlite3.Connection] = None
+    _db_path: Optional[str] = None
+    _stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @classmethod
+    def db_path(cls) -> str:
+        return os.environ.get("VIDEO_MCP_METADATA_DB", str(Path.home() / ".cache" / "video_mcp" / "metadata.sqlite"))
+
+    @classmethod
+    def _connection(cls) -> Optional[sqlite3.Connection]:
+        path = cls.db_path()
+        if cls._db is not None and cls._db_path == path:
+            return cls._db
+        cls._db_path = path
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "path TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, kind TEXT, version INTEGER, data TEXT, "
+                "PRIMARY KEY (path, kind))"
+            )
+            db.commit()
+            cls._db = db
+        except sqlite3.Error as e:
+            logger.warning(f"Metadata cache database {path} unavailable, caching in memory only: {e}")
+            cls._db = None
+        return cls._db
+
+    @classmethod
+    def get(cls, path: str, kind: str) -> Optional[Any]:
+        identity = _identity(path)
+        key = identity + (kind,)
+        with cls._lock:
+            if key in cls._memory:
+                cls._memory.move_to_end(key)
+                cls._stats["memory_hits"] += 1
+                return cls._memory[key]
+            db = cls._connection()
+            row = None
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT data FROM metadata WHERE path=? AND kind=? AND size=? AND mtime_ns=? AND inode=? AND version=?",
+                        (identity[0], kind, identity[1], identity[2], identity[3], METADATA_VERSION),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Metadata cache read failed: {e}")
+            if row is None:
+                cls._stats["misses"] += 1
+                return None
+            cls._stats["disk_hits"] += 1
+            data = json.loads(row[0])
+            cls._remember(key, data)
+            return data
+
+    @classmethod
+    def _remember(cls, key: Tuple, data: Any) -> None:
+        cls._memory[key] = data
+        cls._memory.move_to_end(key)
+        while len(cls._memory) > MEMORY_ENTRIES:
+            cls._memory.popitem(last=False)
+
+    @classmethod
+    def put(cls, path: str, kind: str, data: Any, identity: Optional[Tuple] = None) -> None:
+        identity = identity or _identity(path)
+        with cls._lock:
+            cls._remember(identity + (kind,), data)
+            db = cls._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO metadata (path, size, mtime_ns, inode, kind, version, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (identity[0], identity[1], identity[2], identity[3], kind, METADATA_VERSION, json.dumps(data)),
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Metadata cache write failed: {e}")
+
+    @classmethod
+    def cached(cls, path: str, kind: str, compute) -> Tuple[Any, bool]:
+        """(value, was_cached) for kind of path, computing and storing it on a miss"""
+        data = cls.get(path, kind)
+        if data is not None:
+            return data, True
+        # identity taken before computing, so a file modified meanwhile isn't cached under its new identity
+        identity = _identity(path)
+        data = compute(path)
+        cls.put(path, kind, data, identity)
+        return data, False
+
+    @classmethod
+    def info(cls) -> Dict[str, Any]:
+        with cls._lock:
+            db = cls._connection()
+            rows = None
+            if db is not None:
+                try:
+                    rows = db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {"database": cls._db_path if db is not None else None, "rows": rows,
+                    "memory_entries": len(cls._memory), **cls._stats}
+
+
+def keyframe_stats(path: str) -> Dict[str, Any]:
+    """Keyframe count and GOP lengths of the first video stream, from packet headers only"""
+    packets = get_video_packets(path)
+    keyframe_times = sorted(pts for pts, is_key in packets if is_key)
+    gop_frames = []
+    count = None
+    for _, is_key in packets:
+        if is_key:
+            if count:
+                gop_frames.append(count)
+            count = 1
+        elif count is not None:
+            count += 1
+    if count:
+        gop_frames.append(count)
+    gop_seconds = [b - a for a, b in zip(keyframe_times, keyframe_times[1:])]
+
+    def summary(values: List[float]) -> Optional[Dict[str, float]]:
+        if not values:
+            return None
+        return {"min": round(min(values), 3), "max": round(max(values), 3), "mean": round(sum(values) / len(values), 3)}
+
+    return {
+        "packets": len(packets),
+        "count": len(keyframe_times),
+        "first": keyframe_times[0] if keyframe_times else None,
+        "gop_frames": summary(gop_frames),
+        "gop_seconds": summary(gop_seconds),
+    }
+
+
+def cached_probe(path: str) -> Tuple[Dict[str, Any], bool]:
+    return MetadataCache.cached(path, "probe", probe_media)
+
+
+def cached_keyframe_times(path: str) -> List[float]:
+    return MetadataCache.cached(path, "keyframe_times", get_keyframe_times)[0]
+
+
+def _stream_summary(stream: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {
+        "index": stream.get("index"),
+        "type": stream.get("codec_type"),
+        "codec": stream.get("codec_name"),
+        "profile": stream.get("profile"),
+        "bit_rate": _number(stream.get("bit_rate"), int),
+        "duration": _number(stream.get("duration")),
+        "language": stream.get("tags", {}).get("language"),
+    }
+    if stream.get("codec_type") == "video":
+        summary.update({
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "pix_fmt": stream.get("pix_fmt"),
+            "fps": parse_rate(stream.get("avg_frame_rate")) or parse_rate(stream.get("r_frame_rate")),
+            "nb_frames": _number(stream.get("nb_frames"), int),
+            "attached_pic": bool(stream.get("disposition", {}).get("attached_pic")),
+        })
+    elif stream.get("codec_type") == "audio":
+        summary.update({
+            "sample_rate": _number(stream.get("sample_rate"), int),
+            "channels": stream.get("channels"),
+            "channel_layout": stream.get("channel_layout"),
+        })
+    return {k: v for k, v in summary.items() if v is not None}
+
+
+def video_info(path: str, include_keyframes: bool = False) -> Tuple[Dict[str, Any], bool]:
+    """get_video_info record for a file from ffprobe alone, and whether it came from the cache"""
+    probe, probe_cached = cached_probe(path)
+    keyframes, keyframes_cached = (MetadataCache.cached(path, "keyframes", keyframe_stats)
+                                   if include_keyframes else (None, True))
+    fmt = probe.get("format", {})
+    streams = probe.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video"
+                  and not st.get("disposition", {}).get("attached_pic")), None)
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    if video is None:
+        raise ValueError(f"No video stream in {path}")
+
+    width, height = int(video["width"]), int(video["height"])
+    rotation = video.get("tags", {}).get("rotate")
+    for side_data in video.get("side_data_list", []):
+        if "rotation" in side_data:
+            rotation = side_data["rotation"]
+    if rotation is not None and int(float(rotation)) % 180:
+        # ffmpeg auto-rotates on decode, so report the displayed size of rotated phone videos
+        width, height = height, width
+    fps = parse_rate(video.get("avg_frame_rate")) or parse_rate(video.get("r_frame_rate"))
+    duration = _number(fmt.get("duration")) or _number(video.get("duration"))
+    video_bitrate = _number(video.get("bit_rate"), int)
+    nframes = _number(video.get("nb_frames"), int) or (keyframes or {}).get("packets")
+
+    info = {
+        "file_path": path,
+        "filename": os.path.basename(path),
+        "duration": duration,
+        "fps": fps,
+        "size": [width, height],
+        "width": width,
+        "height": height,
+        "aspect_ratio": round(width / height, 2) if height > 0 else None,
+        "nframes": nframes,
+        "bitrate": round(video_bitrate / 1000) if video_bitrate else None,
+        "codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+    }
+    info = {k: v for k, v in info.items() if v is not None or k in ("duration", "fps")}
+    if audio is not None:
+        audio_bitrate = _number(audio.get("bit_rate"), int)
+        audio_info = {
+            "has_audio": True,
+            "audio_duration": _number(audio.get("duration")) or duration,
+            "audio_fps": _number(audio.get("sample_rate"), int),
+            "audio_channels": audio.get("channels"),
+            "audio_bitrate": round(audio_bitrate / 1000) if audio_bitrate else None,
+            "audio_codec": audio.get("codec_name"),
+            "sample_rate": _number(audio.get("sample_rate"), int),
+        }
+        info.update({k: v for k, v in audio_info.items() if v is not None})
+    else:
+        info.update({"has_audio": False, "audio_duration": None, "audio_fps": None, "audio_channels": None})
+
+    file_size = _number(fmt.get("size"), int) or os.path.getsize(path)
+    info["file_size_bytes"] = file_size
+    info["file_size_mb"] = round(file_size / (1024 * 1024), 2)
+    if duration and duration > 0:
+        info["total_frames"] = int(fps * duration) if fps else None
+        info["average_bitrate_kbps"] = round((file_size * 8) / (duration * 1000), 2)
+
+    info["container"] = {k: v for k, v in {
+        "format_name": fmt.get("format_name"),
+        "format_long_name": fmt.get("format_long_name"),
+        "start_time": _number(fmt.get("start_time")),
+        "bit_rate": _number(fmt.get("bit_rate"), int),
+        "nb_streams": fmt.get("nb_streams"),
+        "tags": fmt.get("tags") or None,
+    }.items() if v is not None}
+    info["streams"] = [_stream_summary(st) for st in streams]
+    if keyframes is not None:
+        info["keyframes"] = keyframes
+    return info, probe_cached and keyframes_cached
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v", ".mpg", ".mpeg", ".ts", ".mts", ".m2ts", ".flv", ".wmv", ".3gp")
+
+
+def find_video_files(path_or_glob: str, recursive: bool = False) -> List[str]:
+    """Video files in a directory (by extension) or matching a glob pattern, sorted"""
+    if os.path.isdir(path_or_glob):
+        if recursive:
+            paths = [os.path.join(root, name) for root, _, names in os.walk(path_or_glob) for name in names]
+        else:
+            paths = [os.path.join(path_or_glob, name) for name in os.listdir(path_or_glob)]
+        paths = [p for p in paths if p.lower().endswith(VIDEO_EXTENSIONS)]
+    else:
+        paths = glob.glob(os.path.expanduser(path_or_glob), recursive=recursive)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def compact_record(path: str, include_keyframes: bool = False) -> Dict[str, Any]:
+    """Short per-file record for batch listings; failures are reported in the record"""
+    try:
+        info, cached = video_info(path, include_keyframes)
+    except Exception as e:
+        return {"path": path, "error": str(e), "error_type": type(e).__name__}
+    record = {
+        "path": path,
+        "duration": info.get("duration"),
+        "width": info.get("width"),
+        "height": info.get("height"),
+        "fps": round(info["fps"], 3) if info.get("fps") else None,
+        "codec": info.get("codec"),
+        "audio_codec": info.get("audio_codec"),
+        "size_bytes": info.get("file_size_bytes"),
+        "cached": cached,
+    }
+    if include_keyframes:
+        record["keyframes"] = info["keyframes"]["count"]
+        record["gop_seconds"] = (info["keyframes"]["gop_seconds"] or {}).get("mean")
+    return record
+
+
+def batch_video_info(paths: List[str], max_workers: int, include_keyframes: bool = False) -> List[Dict[str, Any]]:
+    """Compact records for many files, probed concurrently; results keep the order of paths"""
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(lambda path: compact_record(path, include_keyframes), paths))
+
+
+def summarize_records(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ok = [r for r in records if "error" not in r]
+    codecs = Counter(r["codec"] or "unknown" for r in ok)
+    resolutions = Counter(f"{r['width']}x{r['height']}" for r in ok)
+    return {
+        "files": len(records),
+        "failed": len(records) - len(ok),
+        "total_duration": round(sum(r["duration"] or 0 for r in ok), 3),
+        "total_size_bytes": sum(r["size_bytes"] or 0 for r in ok),
+        "codecs": dict(codecs.most_common()),
+        "resolutions": dict(resolutions.most_common()),
+        "cached": sum(1 for r in ok if r["cached"]),
+    }
@@ -0,0 +1,126 @@
+import os
+import uuid
+import hashlib
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+COLLISION_POLICIES = ("overwrite", "suffix", "fail")
+
+# Output paths handed out to calls still running, so two calls never pick the same new name
+_reserved: Set[str] = set()
+_lock = threading.Lock()
+
+# Collision policy of the tool call running on this thread and the paths it reserved
+_policy: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("collision_policy", default=None)
+_claims: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("output_claims", default=None)
+
+
+def output_dir() -> str:
+    # Use environment variable if set, otherwise default to Downloads
+    directory = os.environ.get("VIDEO_MCP_OUTPUT_DIR", str(Path.home() / "Downloads" / "video_mcp_output"))
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def default_collision_policy() -> str:
+    return os.environ.get("VIDEO_MCP_ON_COLLISION", "overwrite")
+
+
+def check_policy(policy: Optional[str]) -> str:
+    policy = policy or default_collision_policy()
+    if policy not in COLLISION_POLICIES:
+        raise ValueError(f"Unknown collision policy {policy!r}, expected one of {', '.join(COLLISION_POLICIES)}")
+    return policy
+
+
+def claim_output_path(filename: str) -> str:
+    """Output path for filename in the output folder under the current call's collision policy"""
+    return claim_path(os.path.join(output_dir(), filename))
+
+
+def claim_path(path: str) -> str:
+    """path (a file or a folder) under the current call's collision policy.
+
+    overwrite: the path as is. suffix: the first of name, name_1, name_2, ... that
+    neither exists nor is claimed by a running call. fail: FileExistsError if the
+    path exists or is claimed.
+    """
+    policy = check_policy(_policy.get())
+    with _lock:
+        if policy == "suffix":
+            stem, ext = os.path.splitext(path)
+            n = 0
+            while path in _reserved or os.path.exists(path):
+                n += 1
+                path = f"{stem}_{n}{ext}"
+        elif policy == "fail" and (path in _reserved or os.path.exists(path)):
+            raise FileExistsError(f"Output {path} already exists")
+        claims = _claims.get()
+        if claims is not None and path not in _reserved:
+            _reserved.add(path)
+            claims.append(path)
+    return path
+
+
+@contextmanager
+def output_call(policy: Optional[str] = None):
+    """Apply a collision policy to the outputs claimed inside the block and release them afterwards"""
+    policy_token = _policy.set(check_policy(policy))
+    claims: List[str] = []
+    claims_token = _claims.set(claims)
+    try:
+        yield
+    finally:
+        _claims.reset(claims_token)
+        _policy.reset(policy_token)
+        with _lock:
+            _reserved.difference_update(claims)
+
+
+@contextmanager
+def atomic_output(path: str):
+    """Yield a temp path next to `path`; it replaces `path` only if the block succeeds.
+
+    Readers never see a half-written file and a failed or cancelled render leaves
+    nothing behind. The temp name keeps the extension so encoders pick the same container.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    stem, ext = os.path.splitext(name)
+    tmp_path = os.path.join(directory, f".{stem}.{uuid.uuid4().hex[:12]}.partial{ext}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def file_checksum(path: str, algorithm: str = "sha256") -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def result_checksums(result: Dict) -> Optional[Dict[str, str]]:
+    """sha256 of every output file a successful tool result points at, and of the files in an output folder"""
+    paths = []
+    if result.get("output_path"):
+        paths.append(result["output_path"])
+    paths += [path for path in result.get("output_paths") or [] if isinstance(path, str)]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                files += sorted(entry.path for entry in entries if entry.is_file())
+        elif os.path.isfile(path):
+            files.append(path)
+    checksums = {path: file_checksum(path) for path in files}
+    return checksums or None
@@ -0,0 +1,225 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from typing import Dict, Any, Optional
+from proglog import ProgressBarLogger
+from .jobs import current_job, JobCancelled
+
+logger = logging.getLogger(__name__)
+
+# Where progress of the tool call running on this thread is sent, if the client asked for it
+_channel: contextvars.ContextVar[Optional["ProgressChannel"]] = contextvars.ContextVar("progress_channel", default=None)
+
+
+def _interval() -> float:
+    try:
+        return max(0.0, float(os.environ.get("VIDEO_MCP_PROGRESS_INTERVAL", 1.0)))
+    except ValueError:
+        return 1.0
+
+
+class ProgressChannel:
+    """MCP progress notifications for one request, sent from worker threads onto the server's event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, session, token, request_id):
+        self.loop = loop
+        self.session = session
+        self.token = token
+        self.request_id = request_id
+
+    @classmethod
+    def for_current_request(cls) -> Optional["ProgressChannel"]:
+        """Channel for the request being handled on this event loop, None if the client sent no progressToken"""
+        try:
+            from mcp.server.lowlevel.server import request_ctx
+            request = request_ctx.get()
+        except (ImportError, LookupError):
+            return None
+        token = request.meta.progressToken if request.meta else None
+        if token is None:
+            return None
+        return cls(asyncio.get_running_loop(), request.session, token, request.request_id)
+
+    def send(self, progress: float, total: Optional[float], message: str) -> None:
+        coro = self.session.send_progress_notification(
+            progress_token=self.token, progress=progress, total=total, message=message,
+            related_request_id=str(self.request_id),
+        )
+        try:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        except RuntimeError:
+            coro.close()
+
+
+def bind_channel(channel: Optional[ProgressChannel]) -> None:
+    _channel.set(channel)
+
+
+class RenderProgress:
+    """Throttled progress of one encode: frames done, achieved fps, ETA and bytes written.
+
+    Updates go to the request's MCP progress channel and, in a background job,
+    to the job's status. At most one update per VIDEO_MCP_PROGRESS_INTERVAL seconds
+    is emitted, plus the final one.
+    """
+
+    def __init__(self, output_path: Optional[str] = None):
+        self.output_path = output_path
+        self.channel = _channel.get()
+        self.job = current_job.get()
+        self.started = time.monotonic()
+        self.last_sent = 0.0
+        self.interval = _interval()
+
+    @property
+    def active(self) -> bool:
+        return self.channel is not None or self.job is not None
+
+    def _bytes_written(self) -> Optional[int]:
+        try:
+            return os.path.getsize(self.output_path) if self.output_path else None
+        except OSError:
+            return None
+
+    def update(self, phase: str, done: float, total: Optional[float], unit: str = "frames",
+               fps: Optional[float] = None, bytes_written: Optional[int] = None, frames: Optional[int] = None,
+               final: bool = False) -> None:
+        if not self.active:
+            return
+        now = time.monotonic()
+        if not final and now - self.last_sent < self.interval:
+            return
+        self.last_sent = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else None
+        if fps is None and unit == "frames":
+            fps = rate
+        eta = (total - done) / rate if total and rate else None
+        if bytes_written is None:
+            bytes_written = self._bytes_written()
+        info: Dict[str, Any] = {
+            "phase": phase,
+            unit + "_done": round(done, 3),
+            "total": round(total, 3) if total else None,
+            "percent": round(100.0 * done / total, 1) if total else None,
+            "fps": round(fps, 2) if fps else None,
+            "eta_seconds": round(max(0.0, eta), 1) if eta is not None else None,
+            "bytes_written": bytes_written,
+            "elapsed_seconds": round(elapsed, 1),
+        }
+        if frames is not None:
+            info["frames_done"] = frames
+        if self.job is not None:
+            self.job.progress = info
+        if self.channel is not None:
+            parts = [f"{phase}: {round(done)}/{round(total)} {unit}" if total else f"{phase}: {round(done)} {unit}"]
+            if frames is not None:
+                parts.append(f"{frames} frames")
+            if info["fps"]:
+                parts.append(f"{info['fps']} fps")
+            if info["eta_seconds"] is not None:
+                parts.append(f"ETA {info['eta_seconds']}s")
+            if bytes_written:
+                parts.append(f"{bytes_written} bytes")
+            self.channel.send(done, total, ", ".join(parts))
+
+
+class SegmentProgress:
+    """Sums the progress of segments encoded in parallel into one report for the whole output"""
+
+    def __init__(self, total: Optional[float], count: int):
+        self.progress = RenderProgress()
+        self.total = total
+        self.done = [0.0] * count
+        self.frames = [0] * count
+        self.bytes = [0] * count
+        self.finished = [False] * count
+        self.lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.progress.active
+
+    def part(self, index: int) -> "_SegmentPart":
+        return _SegmentPart(self, index)
+
+    def _record(self, index: int, done: float, frames: Optional[int], bytes_written: Optional[int], final: bool) -> None:
+        with self.lock:
+            self.done[index] = done
+            self.frames[index] = frames or self.frames[index]
+            self.bytes[index] = bytes_written or self.bytes[index]
+            self.finished[index] = self.finished[index] or final
+            frames_done = sum(self.frames)
+            elapsed = time.monotonic() - self.progress.started
+            self.progress.update("encode", sum(self.done), self.total, "seconds",
+                                 fps=frames_done / elapsed if elapsed > 0 else None,
+                                 bytes_written=sum(self.bytes), frames=frames_done,
+                                 final=False not in self.finished)
+
+
+class _SegmentPart:
+    def __init__(self, parent: SegmentProgress, index: int):
+        self.parent = parent
+        self.index = index
+
+    @property
+    def active(self) -> bool:
+        return self.parent.active
+
+    def update(self, phase: str, done: float, total: Optional[float], unit: str = "frames",
+               fps: Optional[float] = None, bytes_written: Optional[int] = None, frames: Optional[int] = None,
+               final: bool = False) -> None:
+        self.parent._record(self.index, done, frames, bytes_written, final)
+
+
+class RenderLogger(ProgressBarLogger):
+    """proglog logger for MoviePy writes: reports progress and aborts when the job is cancelled"""
+
+    # MoviePy's bar names: "chunk" while writing audio, "t" while writing frames
+    PHASES = {"chunk": ("audio", "chunks"), "t": ("video", "frames")}
+
+    def __init__(self, output_path: Optional[str] = None):
+        super().__init__()
+        self.progress = RenderProgress(output_path)
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        job = self.progress.job
+        if job is not None and job.cancel_requested.is_set():
+            raise JobCancelled(f"Job {job.id} was cancelled")
+        if attr != "index" or bar not in self.PHASES:
+            return
+        phase, unit = self.PHASES[bar]
+        total = self.bars[bar].get("total")
+        self.progress.update(phase, value, total, unit, final=bool(total) and value >= total)
+
+
+def moviepy_logger(output_path: Optional[str] = None, default="bar"):
+    """Logger to pass to MoviePy's write functions: reporting and cancel-aware when anyone listens, default otherwise"""
+    render_logger = RenderLogger(output_path)
+    return render_logger if render_logger.progress.active else default
+
+
+def follow_ffmpeg_progress(stream, progress: RenderProgress, duration: Optional[float], phase: str = "encode") -> None:
+    """Report the key=value blocks ffmpeg writes with `-progress pipe:1` until the stream ends"""
+    block: Dict[str, str] = {}
+    for raw in iter(stream.readline, b""):
+        key, _, value = raw.decode(errors="replace").strip().partition("=")
+        if key != "progress":
+            block[key] = value
+            continue
+        try:
+            seconds = max(0.0, int(block.get("out_time_us") or block.get("out_time_ms") or 0) / 1e6)
+        except ValueError:
+            seconds = 0.0
+        def number(name, cast):
+            try:
+                return cast(block[name])
+            except (KeyError, ValueError):
+                return None
+        progress.update(phase, seconds, duration, "seconds", fps=number("fps", float),
+                        bytes_written=number("total_size", int), frames=number("frame", int),
+                        final=value == "end")
+        block = {}
@@ -0,0 +1,387 @@
+import os
+import copy
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from moviepy.editor import VideoFileClip, AudioFileClip
+
+logger = logging.getLogger(__name__)
+
+# A reader this many frames behind the requested one decodes forward instead of seeking
+FORWARD_WINDOW = 100
+
+
+def _file_key(path: str) -> Tuple[str, int, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.environ.get(name)!r}, using {default}")
+        return default
+
+
+class _PooledVideoReader:
+    """Stands in for a clip's FFMPEG_VideoReader and serves frames from the pooled decoders of one file.
+
+    Each request goes to the decoder that can reach the frame by decoding forward;
+    otherwise another decoder is cloned from the probed one (up to the per-file
+    limit) so clips reading different parts of the file don't keep seeking.
+    With VIDEO_MCP_FRAME_CACHE_MB set, recently decoded frames are kept by frame
+    index (least recently used first out) so reading back and forth doesn't restart ffmpeg;
+    cached frames are read-only.
+    """
+
+    def __init__(self, reader, pool: "ReaderPool"):
+        self.filename = reader.filename
+        self.fps = reader.fps
+        self.size = reader.size
+        self.duration = reader.duration
+        self.nframes = reader.nframes
+        self.infos = reader.infos
+        self.decoders = [reader]
+        self.lock = threading.Lock()
+        self._pool = pool
+        self.cache: "OrderedDict[int, Any]" = OrderedDict()
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, index: int):
+        frame = self.cache.get(index)
+        if frame is None:
+            self.misses += 1
+            return None
+        self.cache.move_to_end(index)
+        self.hits += 1
+        return frame
+
+    def _remember(self, index: int, frame, budget: int) -> None:
+        if index in self.cache or frame.nbytes > budget:
+            return
+        # every later read of this index gets the same array, so nobody may modify it in place
+        frame.setflags(write=False)
+        self.cache[index] = frame
+        self.cache_bytes += frame.nbytes
+        while self.cache_bytes > budget:
+            _, evicted = self.cache.popitem(last=False)
+            self.cache_bytes -= evicted.nbytes
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "frames": len(self.cache),
+            "bytes": self.cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def _pick(self, t: float):
+        pos = int(self.fps * t + 0.00001) + 1
+        reachable = [d for d in self.decoders if d.proc is not None and d.pos <= pos <= d.pos + FORWARD_WINDOW]
+        if reachable:
+            return min(reachable, key=lambda d: pos - d.pos)
+        idle = [d for d in self.decoders if d.proc is None]
+        if idle:
+            return idle[0]
+        if len(self.decoders) < self._pool.max_decoders_per_file():
+            # cheap clone: same probe results, its own ffmpeg process once it reads
+            decoder = copy.copy(self.decoders[0])
+            decoder.proc = None
+            self.decoders.append(decoder)
+            return decoder
+        return min(self.decoders, key=lambda d: self._pool._last_used.get(id(d), 0))
+
+    def get_frame(self, t: float):
+        budget = self._pool.frame_cache_bytes()
+        # the frame MoviePy's reader shows at t
+        index = int(self.fps * t + 0.00001)
+        with self.lock:
+            if budget:
+                frame = self._cached(index)
+                if frame is not None:
+                    return frame
+            elif self.cache:
+                self.cache.clear()
+                self.cache_bytes = 0
+            decoder = self._pick(t)
+            if decoder.proc is None:
+                self._pool._make_room(self)
+            frame = decoder.get_frame(t)
+            self._pool._touch(decoder)
+            if budget:
+                self._remember(index, frame, budget)
+        return frame
+
+    def open_decoders(self) -> int:
+        return sum(1 for d in self.decoders if d.proc is not None)
+
+    def close_idle(self) -> None:
+        for decoder in self.decoders:
+            decoder.close()
+        self.cache.clear()
+        self.cache_bytes = 0
+
+    def close(self):
+        """Clips don't own pooled decoders; the pool closes them"""
+
+
+class _PooledAudioReader:
+    """Stands in for a clip's FFMPEG_AudioReader; one shared buffered decoder per file"""
+
+    def __init__(self, reader, pool: "ReaderPool"):
+        self.filename = reader.filename
+        self.fps = reader.fps
+        self.nchannels = reader.nchannels
+        self.duration = reader.duration
+        self.buffersize = reader.buffersize
+        self.decoders = [reader]
+        self.lock = threading.Lock()
+        self._pool = pool
+
+    def get_frame(self, tt):
+        decoder = self.decoders[0]
+        with self.lock:
+            if decoder.proc is None:
+                self._pool._make_room(self)
+                # reopen where the decoder left off so buffered reads continue seamlessly
+                decoder.initialize(decoder.pos / decoder.fps)
+            frame = decoder.get_frame(tt)
+            self._pool._touch(decoder)
+        return frame
+
+    def open_decoders(self) -> int:
+        return sum(1 for d in self.decoders if d.proc is not None)
+
+    def close_idle(self) -> None:
+        for decoder in self.decoders:
+            decoder.close_proc()
+
+    def close_proc(self):
+        """Clips don't own pooled decoders; the pool closes them"""
+
+    def close(self):
+        """Clips don't own pooled decoders; the pool closes them"""
+
+
+class ReaderPool:
+    """Shared ffmpeg readers keyed by file identity (path, size, mtime, inode).
+
+    A file is probed and opened once; every later load gets a cheap copy of the
+    clip whose frames come from the pooled decoders. The number of running
+    decoder processes is capped across the pool (VIDEO_MCP_MAX_DECODERS); the
+    least recently used one is stopped to make room and restarts on its next read.
+    """
+    _lock = threading.RLock()
+    _video: "OrderedDict[Tuple, Tuple[VideoFileClip, _PooledVideoReader]]" = OrderedDict()
+    _audio: "OrderedDict[Tuple, Tuple[AudioFileClip, _PooledAudioReader]]" = OrderedDict()
+    _last_used: Dict[int, float] = {}
+    # sources evicted from the tables while clips still read from them; dropped once those clips are gone
+    _evicted: "weakref.WeakSet" = weakref.WeakSet()
+    _stats = {"opened": 0, "reused": 0, "decoders_stopped": 0}
+
+    @classmethod
+    def max_decoders(cls) -> int:
+        return max(1, _env_int("VIDEO_MCP_MAX_DECODERS", 8))
+
+    @classmethod
+    def max_decoders_per_file(cls) -> int:
+        return max(1, _env_int("VIDEO_MCP_MAX_DECODERS_PER_FILE", 2))
+
+    @classmethod
+    def max_files(cls) -> int:
+        return max(1, _env_int("VIDEO_MCP_POOL_MAX_FILES", 32))
+
+    @classmethod
+    def frame_cache_bytes(cls) -> int:
+        """Per-file budget for decoded video frames, 0 (the default) disables the cache"""
+        return max(0, _env_int("VIDEO_MCP_FRAME_CACHE_MB", 0)) * 1024 * 1024
+
+    @classmethod
+    def _touch(cls, decoder) -> None:
+        cls._last_used[id(decoder)] = time.monotonic()
+
+    @classmethod
+    def _sources(cls) -> List[Any]:
+        """Every source whose decoders count against the cap, evicted ones still in use included"""
+        tables = [reader for _, reader in cls._video.values()] + [reader for _, reader in cls._audio.values()]
+        return tables + [source for source in list(cls._evicted) if source not in tables]
+
+    @classmethod
+    def _make_room(cls, requester, starting: int = 1) -> None:
+        """Stop least recently used decoders until `starting` more fit under the cap"""
+        with cls._lock:
+            while sum(source.open_decoders() for source in cls._sources()) + starting > cls.max_decoders():
+                victims = []
+                for source in cls._sources():
+                    for decoder in source.decoders:
+                        if decoder.proc is not None:
+                            victims.append((cls._last_used.get(id(decoder), 0), id(decoder), source, decoder))
+                stopped = False
+                for _, _, source, decoder in sorted(victims, key=lambda v: v[:2]):
+                    # the requester's lock is already held by this thread; skip sources busy in another thread
+                    if source is not requester and not source.lock.acquire(blocking=False):
+                        continue
+                    try:
+                        if isinstance(source, _PooledVideoReader):
+                            decoder.close()
+                        else:
+                            decoder.close_proc()
+                    finally:
+                        if source is not requester:
+                            source.lock.release()
+                    cls._stats["decoders_stopped"] += 1
+                    stopped = True
+                    break
+                if not stopped:
+                    return
+
+    @classmethod
+    def _evict_files(cls, table: OrderedDict) -> None:
+        while len(table) > cls.max_files():
+            _, (_, source) = table.popitem(last=False)
+            # clips still holding the source keep reading from it, so its decoders stay under the cap
+            cls._evicted.add(source)
+        cls._close_evicted()
+
+    @classmethod
+    def _close_evicted(cls) -> None:
+        """Stop the decoders of evicted sources that no read is using right now"""
+        for source in list(cls._evicted):
+            if source.open_decoders() and source.lock.acquire(blocking=False):
+                try:
+                    source.close_idle()
+                finally:
+                    source.lock.release()
+
+    @classmethod
+    def _shared_audio(cls, path: str) -> Tuple[AudioFileClip, _PooledAudioReader]:
+        key = _file_key(path)
+        with cls._lock:
+            if key in cls._audio:
+                cls._audio.move_to_end(key)
+                cls._stats["reused"] += 1
+                return cls._audio[key]
+        prototype = AudioFileClip(path)
+        with cls._lock:
+            if key not in cls._audio:
+                cls._audio[key] = (prototype, _PooledAudioReader(prototype.reader, cls))
+                cls._stats["opened"] += 1
+                cls._make_room(None, starting=0)
+                cls._evict_files(cls._audio)
+            else:
+                prototype.close()
+            return cls._audio[key]
+
+    @classmethod
+    def _audio_clone(cls, prototype: AudioFileClip, shared: _PooledAudioReader) -> AudioFileClip:
+        clip = prototype.copy()
+        clip.reader = shared
+        clip.make_frame = shared.get_frame
+        return clip
+
+    @classmethod
+    def audio_clip(cls, path: str) -> AudioFileClip:
+        """AudioFileClip for path backed by the shared decoder"""
+        return cls._audio_clone(*cls._shared_audio(path))
+
+    @classmethod
+    def video_clip(cls, path: str) -> VideoFileClip:
+        """VideoFileClip for path backed by pooled decoders, probing the file only on first use"""
+        key = _file_key(path)
+        with cls._lock:
+            entry = cls._video.get(key)
+            if entry is not None:
+                cls._video.move_to_end(key)
+                cls._stats["reused"] += 1
+        if entry is None:
+            prototype = VideoFileClip(path, audio=False)
+            with cls._lock:
+                if key not in cls._video:
+                    cls._video[key] = (prototype, _PooledVideoReader(prototype.reader, cls))
+                    cls._stats["opened"] += 1
+                    cls._make_room(None, starting=0)
+                    cls._evict_files(cls._video)
+                else:
+                    prototype.close()
+                entry = cls._video[key]
+        prototype, shared = entry
+        clip = prototype.copy()
+        clip.reader = shared
+        clip.make_frame = shared.get_frame
+        if shared.infos.get("audio_found"):
+            clip.audio = cls.audio_clip(path)
+        return clip
+
+    @classmethod
+    def source_video(cls, clip) -> Optional[str]:
+        """Path of the file an unedited pooled video clip reads from, None once its frames are edited"""
+        shared = getattr(clip, "reader", None)
+        if not isinstance(shared, _PooledVideoReader) or clip.make_frame != shared.get_frame:
+            return None
+        return shared.filename
+
+    @classmethod
+    def source_audio(cls, clip) -> Optional[str]:
+        """Path of the file whose audio clip plays unchanged and in full, None if the audio was edited"""
+        audio = getattr(clip, "audio", None)
+        shared = getattr(audio, "reader", None)
+        if not isinstance(shared, _PooledAudioReader) or audio.make_frame != shared.get_frame:
+            return None
+        if audio.start or audio.duration is None or abs(audio.duration - shared.duration) > 1e-3:
+            return None
+        if clip.duration is None or abs(clip.duration - audio.duration) > 1e-3:
+            return None
+        return shared.filename
+
+    @classmethod
+    def describe(cls) -> Dict[str, Any]:
+        with cls._lock:
+            files = []
+            for kind, table in (("video", cls._video), ("audio", cls._audio)):
+                for key, (_, source) in table.items():
+                    entry = {
+                        "path": key[0],
+                        "kind": kind,
+                        "decoders": len(source.decoders),
+                        "running_decoders": source.open_decoders(),
+                    }
+                    if kind == "video":
+                        entry["frame_cache"] = source.cache_stats()
+                    files.append(entry)
+            caches = [f["frame_cache"] for f in files if "frame_cache" in f]
+            hits = sum(c["hits"] for c in caches)
+            lookups = hits + sum(c["misses"] for c in caches)
+            return {
+                "files": files,
+                "running_decoders": sum(source.open_decoders() for source in cls._sources()),
+                "evicted_in_use": len(cls._evicted),
+                "max_decoders": cls.max_decoders(),
+                "frame_cache": {
+                    "budget_bytes_per_file": cls.frame_cache_bytes(),
+                    "bytes": sum(c["bytes"] for c in caches),
+                    "hits": hits,
+                    "hit_rate": round(hits / lookups, 3) if lookups else None,
+                },
+                **cls._stats,
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            sources = cls._sources()
+            cls._video.clear()
+            cls._audio.clear()
+            cls._evicted.clear()
+            cls._last_used.clear()
+        # a reader mid-read holds its lock and may need cls._lock to make room, so never wait on it while holding cls._lock
+        for source in sources:
+            with source.lock:
+                source.close_idle()
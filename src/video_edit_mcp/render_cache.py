@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the meaning of a recipe changes so stale entries stop matching
+CACHE_VERSION = 2
+
+
+def _file_identity(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class RenderCache:
+    """Content-addressed cache of rendered outputs.
+
+    Entries are keyed by the identity of every input file (path, size, mtime)
+    plus a normalized recipe (operation chain and encode settings). Rendered
+    files live in VIDEO_MCP_CACHE_DIR, capped at VIDEO_MCP_CACHE_MAX_MB and
+    evicted least-recently-used first. The cache is off unless
+    VIDEO_MCP_CACHE_MAX_MB is set above 0.
+    """
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_served": 0}
+
+    @classmethod
+    def directory(cls) -> str:
+        return os.environ.get("VIDEO_MCP_CACHE_DIR", str(Path.home() / ".cache" / "video_mcp" / "renders"))
+
+    @classmethod
+    def max_bytes(cls) -> int:
+        return int(float(os.environ.get("VIDEO_MCP_CACHE_MAX_MB", "0")) * 1024 * 1024)
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls.max_bytes() > 0
+
+    @classmethod
+    def key(cls, inputs: List[str], recipe: Dict[str, Any], output_path: str) -> Optional[str]:
+        """Cache key for rendering `recipe` from `inputs` into output_path's container, None if it can't be cached"""
+        if not cls.enabled() or not all(os.path.isfile(path) for path in inputs):
+            return None
+        payload = {
+            "version": CACHE_VERSION,
+            "inputs": [_file_identity(path) for path in inputs],
+            "recipe": recipe,
+            "container": os.path.splitext(output_path)[1].lower(),
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    @classmethod
+    def _entry_paths(cls, key: str, output_path: str) -> Tuple[str, str]:
+        ext = os.path.splitext(output_path)[1].lower()
+        base = os.path.join(cls.directory(), key)
+        return base + ext, base + ".json"
+
+    @classmethod
+    def fetch(cls, key: Optional[str], output_path: str) -> Optional[Dict[str, Any]]:
+        """Copy a cached render to output_path and return its metadata, None on a miss"""
+        if key is None:
+            return None
+        media_path, meta_path = cls._entry_paths(key, output_path)
+        tmp_path = f"{output_path}.cache-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            shutil.copyfile(media_path, tmp_path)
+            os.replace(tmp_path, output_path)
+            os.utime(media_path)
+        except (OSError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with cls._lock:
+                cls._stats["misses"] += 1
+            return None
+        with cls._lock:
+            cls._stats["hits"] += 1
+            cls._stats["bytes_served"] += os.path.getsize(output_path)
+        logger.info(f"Render cache hit for {output_path}")
+        return meta
+
+    @classmethod
+    def put(cls, key: Optional[str], output_path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """Copy a fresh render into the cache, then evict down to the disk budget"""
+        if key is None:
+            return
+        try:
+            size = os.path.getsize(output_path)
+            if size > cls.max_bytes():
+                return
+            os.makedirs(cls.directory(), exist_ok=True)
+            media_path, meta_path = cls._entry_paths(key, output_path)
+            tmp_path = f"{media_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            shutil.copyfile(output_path, tmp_path)
+            os.replace(tmp_path, media_path)
+            with open(meta_path, "w") as f:
+                json.dump(meta or {}, f, default=str)
+            with cls._lock:
+                cls._stats["stores"] += 1
+            cls.evict()
+        except OSError as e:
+            logger.warning(f"Could not cache render {output_path}: {e}")
+
+    @classmethod
+    def _entries(cls) -> List[Tuple[float, int, str]]:
+        """(last used, size, media path) for every cached render"""
+        directory = cls.directory()
+        if not os.path.isdir(directory):
+            return []
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".json") or ".tmp-" in name or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    @classmethod
+    def _remove(cls, media_path: str) -> None:
+        for path in (media_path, os.path.splitext(media_path)[0] + ".json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def evict(cls, max_bytes: Optional[int] = None) -> int:
+        """Drop least-recently-used entries until the cache fits; returns entries removed"""
+        budget = cls.max_bytes() if max_bytes is None else max_bytes
+        with cls._lock:
+            entries = sorted(cls._entries())
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in entries:
+                if total <= budget:
+                    break
+                cls._remove(path)
+                total -= size
+                removed += 1
+            cls._stats["evictions"] += removed
+        return removed
+
+    @classmethod
+    def purge(cls, older_than_hours: Optional[float] = None) -> Dict[str, int]:
+        """Remove all entries, or only those unused for the given number of hours"""
+        cutoff = time.time() - older_than_hours * 3600 if older_than_hours is not None else None
+        removed = 0
+        freed = 0
+        with cls._lock:
+            for last_used, size, path in cls._entries():
+                if cutoff is None or last_used < cutoff:
+                    cls._remove(path)
+                    removed += 1
+                    freed += size
+        return {"removed_entries": removed, "freed_bytes": freed}
+
+    @classmethod
+    def info(cls) -> Dict[str, Any]:
+        entries = cls._entries()
+        with cls._lock:
+            stats = dict(cls._stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "enabled": cls.enabled(),
+            "directory": cls.directory(),
+            "max_bytes": cls.max_bytes(),
+            "used_bytes": sum(size for _, size, _ in entries),
+            "entries": len(entries),
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else None,
+            **stats
+        }
@@ -1,8 +1,12 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from moviepy.editor import VideoFileClip, AudioFileClip
 import os
 import logging
 from .utils import VideoStore, AudioStore
+from .render_cache import RenderCache
+from .media_info import MetadataCache
+from .reader_pool import ReaderPool
+from .jobs import JobManager
 
 logger = logging.getLogger(__name__)
 
@@ -17,27 +21,22 @@ def register_util_tools(mcp):
             store_type: Type of store to check ("video", "audio", or "both")
         """
         try:
-            if store_type.lower() == "video":
-                return {
-                    "success": True,
-                    "video_memory": VideoStore._store,
-                    "video_count": len(VideoStore._store)
-                }
-            elif store_type.lower() == "audio":
-                return {
-                    "success": True,
-                    "audio_memory": AudioStore._store,
-                    "audio_count": len(AudioStore._store)
-                }
-            else:  # both or any other value
-                return {
-                    "success": True,
-                    "video_memory": VideoStore._store,
-                    "audio_memory": AudioStore._store,
-                    "video_count": len(VideoStore._store),
-                    "audio_count": len(AudioStore._store),
-                    "total_objects": len(VideoStore._store) + len(AudioStore._store)
-                }
+            store_type = store_type.lower() if store_type.lower() in ("video", "audio") else "both"
+            result = {"success": True}
+            if store_type in ("video", "both"):
+                video = VideoStore.describe()
+                result.update({"video_memory": video["entries"], "video_tree": video["tree"], "video_count": video["count"],
+                               "video_estimated_bytes": video["estimated_bytes"], "video_open_readers": video["open_readers"],
+                               "limits": video["limits"]})
+            if store_type in ("audio", "both"):
+                audio = AudioStore.describe()
+                result.update({"audio_memory": audio["entries"], "audio_tree": audio["tree"], "audio_count": audio["count"],
+                               "audio_estimated_bytes": audio["estimated_bytes"], "audio_open_readers": audio["open_readers"],
+                               "limits": audio["limits"]})
+            if store_type == "both":
+                result["total_objects"] = result["video_count"] + result["audio_count"]
+            result["reader_pool"] = ReaderPool.describe()
+            return result
         except Exception as e:
             logger.error(f"Error checking memory: {e}")
             return {
@@ -54,6 +53,9 @@ def register_util_tools(mcp):
                 VideoStore.clear()
             if clear_audios:
                 AudioStore.clear()
+            if clear_videos or clear_audios:
+                # stop pooled decoders too; clips that still use them restart them on demand
+                ReaderPool.clear()
             return {
                 "success": True,
                 "message": f"Memory cleared - Videos: {clear_videos}, Audios: {clear_audios}"
@@ -67,6 +69,104 @@ def register_util_tools(mcp):
                 "message": "Error clearing memory"
             }
 
+    @mcp.tool(description="Use this tool to pin a stored video or audio object so it is never evicted from memory while still needed, or to unpin it once done (pinned=False)")
+    def pin_memory(object_ref: str, pinned: bool = True) -> Dict[str, Any]:
+        try:
+            store = VideoStore if object_ref in VideoStore._store else AudioStore
+            if pinned:
+                store.pin(object_ref)
+            else:
+                store.unpin(object_ref)
+            return {
+                "success": True,
+                "message": f"Object {object_ref} {'pinned' if pinned else 'unpinned'}"
+            }
+        except Exception as e:
+            logger.error(f"Error pinning object {object_ref}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error pinning object"
+            }
+
+    @mcp.tool(description="Use this tool to inspect the render cache: location, disk usage and budget, number of entries and hit/miss counters, plus the probe metadata cache (database, rows, entries in memory, memory/disk hits and misses)")
+    def check_render_cache() -> Dict[str, Any]:
+        try:
+            return {
+                "success": True,
+                **RenderCache.info(),
+                "metadata_cache": MetadataCache.info()
+            }
+        except Exception as e:
+            logger.error(f"Error checking render cache: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error checking render cache"
+            }
+
+    @mcp.tool(description="Use this tool to purge the render cache, optionally only entries not used for older_than_hours hours")
+    def purge_render_cache(older_than_hours: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            return {
+                "success": True,
+                **RenderCache.purge(older_than_hours),
+                "message": "Render cache purged"
+            }
+        except Exception as e:
+            logger.error(f"Error purging render cache: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error purging render cache"
+            }
+
+    @mcp.tool(description="Use this tool to check a background render job: status (queued, running, succeeded, failed, cancelled), timings and, once finished, the render's result")
+    def get_job_status(job_id: str) -> Dict[str, Any]:
+        try:
+            return {
+                "success": True,
+                **JobManager.get(job_id).describe()
+            }
+        except KeyError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": "KeyError",
+                "message": "Unknown job id"
+            }
+
+    @mcp.tool(description="Use this tool to cancel a queued or running background render job; its ffmpeg process is stopped and the partial output removed")
+    def cancel_job(job_id: str) -> Dict[str, Any]:
+        try:
+            job = JobManager.cancel(job_id)
+            return {
+                "success": True,
+                **job.describe(),
+                "message": f"Cancellation requested for job {job_id}" if job.finished_at is None else f"Job {job_id} already {job.status}"
+            }
+        except KeyError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": "KeyError",
+                "message": "Unknown job id"
+            }
+
+    @mcp.tool(description="Use this tool to list background render jobs, optionally only those with a given status")
+    def list_jobs(status: Optional[str] = None) -> Dict[str, Any]:
+        jobs = [job.describe() for job in JobManager.list(status)]
+        for job in jobs:
+            job.pop("result", None)
+        return {
+            "success": True,
+            "jobs": jobs,
+            "count": len(jobs)
+        }
+
     @mcp.tool(description="Use this tool for listing files in a directory, provide directory path")
     def list_files(directory_path: str) -> Dict[str, Any]:
         try:
@@ -2,56 +2,582 @@
 import os
 from pathlib import Path
 import uuid
-from moviepy.editor import VideoFileClip, AudioFileClip
+import time
+import threading
+import atexit
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+import numpy as np
+from moviepy.Clip import Clip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.audio.io.readers import FFMPEG_AudioReader
 from PIL import Image, ImageDraw, ImageFont
+from moviepy.tools import find_extension
+import shutil
 import tempfile
 import logging
+from typing import Optional, Dict, Any, List, Set
+from .edit_graph import EditGraph
+from .ffmpeg_utils import get_ffprobe_binary, audio_codecs, can_copy_audio, copy_audio_stream
+from .media_info import cached_probe
+from .reader_pool import ReaderPool, _PooledVideoReader, _PooledAudioReader
+from .frames import FrameSequence
+from .concurrency import render_slot
+from .progress import moviepy_logger
+from .encoding import moviepy_kwargs, current_settings
+from .outputs import claim_output_path, atomic_output
 
 logger = logging.getLogger(__name__)
 
 def get_output_path(filename: str) -> str:
-    """Get cross-platform output path for files"""
-    # Use environment variable if set, otherwise default to Downloads
-    output_dir = os.environ.get("VIDEO_MCP_OUTPUT_DIR", str(Path.home() / "Downloads" / "video_mcp_output"))
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    return os.path.join(output_dir, filename)
+    """Get cross-platform output path for files, applying the call's collision policy"""
+    return claim_output_path(filename)
 
-class VideoStore:
-    _store = {}
+# RAM-backed scratch space needs at least this much free room to be used by default
+SHM_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+
+def get_scratch_dir() -> str:
+    """Directory for render-time temp files: VIDEO_MCP_SCRATCH_DIR, else /dev/shm when it has room, else the system temp dir"""
+    scratch = os.environ.get("VIDEO_MCP_SCRATCH_DIR")
+    if scratch:
+        Path(scratch).mkdir(parents=True, exist_ok=True)
+        return scratch
+    shm = "/dev/shm"
+    try:
+        if os.access(shm, os.W_OK) and shutil.disk_usage(shm).free >= SHM_MIN_FREE_BYTES:
+            return shm
+    except OSError:
+        pass
+    return tempfile.gettempdir()
+
+
+def scratch_space(prefix: str = "video_mcp_"):
+    """Private temp directory in the scratch dir, removed when the block exits for any reason"""
+    return tempfile.TemporaryDirectory(prefix=prefix, dir=get_scratch_dir())
+
+
+_object_dir: Optional[str] = None
+_object_dir_lock = threading.Lock()
+
+
+def object_file_path(filename: str) -> str:
+    """Unique path for a file that only backs a stored object, kept out of the output folder.
+
+    The files live in a per-process directory in the scratch dir; pass them to
+    VideoStore.store(files=...) so they are deleted with the object, and the
+    directory itself goes when the server exits.
+    """
+    global _object_dir
+    with _object_dir_lock:
+        if _object_dir is None or not os.path.isdir(_object_dir):
+            _object_dir = tempfile.mkdtemp(prefix="video_mcp_objects_", dir=get_scratch_dir())
+            atexit.register(shutil.rmtree, _object_dir, True)
+    return os.path.join(_object_dir, f"{uuid.uuid4().hex[:12]}_{os.path.basename(filename)}")
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.environ.get(name)!r}, using {default}")
+        return default
+
+
+_POOLED_READERS = (_PooledVideoReader, _PooledAudioReader)
+
+
+def _is_reader(obj) -> bool:
+    return isinstance(obj, (FFMPEG_VideoReader, FFMPEG_AudioReader, *_POOLED_READERS))
+
+
+def _collect_resources(obj, readers: Dict[int, Any], arrays: Dict[int, int], seen: Set[int], depth: int = 0) -> None:
+    """Find the ffmpeg readers and image arrays a clip (or anything derived from it) keeps alive.
+
+    Every object visited is added to `seen`, which is how stored parents of a derived clip are found.
+    """
+    if obj is None or id(obj) in seen or depth > 64:
+        return
+    seen.add(id(obj))
+    if _is_reader(obj):
+        readers[id(obj)] = obj
+        return
+    if isinstance(obj, np.ndarray):
+        arrays[id(obj)] = obj.nbytes
+        return
+    if isinstance(obj, (list, tuple)):
+        for item in obj:
+            _collect_resources(item, readers, arrays, seen, depth + 1)
+        return
+    if callable(obj) and getattr(obj, "__closure__", None):
+        # fl()/fx() derived clips reference their parent through the make_frame closure
+        for cell in obj.__closure__:
+            try:
+                _collect_resources(cell.cell_contents, readers, arrays, seen, depth + 1)
+            except ValueError:
+                continue
+        return
+    if isinstance(obj, FrameSequence):
+        # a lazy frame extraction decodes from its clip on demand
+        _collect_resources(obj.clip, readers, arrays, seen, depth + 1)
+        return
+    if isinstance(getattr(obj, "__self__", None), Clip):
+        _collect_resources(obj.__self__, readers, arrays, seen, depth + 1)
+        return
+    if isinstance(obj, Clip):
+        for attr in ("reader", "audio", "mask", "clips", "clip", "img", "make_frame"):
+            _collect_resources(getattr(obj, attr, None), readers, arrays, seen, depth + 1)
+
+
+def _open_decoders(reader) -> int:
+    """Running ffmpeg processes behind a reader; a pooled reader may run several"""
+    if isinstance(reader, _POOLED_READERS):
+        return reader.open_decoders()
+    return 1 if getattr(reader, "proc", None) is not None else 0
+
+
+def _reader_bytes(reader) -> int:
+    if isinstance(reader, _PooledVideoReader):
+        width, height = reader.size
+        return 2 * width * height * 3 * reader.open_decoders() + reader.cache_bytes
+    if isinstance(reader, _PooledAudioReader):
+        return sum(_reader_bytes(decoder) for decoder in reader.decoders)
+    if isinstance(reader, FFMPEG_VideoReader):
+        width, height = reader.size
+        # last decoded frame plus the pipe buffer
+        return 2 * width * height * reader.depth
+    buffer = getattr(reader, "buffer", None)
+    return buffer.nbytes if buffer is not None else 0
+
+
+def _close_reader(reader) -> None:
+    try:
+        if isinstance(reader, _POOLED_READERS):
+            # stop the pooled decoders (they restart on the next read); a reader busy in a render stays up
+            if reader.lock.acquire(blocking=False):
+                try:
+                    reader.close_idle()
+                finally:
+                    reader.lock.release()
+        elif isinstance(reader, FFMPEG_VideoReader):
+            reader.close()
+        else:
+            reader.close_proc()
+            reader.buffer = None
+    except Exception as e:
+        logger.warning(f"Error closing reader for {getattr(reader, 'filename', '?')}: {e}")
+
+
+class _Resources:
+    """Readers and arrays held by a set of stored objects"""
+
+    def __init__(self, objects=()):
+        self.readers: Dict[int, Any] = {}
+        self.arrays: Dict[int, int] = {}
+        self.seen: Set[int] = set()
+        for obj in objects:
+            _collect_resources(obj, self.readers, self.arrays, self.seen)
+
+    def bytes(self, exclude: Optional["_Resources"] = None) -> int:
+        skip_readers = exclude.readers if exclude else {}
+        skip_arrays = exclude.arrays if exclude else {}
+        return (sum(_reader_bytes(r) for key, r in self.readers.items() if key not in skip_readers)
+                + sum(size for key, size in self.arrays.items() if key not in skip_arrays))
+
+    def open_readers(self) -> int:
+        return sum(_open_decoders(r) for r in self.readers.values())
+
+
+class _ClipStore:
+    """LRU store of clips shared by the video and audio stores.
+
+    Bounded by entry count, estimated bytes and open ffmpeg readers, with an
+    idle TTL per entry. Derived clips record the stored clips they were built
+    from: releasing a parent that still has live children only marks it
+    released, and it is dropped once its last child goes. Readers are closed
+    only when no remaining entry in either store uses them. Pinned refs are
+    never evicted.
+    """
+    _kind = "clip"
+    _stores = []
+    _store: "OrderedDict[str, Any]"
+    _meta: Dict[str, Dict[str, Any]]
+    _evicted: "OrderedDict[str, str]"
+    # one lock for both stores, since releasing a reader checks every store
+    _lock = threading.RLock()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _ClipStore._stores.append(cls)
 
     @classmethod
-    def store(cls, video_clip) -> str:
+    def limits(cls) -> Dict[str, float]:
+        return {
+            "max_entries": int(_env_number("VIDEO_MCP_STORE_MAX_ENTRIES", 64)),
+            "max_bytes": int(_env_number("VIDEO_MCP_STORE_MAX_MB", 2048) * 1024 * 1024),
+            "max_open_readers": int(_env_number("VIDEO_MCP_STORE_MAX_READERS", 32)),
+            "ttl_seconds": _env_number("VIDEO_MCP_STORE_TTL_SECONDS", 3600),
+        }
+
+    @classmethod
+    def _new_clip(cls, path: str):
+        raise NotImplementedError
+
+    @classmethod
+    def store(cls, clip, parents: Optional[List[str]] = None, files: Optional[List[str]] = None) -> str:
+        """Store clip and return its ref.
+
+        Stored clips it was derived from are detected automatically; `parents`
+        adds refs the clip depends on in ways that can't be seen from its frames.
+        `files` are deleted once the clip is dropped from the store.
+        """
         ref = str(uuid.uuid4())
-        cls._store[ref] = video_clip
+        now = time.time()
+        with cls._lock:
+            reachable = _Resources([clip]).seen
+            found = {r for r, obj in cls._store.items() if id(obj) in reachable}
+            found.update(p for p in (parents or []) if p in cls._store)
+            # keep only the nearest stored ancestors
+            ancestors = set()
+            for parent in found:
+                ancestors |= cls._ancestors(parent)
+            direct = sorted(found - ancestors)
+            cls._store[ref] = clip
+            cls._meta[ref] = {"stored_at": now, "last_used": now, "pins": 0,
+                              "parents": direct, "children": set(), "released": None, "files": list(files or [])}
+            for parent in direct:
+                cls._meta[parent]["children"].add(ref)
+            cls._enforce_limits()
         return ref
 
     @classmethod
-    def load(cls, video_ref: str):
-        if video_ref in cls._store:
-            return cls._store[video_ref]
-        return VideoFileClip(video_ref)
-    
+    def _ancestors(cls, ref: str) -> Set[str]:
+        result = set()
+        stack = list(cls._meta[ref]["parents"])
+        while stack:
+            parent = stack.pop()
+            if parent not in result and parent in cls._meta:
+                result.add(parent)
+                stack.extend(cls._meta[parent]["parents"])
+        return result
+
     @classmethod
-    def clear(cls):
-        cls._store.clear()
-    
-class AudioStore:
-    _store = {}
+    def _descendants(cls, ref: str) -> Set[str]:
+        result = set()
+        stack = list(cls._meta[ref]["children"])
+        while stack:
+            child = stack.pop()
+            if child not in result and child in cls._meta:
+                result.add(child)
+                stack.extend(cls._meta[child]["children"])
+        return result
 
     @classmethod
-    def store(cls, audio_clip) -> str:
-        ref = str(uuid.uuid4())
-        cls._store[ref] = audio_clip
-        return ref
-    
+    def _get(cls, ref: str):
+        """Stored object for ref (marking it recently used), or None if ref isn't stored"""
+        with cls._lock:
+            cls._expire()
+            if ref in cls._store:
+                cls._store.move_to_end(ref)
+                meta = cls._meta[ref]
+                meta["last_used"] = time.time()
+                # a ref used again is live again, not just kept for its children
+                meta["released"] = None
+                return cls._store[ref]
+            if ref in cls._evicted:
+                raise KeyError(f"Stored {cls._kind} {ref} was evicted ({cls._evicted[ref]}); "
+                               f"re-run the step that produced it or pin refs that are still needed")
+        return None
+
+    @classmethod
+    def load(cls, ref: str):
+        stored = cls._get(ref)
+        return stored if stored is not None else cls._new_clip(ref)
+
     @classmethod
-    def load(cls, audio_ref: str):
-        if audio_ref in cls._store:
-            return cls._store[audio_ref]
-        return AudioFileClip(audio_ref)
-    
+    def pin(cls, ref: str) -> None:
+        with cls._lock:
+            if ref not in cls._store:
+                raise KeyError(f"No stored {cls._kind} with ref {ref}")
+            cls._meta[ref]["pins"] += 1
+            cls._meta[ref]["released"] = None
+
+    @classmethod
+    def unpin(cls, ref: str) -> None:
+        with cls._lock:
+            if ref in cls._meta and cls._meta[ref]["pins"] > 0:
+                cls._meta[ref]["pins"] -= 1
+                cls._enforce_limits()
+
+    @classmethod
+    @contextmanager
+    def pinned(cls, *refs: str):
+        """Keep the given stored refs from being evicted while the block runs"""
+        with cls._lock:
+            held = [ref for ref in refs if ref in cls._store]
+            for ref in held:
+                cls.pin(ref)
+        try:
+            yield
+        finally:
+            for ref in held:
+                cls.unpin(ref)
+
+    @classmethod
+    def _release(cls, ref: str, reason: str) -> None:
+        """Release ref: keep it for live children, otherwise drop it and close readers nothing else uses"""
+        meta = cls._meta.get(ref)
+        if meta is None:
+            return
+        if meta["children"]:
+            if meta["released"] is None:
+                meta["released"] = reason
+                logger.info(f"Stored {cls._kind} {ref} released ({reason}), kept for {len(meta['children'])} child object(s)")
+            return
+        obj = cls._store.pop(ref)
+        cls._meta.pop(ref)
+        cls._evicted[ref] = reason
+        while len(cls._evicted) > 1024:
+            cls._evicted.popitem(last=False)
+        resources = _Resources([obj])
+        remaining = _Resources([o for store in _ClipStore._stores for o in store._store.values()])
+        closed = [r for key, r in resources.readers.items() if key not in remaining.readers]
+        for reader in closed:
+            _close_reader(reader)
+        logger.info(f"Dropped stored {cls._kind} {ref} ({reason}), closed {len(closed)} reader(s)")
+        for path in meta.get("files", []):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove {path} backing stored {cls._kind} {ref}: {e}")
+        # parents that were only kept alive for this child go too
+        for parent in meta["parents"]:
+            parent_meta = cls._meta.get(parent)
+            if parent_meta is None:
+                continue
+            parent_meta["children"].discard(ref)
+            if parent_meta["released"] is not None and not parent_meta["children"]:
+                cls._release(parent, parent_meta["released"])
+
+    @classmethod
+    def _expire(cls) -> None:
+        ttl = cls.limits()["ttl_seconds"]
+        if ttl <= 0:
+            return
+        cutoff = time.time() - ttl
+        expired = [r for r, m in cls._meta.items()
+                   if m["last_used"] < cutoff and not m["pins"] and m["released"] is None]
+        for ref in expired:
+            cls._release(ref, "idle longer than ttl")
+
+    @classmethod
+    def _enforce_limits(cls) -> None:
+        cls._expire()
+        limits = cls.limits()
+        # walk the store once, counting the entries holding each reader and array, so an eviction
+        # subtracts what it frees instead of walking every remaining entry again
+        held = {ref: _Resources([obj]) for ref, obj in cls._store.items()}
+        holders = Counter()
+        costs: Dict[int, tuple] = {}
+        for resources in held.values():
+            holders.update(resources.readers.keys())
+            holders.update(resources.arrays.keys())
+            costs.update((key, (_reader_bytes(r), _open_decoders(r))) for key, r in resources.readers.items())
+            costs.update((key, (size, 0)) for key, size in resources.arrays.items())
+        total_bytes = sum(size for size, _ in costs.values())
+        open_readers = sum(decoders for _, decoders in costs.values())
+        while cls._store:
+            # never evict the most recently stored / used entry
+            newest = next(reversed(cls._store))
+            live = [ref for ref in cls._store if cls._meta[ref]["released"] is None]
+            candidates = [ref for ref in live if ref != newest and not cls._meta[ref]["pins"]]
+            if not candidates:
+                return
+            if len(live) > limits["max_entries"]:
+                reason = "max entries reached"
+            elif total_bytes > limits["max_bytes"]:
+                reason = "memory budget reached"
+            elif open_readers > limits["max_open_readers"]:
+                reason = "open reader limit reached"
+            else:
+                return
+            cls._release(candidates[0], reason)
+            # releasing may also drop parents kept only for this entry
+            for ref in [ref for ref in held if ref not in cls._store]:
+                resources = held.pop(ref)
+                for key in (*resources.readers, *resources.arrays):
+                    holders[key] -= 1
+                    if not holders[key]:
+                        size, decoders = costs[key]
+                        total_bytes -= size
+                        open_readers -= decoders
+
+    @classmethod
+    def release(cls, ref: str) -> bool:
+        with cls._lock:
+            if ref not in cls._store:
+                return False
+            cls._release(ref, "released")
+            return True
+
+    @classmethod
+    def _describe_entry(cls, ref: str, now: float) -> Dict[str, Any]:
+        obj = cls._store[ref]
+        meta = cls._meta[ref]
+        if isinstance(obj, EditGraph):
+            entry = obj.describe()
+        else:
+            entry = {"type": type(obj).__name__, "duration": getattr(obj, "duration", None)}
+            if getattr(obj, "size", None) is not None:
+                entry["size"] = list(obj.size)
+        own = _Resources([obj])
+        subtree = {ref} | cls._descendants(ref)
+        outside = _Resources([o for store in _ClipStore._stores for r, o in store._store.items()
+                              if store is not cls or r not in subtree])
+        entry.update({
+            "estimated_bytes": own.bytes(),
+            # freed if this object and everything derived from it were released
+            "retained_bytes": _Resources([cls._store[r] for r in subtree]).bytes(exclude=outside),
+            "open_readers": own.open_readers(),
+            "age_seconds": round(now - meta["stored_at"], 1),
+            "idle_seconds": round(now - meta["last_used"], 1),
+            "pinned": meta["pins"] > 0,
+            "parents": list(meta["parents"]),
+            "children": sorted(meta["children"]),
+        })
+        if meta["released"] is not None:
+            entry["released"] = meta["released"]
+        return entry
+
+    @classmethod
+    def describe(cls) -> Dict[str, Any]:
+        """Summary of every stored entry, the parent/child tree, estimated memory and open readers"""
+        with cls._lock:
+            cls._expire()
+            now = time.time()
+            everything = _Resources(cls._store.values())
+            entries = {ref: cls._describe_entry(ref, now) for ref in cls._store}
+
+            def subtree(ref: str) -> Dict[str, Any]:
+                return {child: subtree(child) for child in sorted(cls._meta[ref]["children"])}
+
+            return {
+                "entries": entries,
+                "tree": {ref: subtree(ref) for ref in cls._store if not cls._meta[ref]["parents"]},
+                "count": len(entries),
+                "estimated_bytes": everything.bytes(),
+                "open_readers": everything.open_readers(),
+                "limits": cls.limits(),
+            }
+
     @classmethod
     def clear(cls):
-        cls._store.clear()
+        with cls._lock:
+            # children first, so nothing is kept alive on their behalf
+            for ref in reversed(list(cls._store)):
+                meta = cls._meta.get(ref)
+                if meta is not None:
+                    meta["children"].clear()
+                    cls._release(ref, "cleared")
+
+
+def write_video(clip, output_path: str, **kwargs) -> None:
+    """Encode a MoviePy clip to output_path with the call's encode settings, waiting for a free render slot first"""
+    settings = moviepy_kwargs(output_path, kwargs.get("codec"), kwargs.get("bitrate"))
+    if "ffmpeg_params" in kwargs and "ffmpeg_params" in settings:
+        kwargs["ffmpeg_params"] = settings.pop("ffmpeg_params") + list(kwargs["ffmpeg_params"])
+    kwargs = {**settings, **kwargs}
+    # MoviePy would put its temp soundtrack in the working directory under a name shared by every render of output_path
+    with scratch_space("video_mcp_render_") as tmp_dir:
+        if kwargs.get("audio", True) is True:
+            source_audio = _passthrough_audio(clip, output_path, tmp_dir)
+            if source_audio:
+                kwargs["audio"] = source_audio
+            elif kwargs.get("temp_audiofile") is None:
+                kwargs["temp_audiofile"] = os.path.join(tmp_dir, "audio." + _temp_audio_extension(output_path, kwargs.get("audio_codec")))
+        with render_slot(), atomic_output(output_path) as tmp_path:
+            kwargs.setdefault("logger", moviepy_logger(tmp_path))
+            clip.write_videofile(tmp_path, **kwargs)
+
+
+def _temp_audio_extension(output_path: str, audio_codec: Optional[str]) -> str:
+    """Extension MoviePy picks for its temp soundtrack, so the file matches the codec written into it"""
+    if audio_codec is None:
+        return "ogg" if os.path.splitext(output_path)[1].lower() in (".ogv", ".webm") else "mp3"
+    if audio_codec in ("raw16", "raw32"):
+        return "wav"
+    try:
+        return find_extension(audio_codec)
+    except ValueError:
+        return audio_codec
+
+
+def _passthrough_audio(clip, output_path: str, tmp_dir: str) -> Optional[str]:
+    """Copy the untouched source audio of clip into tmp_dir so it can be muxed as-is, None if it must be re-encoded"""
+    source = ReaderPool.source_audio(clip)
+    if source is None:
+        return None
+    try:
+        codecs = audio_codecs(cached_probe(source)[0])[:1]
+        if not can_copy_audio(codecs, output_path):
+            return None
+        audio_path = os.path.join(tmp_dir, "source_audio.mka")
+        copy_audio_stream(source, audio_path)
+        return audio_path
+    except Exception as e:
+        logger.warning(f"Re-encoding audio of {source}, could not copy it: {e}")
+        return None
+
+
+def write_audio(clip, output_path: str, **kwargs) -> None:
+    """Encode a MoviePy audio clip to output_path, waiting for a free render slot first"""
+    audio_bitrate = current_settings().get("audio_bitrate")
+    if audio_bitrate:
+        kwargs.setdefault("bitrate", audio_bitrate)
+    with render_slot(), atomic_output(output_path) as tmp_path:
+        kwargs.setdefault("logger", moviepy_logger(tmp_path))
+        clip.write_audiofile(tmp_path, **kwargs)
+
 
+class VideoStore(_ClipStore):
+    _kind = "video"
+    _store = OrderedDict()
+    _meta = {}
+    _evicted = OrderedDict()
 
+    @classmethod
+    def _new_clip(cls, path: str):
+        return ReaderPool.video_clip(path)
+
+    @classmethod
+    def load(cls, video_ref: str):
+        stored = cls._get(video_ref)
+        if stored is None:
+            return cls._new_clip(video_ref)
+        if isinstance(stored, EditGraph):
+            return stored.to_clip()
+        return stored
+
+    @classmethod
+    def load_graph(cls, video_ref: str) -> Optional[EditGraph]:
+        """Return an EditGraph for a stored graph or a video file, None when only a MoviePy clip will do"""
+        stored = cls._get(video_ref)
+        if stored is not None:
+            return stored if isinstance(stored, EditGraph) else None
+        if not os.path.isfile(video_ref) or not get_ffprobe_binary():
+            return None
+        try:
+            return EditGraph.from_file(video_ref)
+        except Exception as e:
+            logger.warning(f"Could not build edit graph for {video_ref}, using MoviePy: {e}")
+            return None
+
+
+class AudioStore(_ClipStore):
+    _kind = "audio"
+    _store = OrderedDict()
+    _meta = {}
+    _evicted = OrderedDict()
+
+    @classmethod
+    def _new_clip(cls, path: str):
+        return ReaderPool.audio_clip(path)
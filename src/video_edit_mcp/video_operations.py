@@ -8,26 +8,77 @@ from moviepy.video.fx.fadein import fadein
 from moviepy.video.fx.fadeout import fadeout
 from moviepy.video.fx.blackwhite import blackwhite
 from moviepy.video.fx.mirror_x import mirror_x
-from moviepy.editor import ImageClip, CompositeVideoClip, ImageSequenceClip, TextClip
+from moviepy.editor import ImageClip, CompositeVideoClip, TextClip
 from typing import Dict, Any, Optional, List, Tuple
 import os
+import json
+import numpy as np
 import logging
-import imageio
-from .utils import get_output_path, VideoStore, AudioStore
+from .utils import get_output_path, object_file_path, VideoStore, AudioStore, write_video
+from .edit_graph import EditGraph, render_graph, optimize_graph, render_segments
+from .render_cache import RenderCache
+from .encoding import cache_recipe
+from .outputs import atomic_output, claim_path
+from .concurrency import writes_files
+from .frames import (FrameSequence, IMAGE_FORMATS, encoded_page, write_npy, write_frame_files,
+                     write_sprite_sheets, webvtt_index)
+from .image_sequence import (RESIZE_MODES, list_images, parse_size, target_size, image_sequence_clip,
+                             encode_image_sequence)
+from .reader_pool import ReaderPool
+from .media_info import video_info, find_video_files, batch_video_info, summarize_records
+from .ffmpeg_utils import get_ffprobe_binary, get_keyframe_times, get_video_packets, keyframes_from_packets, snap_to_keyframe, stream_copy_cut, smart_cut, find_concat_mismatch, concat_copy
 import moviepy.config as mpy_conf
 
 
 logger = logging.getLogger(__name__)
 
+
+def _render_graph_cached(graph: EditGraph, output_path: str, segments: Optional[int] = None) -> Dict[str, Any]:
+    """Render an edit graph unless the same chain on the same inputs is already in the render cache"""
+    segments = render_segments() if segments is None else segments
+    # segment boundaries change the encoded bytes, so renders with different counts are cached apart
+    key = RenderCache.key(graph.input_files(), {"ops": optimize_graph(graph)[0].ops, "encode": cache_recipe(),
+                                                "segments": segments}, output_path)
+    cached = RenderCache.fetch(key, output_path)
+    if cached is not None:
+        return {"render_cache": "hit", **cached}
+    meta = render_graph(graph, output_path, segments)
+    RenderCache.put(key, output_path, meta)
+    return {"render_cache": "miss" if key else "disabled", **meta}
+
+def _graph_result(graph: EditGraph, output_path: str, return_path: bool, message: str) -> Dict[str, Any]:
+    """Render an edit graph in a single ffmpeg pass, or store it so later tools can extend it"""
+    if return_path:
+        return {
+            "success": True,
+            "output_path": output_path,
+            "message": message,
+            **_render_graph_cached(graph, output_path)
+        }
+    ref = VideoStore.store(graph)
+    return {
+        "success": True,
+        "output_object": ref,
+        "message": message
+    }
+
 def register_video_tools(mcp):
     """Register all video processing tools with the MCP server"""
     
     @mcp.tool()
-    def get_video_info(video_path: str) -> Dict[str, Any]:
-        """Get comprehensive information about a video file including duration, fps, resolution, codec details, and audio information."""
+    def get_video_info(video_path: str, include_keyframes: bool = False) -> Dict[str, Any]:
+        """Get comprehensive information about a video file including duration, fps, resolution, codec details, and audio information. Files are probed with ffprobe without decoding and cached; the result also lists container details, all streams and (with include_keyframes, which reads every packet header) keyframe count and GOP statistics."""
         try:
-            # Load video file
-            video = VideoFileClip(video_path)
+            if os.path.isfile(video_path) and get_ffprobe_binary():
+                info, cached = video_info(video_path, include_keyframes)
+                return {
+                    "success": True,
+                    "video_info": info,
+                    "metadata_cache": "hit" if cached else "miss"
+                }
+
+            # Stored objects (or no ffprobe): read the attributes of the clip
+            video = VideoStore.load(video_path)
             
             # Basic video information
             info = {
@@ -95,8 +146,9 @@ def register_video_tools(mcp):
                 if info.get("file_size_bytes"):
                     info["average_bitrate_kbps"] = round((info["file_size_bytes"] * 8) / (info["duration"] * 1000), 2)
             
-            # Clean up video object to prevent memory leaks
-            video.close()
+            # Clean up video object to prevent memory leaks, but never close a stored object
+            if video_path not in VideoStore._store:
+                video.close()
             
             return {
                 "success": True,
@@ -113,13 +165,49 @@ def register_video_tools(mcp):
         finally:
             # Ensure video object is cleaned up even if an exception occurs
             try:
-                if 'video' in locals():
+                if 'video' in locals() and video_path not in VideoStore._store:
                     video.close()
             except:
                 pass
 
-    @mcp.tool(description="Use this tool for trimming the video, provide start and end time in seconds, and output name like trimmed_video.mp4 , if there are multiple steps to be done after trimming then make sure to return object and return path should be false else return path should be true")
-    def trim_video(video_path: str, start_time: float, end_time: float, output_name: str, return_path: bool) -> Dict[str, Any]:
+    @mcp.tool(description="Use this tool to get compact info (duration, resolution, fps, codecs, size) for many videos at once, provide a directory or a glob pattern like /videos/**/*.mp4. Files are probed in parallel and cached; results are paged with offset and limit and come with a summary of the whole set (total duration, codec and resolution histograms)")
+    def get_videos_info_batch(path_or_glob: str, recursive: bool = False, include_keyframes: bool = False, offset: int = 0, limit: int = 200, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        try:
+            if not get_ffprobe_binary():
+                return {
+                    "success": False,
+                    "error": "ffprobe was not found",
+                    "message": "Install ffmpeg with ffprobe or set FFPROBE_BINARY"
+                }
+            paths = find_video_files(path_or_glob, recursive)
+            if not paths:
+                return {
+                    "success": False,
+                    "error": f"No video files found for {path_or_glob}",
+                    "message": "Provide an existing directory or a glob pattern that matches video files"
+                }
+            workers = max_workers or min(8, os.cpu_count() or 1)
+            records = batch_video_info(paths, workers, include_keyframes)
+            page = records[max(offset, 0):max(offset, 0) + max(limit, 1)]
+            next_offset = offset + len(page)
+            return {
+                "success": True,
+                "records": page,
+                "offset": offset,
+                "next_offset": next_offset if next_offset < len(records) else None,
+                "summary": summarize_records(records)
+            }
+        except Exception as e:
+            logger.error(f"Error getting batch video info for {path_or_glob}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error getting batch video info"
+            }
+
+    @mcp.tool(description="Use this tool for trimming the video, provide start and end time in seconds, and output name like trimmed_video.mp4 , if there are multiple steps to be done after trimming then make sure to return object and return path should be false else return path should be true. mode can be 'reencode' (default, frame accurate), 'copy' (no re-encoding, cuts start on a keyframe, needs a video file path) or 'smart' (frame accurate, only re-encodes the frames between each cut point and its nearest keyframe and copies the rest, needs a video file path); set snap_to_keyframes to move both cut points to the nearest keyframes, the actual cut points are reported back")
+    def trim_video(video_path: str, start_time: float, end_time: float, output_name: str, return_path: bool, mode: str = "reencode", snap_to_keyframes: bool = False) -> Dict[str, Any]:
         try:
             # Input validation
             if start_time < 0 or end_time < 0:
@@ -134,24 +222,101 @@ def register_video_tools(mcp):
                     "error": "Start time must be less than end time",
                     "message": "Invalid time range"
                 }
+            if mode not in ("reencode", "copy", "smart"):
+                return {
+                    "success": False,
+                    "error": "Mode must be 'reencode', 'copy' or 'smart'",
+                    "message": "Invalid mode parameter"
+                }
             
             output_path = get_output_path(output_name)
-            video = VideoStore.load(video_path)
-            trimmed_video = video.subclip(start_time, end_time)
 
-            if return_path:
-                trimmed_video.write_videofile(output_path)
+            if mode in ("copy", "smart"):
+                if not os.path.isfile(video_path):
+                    return {
+                        "success": False,
+                        "error": f"{mode.capitalize()} mode needs a video file path, not a stored object",
+                        "message": f"Invalid video path for {mode} mode"
+                    }
+                # a stored result is backed by a private file, never one in the output folder
+                target = output_path if return_path else object_file_path(output_name)
+                key = RenderCache.key([video_path], {"tool": "trim", "mode": mode, "start": start_time, "end": end_time, "snap_to_keyframes": snap_to_keyframes}, target)
+                cut_points = RenderCache.fetch(key, target)
+                if cut_points is None:
+                    packets = get_video_packets(video_path)
+                    keyframes = keyframes_from_packets(packets)
+                    if mode == "copy" or snap_to_keyframes:
+                        actual_start = snap_to_keyframe(start_time, keyframes, "nearest" if snap_to_keyframes else "previous")
+                        actual_end = snap_to_keyframe(end_time, keyframes, "nearest") if snap_to_keyframes else end_time
+                        if actual_end <= actual_start:
+                            actual_end = end_time
+                    else:
+                        actual_start, actual_end = start_time, end_time
+                    cut_points = {
+                        "requested_start": start_time,
+                        "requested_end": end_time,
+                        "actual_start": actual_start,
+                        "actual_end": actual_end
+                    }
+                    if mode == "copy":
+                        stream_copy_cut(video_path, actual_start, actual_end, target, packets)
+                    else:
+                        cut_points.update(smart_cut(video_path, actual_start, actual_end, target, packets))
+                    RenderCache.put(key, target, cut_points)
+                if mode == "copy":
+                    message = "Video trimmed successfully without re-encoding"
+                else:
+                    message = "Video trimmed successfully, only the partial GOPs at the cut points were re-encoded"
+                if return_path:
+                    return {
+                        "success": True,
+                        "output_path": output_path,
+                        "cut_points": cut_points,
+                        "message": message
+                    }
+                ref = VideoStore.store(ReaderPool.video_clip(target), files=[target])
                 return {
+                    "success": True,
+                    "output_object": ref,
+                    "cut_points": cut_points
+                }
+
+            cut_points = None
+            if snap_to_keyframes and os.path.isfile(video_path):
+                keyframes = get_keyframe_times(video_path)
+                actual_start = snap_to_keyframe(start_time, keyframes, "nearest")
+                actual_end = snap_to_keyframe(end_time, keyframes, "nearest")
+                if actual_end <= actual_start:
+                    actual_end = end_time
+                cut_points = {
+                    "requested_start": start_time,
+                    "requested_end": end_time,
+                    "actual_start": actual_start,
+                    "actual_end": actual_end
+                }
+                start_time, end_time = actual_start, actual_end
+
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                result = _graph_result(graph.then("trim", start=start_time, end=end_time), output_path, return_path, "Video trimmed successfully")
+            elif return_path:
+                trimmed_video = VideoStore.load(video_path).subclip(start_time, end_time)
+                write_video(trimmed_video, output_path)
+                result = {
                     "success": True,
                     "output_path": output_path,
                     "message": "Video trimmed successfully"
                 }
             else:
+                trimmed_video = VideoStore.load(video_path).subclip(start_time, end_time)
                 ref = VideoStore.store(trimmed_video)
-                return {
+                result = {
                     "success": True,
                     "output_object": ref
                 }
+            if cut_points:
+                result["cut_points"] = cut_points
+            return result
         except Exception as e:
             logger.error(f"Error trimming video {video_path}: {e}")
             return {
@@ -161,19 +326,64 @@ def register_video_tools(mcp):
                 "message": "Error trimming video"
             }
 
-    @mcp.tool(description="Use this tool for merging two videos, provide two video paths, and output name like merged_video.mp4 , if there are multiple steps to be done after merging then make sure to return object and return path should be false else return path should be true")
-    def merge_video(video_path: str, video_path2: str, output_name: str, return_path: bool) -> Dict[str, Any]:
-        """Merge two videos into one."""
+    @mcp.tool(description="Use this tool for merging videos, provide a list of two or more video paths in playback order, and output name like merged_video.mp4 , if there are multiple steps to be done after merging then make sure to return object and return path should be false else return path should be true. Files that share codec, resolution, pixel format, timebase and audio layout are joined without re-encoding. video_path and video_path2 are the deprecated two-video form of video_paths")
+    def merge_video(output_name: str, return_path: bool, video_paths: Optional[List[str]] = None,
+                    video_path: Optional[str] = None, video_path2: Optional[str] = None) -> Dict[str, Any]:
+        """Merge videos into one."""
         try:
+            if video_path is not None or video_path2 is not None:
+                if video_paths:
+                    return {
+                        "success": False,
+                        "error": "Pass either video_paths or the deprecated video_path and video_path2, not both",
+                        "message": "Invalid video paths parameter"
+                    }
+                logger.warning("merge_video: video_path/video_path2 are deprecated, pass video_paths instead")
+                video_paths = [path for path in (video_path, video_path2) if path is not None]
+            if not video_paths or len(video_paths) < 2:
+                return {
+                    "success": False,
+                    "error": "Provide at least two videos to merge",
+                    "message": "Invalid video paths parameter"
+                }
+
             output_path = get_output_path(output_name)
-            video1 = VideoStore.load(video_path)
-            video2 = VideoStore.load(video_path2)
-            merged_video = concatenate_videoclips([video1, video2])
+
+            # Files with identical stream parameters can be joined by the concat demuxer as-is.
+            stored_refs = [path for path in video_paths if not os.path.isfile(path)]
+            mismatch = find_concat_mismatch(video_paths) if not stored_refs else "inputs include stored objects"
+            if mismatch is None:
+                # a stored result is backed by a private file, never one in the output folder
+                target = output_path if return_path else object_file_path(output_name)
+                key = RenderCache.key(video_paths, {"tool": "merge", "method": "concat_copy"}, target)
+                if RenderCache.fetch(key, target) is None:
+                    concat_copy(video_paths, target)
+                    RenderCache.put(key, target)
+                if return_path:
+                    return {
+                        "success": True,
+                        "output_path": output_path,
+                        "merge_method": "concat_copy",
+                        "message": "Videos merged successfully without re-encoding"
+                    }
+                ref = VideoStore.store(ReaderPool.video_clip(target), files=[target])
+                return {
+                    "success": True,
+                    "output_object": ref,
+                    "merge_method": "concat_copy",
+                    "message": "Videos merged successfully without re-encoding"
+                }
+
+            logger.info(f"Merging with re-encode: {mismatch}")
+            videos = [VideoStore.load(path) for path in video_paths]
+            merged_video = concatenate_videoclips(videos)
             if return_path:
-                merged_video.write_videofile(output_path)
+                write_video(merged_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
+                    "merge_method": "reencode",
+                    "reencode_reason": mismatch,
                     "message": "Videos merged successfully"
                 }
             else:
@@ -184,7 +394,7 @@ def register_video_tools(mcp):
                     "message": "Videos merged successfully"
                 }
         except Exception as e:
-            logger.error(f"Error merging videos {video_path} and {video_path2}: {e}")
+            logger.error(f"Error merging videos {video_paths}: {e}")
             return {
                 "success": False,
                 "error": str(e),
@@ -194,7 +404,7 @@ def register_video_tools(mcp):
 
  
 
-    @mcp.tool(description="Use this tool for resizing the video make sure first whether video needs to be saved directly or just object has to be returned for further processing, if there are multiple steps to be done after resizing then make sure to return object and return path should be false else return path should be true")
+    @mcp.tool(description="Use this tool for resizing the video make sure first whether video needs to be saved directly or just object has to be returned for further processing, if there are multiple steps to be done after resizing then make sure to return object and return path should be false else return path should be true. Odd widths or heights are padded with black to the next even size, reported as output_size and padding in the result")
     def resize_video(video_path: str, size: Tuple[int, int], output_name: str, return_path: bool) -> Dict[str, Any]:
         try:
             # Input validation
@@ -206,11 +416,14 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("scale", width=size[0], height=size[1]), output_path, return_path, "Video resized successfully")
             video = VideoStore.load(video_path)
             resized_video = video.resize(newsize=size)
             
             if return_path:
-                resized_video.write_videofile(output_path)
+                write_video(resized_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -243,11 +456,14 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("crop", x1=x1, y1=y1, x2=x2, y2=y2), output_path, return_path, "Video cropped successfully")
             video = VideoStore.load(video_path)
             cropped_video = crop(video, x1, y1, x2, y2)
             
             if return_path:
-                cropped_video.write_videofile(output_path)
+                write_video(cropped_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -280,11 +496,14 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("rotate", angle=angle), output_path, return_path, "Video rotated successfully")
             video = VideoStore.load(video_path)
             rotated_video = rotate(video, angle)
             
             if return_path:
-                rotated_video.write_videofile(output_path)
+                write_video(rotated_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -321,7 +540,7 @@ def register_video_tools(mcp):
             sped_up_video = speedx(video, speed)
 
             if return_path:
-                sped_up_video.write_videofile(output_path)
+                write_video(sped_up_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -351,7 +570,7 @@ def register_video_tools(mcp):
             new_video = video.set_audio(audio)
             
             if return_path:
-                new_video.write_videofile(output_path)
+                write_video(new_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -385,11 +604,14 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("fadein", duration=fade_duration), output_path, return_path, "Fade in effect added successfully")
             video = VideoStore.load(video_path)
             faded_video = fadein(video, fade_duration)
             
             if return_path:
-                faded_video.write_videofile(output_path)
+                write_video(faded_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -422,11 +644,14 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("fadeout", duration=fade_duration), output_path, return_path, "Fade out effect added successfully")
             video = VideoStore.load(video_path)
             faded_video = fadeout(video, fade_duration)
             
             if return_path:
-                faded_video.write_videofile(output_path)
+                write_video(faded_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -471,6 +696,11 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                # Text is rendered with PIL and overlaid natively, ImageMagick is not needed
+                graph = graph.then("overlay_text", text=text, x=x, y=y, font_size=font_size, color=color, duration=duration)
+                return _graph_result(graph, output_path, return_path, "Text overlay added successfully")
             video = VideoStore.load(video_path)
             
             # Configure ImageMagick
@@ -486,7 +716,7 @@ def register_video_tools(mcp):
             final_video = CompositeVideoClip([video, text_clip])
             
             if return_path:
-                final_video.write_videofile(output_path, fps=final_video.fps)
+                write_video(final_video, output_path, fps=final_video.fps)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -521,12 +751,16 @@ def register_video_tools(mcp):
                 }
             
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                graph = graph.then("overlay_image", image_path=os.path.abspath(image_path), x=x, y=y, duration=duration)
+                return _graph_result(graph, output_path, return_path, "Image overlay added successfully")
             video = VideoStore.load(video_path)
             logo = ImageClip(image_path).set_duration(duration).set_position((x, y))
             final_video = CompositeVideoClip([video, logo])
             
             if return_path:
-                final_video.write_videofile(output_path)
+                write_video(final_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -551,11 +785,14 @@ def register_video_tools(mcp):
     def grayscale_video(video_path: str, output_name: str, return_path: bool) -> Dict[str, Any]:
         try:
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("gray"), output_path, return_path, "Video converted to grayscale successfully")
             video = VideoStore.load(video_path)
             gray_video = video.fx(blackwhite)
             
             if return_path:
-                gray_video.write_videofile(output_path)
+                write_video(gray_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -576,20 +813,27 @@ def register_video_tools(mcp):
                 "message": "Error converting video to grayscale"
             }
 
-    @mcp.tool(description="Use this tool for creating video from image sequence, provide folder path with images, fps, and output name, if there are multiple steps to be done after creating video from images then make sure to return object and return path should be false else return path should be true")
-    def images_to_video(images_folder_path:str, fps:int, output_name:str, return_path:bool) -> Dict[str,Any]:
+    @mcp.tool(description="Use this tool for creating video from image sequence, provide folder path with images (or a glob like /shots/*.jpg), fps, and output name, if there are multiple steps to be done after creating video from images then make sure to return object and return path should be false else return path should be true. Images are ordered by sort (natural, name or mtime) and optionally filtered by a glob pattern; images of other sizes are resized to size (WIDTHxHEIGHT, default the first image's) with resize_mode fit (pad), fill (crop) or stretch")
+    def images_to_video(images_folder_path:str, fps:float, output_name:str, return_path:bool, pattern:Optional[str] = None,
+                        sort:str = "natural", size:Optional[str] = None, resize_mode:str = "fit") -> Dict[str,Any]:
         try:
-            output_path = get_output_path(output_name)
-            clip = ImageSequenceClip(images_folder_path, fps=fps)
+            if resize_mode not in RESIZE_MODES:
+                raise ValueError(f"Unknown resize_mode {resize_mode!r}, expected one of {', '.join(RESIZE_MODES)}")
+            if fps <= 0:
+                raise ValueError("fps must be positive")
+            paths = list_images(images_folder_path, pattern, sort)
+            frame_size = target_size(paths, parse_size(size))
             if return_path:
-                clip.write_videofile(output_path)
+                output_path = get_output_path(output_name)
+                encode_image_sequence(paths, fps, output_path, frame_size, resize_mode)
                 return {
                     "success": True,
                     "output_path": output_path,
+                    "frame_count": len(paths),
                     "message": "Video created from images successfully"
                 }
             else:
-                ref = VideoStore.store(clip)
+                ref = VideoStore.store(image_sequence_clip(paths, fps, frame_size, resize_mode))
                 return {
                     "success": True,
                     "output_object": ref
@@ -603,27 +847,34 @@ def register_video_tools(mcp):
                 "message": "Error creating video from images"
             }
 
-    @mcp.tool(description="Use this tool for extracting frames from video as images, provide start_time, end_time, and fps for extraction, if there are multiple steps to be done after extracting frames then make sure to return object and return path should be false else return path should be true")
-    def extract_frames(video_path:str, start_time:float, end_time:float, fps:int, output_folder_name:str, return_path:bool) -> Dict[str,Any]:
+    @mcp.tool(description="Use this tool for extracting frames from video as images, provide start_time, end_time, and fps for extraction, if there are multiple steps to be done after extracting frames then make sure to return object and return path should be false else return path should be true. Give timestamps (seconds) to sample exact times instead of start_time/end_time/fps. seek_mode: auto seeks per frame when samples are far apart, seek always seeks, keyframe moves samples to the preceding keyframe (fastest), decode reads every frame in between. When writing to disk, image_format is png (png_level 0-9), jpeg or webp (quality 1-100) or npy (one frames.npy array), and max_size downscales frames so the longer side fits before encoding")
+    @writes_files("output_folder_name")
+    def extract_frames(video_path:str, start_time:float = 0, end_time:Optional[float] = None, fps:Optional[float] = None,
+                       output_folder_name:str = "frames", return_path:bool = True, timestamps:Optional[List[float]] = None,
+                       seek_mode:str = "auto", image_format:str = "png", quality:Optional[int] = None,
+                       png_level:Optional[int] = None, max_size:Optional[int] = None) -> Dict[str,Any]:
         try:
             video = VideoStore.load(video_path)
-            subclip = video.subclip(start_time, end_time)
+            frames = FrameSequence(video, start_time, end_time, fps, times=timestamps, seek_mode=seek_mode)
             if return_path:
-                os.makedirs(output_folder_name, exist_ok=True)
-                for i, frame in enumerate(subclip.iter_frames(fps=fps)):
-                    frame_path = os.path.join(output_folder_name, f"frame_{i:04d}.png")
-                    imageio.imwrite(frame_path, frame)
+                folder = claim_path(os.path.abspath(output_folder_name))
+                write_frame_files(frames, folder, image_format, quality, png_level, max_size)
                 return {
                     "success": True,
-                    "output_path": output_folder_name,
+                    "output_path": folder,
+                    "frame_count": len(frames),
+                    "seeked": frames.seeks,
                     "message": "Frames extracted successfully"
                 }
             else:
-                frames = list(subclip.iter_frames(fps=fps))
+                # frames are decoded on demand by get_frames, so memory doesn't grow with the range
+                ref = VideoStore.store(frames)
                 return {
                     "success": True,
-                    "output_object": frames,
-                    "message": "Frames extracted to memory"
+                    "output_object": ref,
+                    "frame_count": len(frames),
+                    "seeked": frames.seeks,
+                    "message": "Frames available through get_frames"
                 }
         except Exception as e:
             logger.error(f"Error extracting frames from video {video_path}: {e}")
@@ -634,14 +885,112 @@ def register_video_tools(mcp):
                 "message": "Error extracting frames from video"
             }
 
+    @mcp.tool(description="Use this tool to read frames kept in memory by extract_frames (return_path false): returns a page of base64 thumbnails (image_format jpeg, webp or png, longest side max_size) starting at offset, or with npy_name writes the frames to a memory-mapped .npy array in the output folder")
+    @writes_files("npy_name")
+    def get_frames(frames_ref:str, offset:int = 0, limit:int = 16, image_format:str = "jpeg", quality:int = 80,
+                   max_size:Optional[int] = 320, npy_name:Optional[str] = None) -> Dict[str,Any]:
+        try:
+            frames = VideoStore.load(frames_ref)
+            if not isinstance(frames, FrameSequence):
+                return {
+                    "success": False,
+                    "error": f"{frames_ref} is not a frame sequence",
+                    "message": "Use a reference returned by extract_frames with return_path false"
+                }
+            if offset < 0:
+                raise ValueError("offset must not be negative")
+            if npy_name:
+                if limit < 0:
+                    raise ValueError("limit must not be negative (0 writes every frame from offset)")
+                output_path = get_output_path(npy_name if npy_name.endswith(".npy") else npy_name + ".npy")
+                with atomic_output(output_path) as tmp_path:
+                    shape = write_npy(frames, tmp_path, offset, limit if limit > 0 else None)
+                return {
+                    "success": True,
+                    "output_path": output_path,
+                    "shape": list(shape),
+                    "message": "Frames written to .npy (load with numpy.load(path, mmap_mode='r'))"
+                }
+            limit = max(1, min(limit, 100))
+            page = encoded_page(frames, offset, limit, image_format, quality, max_size)
+            next_offset = offset + len(page)
+            return {
+                "success": True,
+                "frames": page,
+                "offset": offset,
+                "total": len(frames),
+                "next_offset": next_offset if next_offset < len(frames) else None,
+                "message": f"Returned {len(page)} of {len(frames)} frames"
+            }
+        except Exception as e:
+            logger.error(f"Error reading frames {frames_ref}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error reading frames"
+            }
+
+    @mcp.tool(description="Use this tool to build scrub-bar previews: samples frame_count frames evenly (or one every interval seconds), downscales them to tile_width and tiles them into columns x rows sprite images, plus a WebVTT thumbnail track and/or JSON index (index_format vtt, json or both); files are named output_prefix_N.jpg, output_prefix.vtt and output_prefix.json")
+    @writes_files("output_prefix")
+    def create_sprite_sheet(video_path:str, output_prefix:str, frame_count:int = 100, interval:Optional[float] = None,
+                            columns:int = 10, rows:int = 10, tile_width:int = 160, image_format:str = "jpeg",
+                            quality:int = 80, index_format:str = "both", seek_mode:str = "auto") -> Dict[str,Any]:
+        try:
+            if index_format not in ("vtt", "json", "both"):
+                raise ValueError(f"Unknown index_format {index_format!r}, expected vtt, json or both")
+            if columns < 1 or rows < 1 or tile_width < 1:
+                raise ValueError("columns, rows and tile_width must be positive")
+            video = VideoStore.load(video_path)
+            duration = video.duration
+            step = interval if interval else duration / max(frame_count, 1)
+            if step <= 0:
+                raise ValueError("interval must be positive")
+            times = [float(t) for t in np.arange(0, duration, step)]
+            frames = FrameSequence(video, times=times, seek_mode=seek_mode)
+            index_paths = {kind: get_output_path(f"{output_prefix}.{kind}")
+                           for kind in ("vtt", "json") if index_format in (kind, "both")}
+            ext = IMAGE_FORMATS.get(image_format, (None, None, ""))[2]
+            tiles = write_sprite_sheets(frames, lambda n: get_output_path(f"{output_prefix}_{n}{ext}"), tile_width,
+                                        columns, rows, image_format, quality, end=duration)
+            sprites = list(dict.fromkeys(tile["sprite"] for tile in tiles))
+            if "vtt" in index_paths:
+                with atomic_output(index_paths["vtt"]) as tmp_path, open(tmp_path, "w") as f:
+                    f.write(webvtt_index(tiles))
+            if "json" in index_paths:
+                index = {"video": video_path, "duration": duration, "columns": columns, "rows": rows,
+                         "tile_width": tiles[0]["w"], "tile_height": tiles[0]["h"], "sprites": sprites, "tiles": tiles}
+                with atomic_output(index_paths["json"]) as tmp_path, open(tmp_path, "w") as f:
+                    json.dump(index, f, indent=2)
+            output_dir = os.path.dirname(next(iter(index_paths.values())))
+            return {
+                "success": True,
+                "output_path": next(iter(index_paths.values())),
+                "output_paths": [os.path.join(output_dir, name) for name in sprites] + list(index_paths.values()),
+                "tile_count": len(tiles),
+                "seeked": frames.seeks,
+                "message": f"{len(tiles)} frames tiled into {len(sprites)} sprite sheet(s)"
+            }
+        except Exception as e:
+            logger.error(f"Error creating sprite sheet for {video_path}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error creating sprite sheet"
+            }
+
     @mcp.tool(description="Use this tool for mirroring video horizontally, provide output name like mirrored_video.mp4, if there are multiple steps to be done after mirroring then make sure to return object and return path should be false else return path should be true")
     def mirror_video(video_path:str, output_name:str, return_path:bool) -> Dict[str,Any]:
         try:
             output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_path)
+            if graph is not None:
+                return _graph_result(graph.then("hflip"), output_path, return_path, "Video mirrored successfully")
             video = VideoStore.load(video_path)
             mirrored_video = video.fx(mirror_x)
             if return_path:
-                mirrored_video.write_videofile(output_path)
+                write_video(mirrored_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -662,11 +1011,86 @@ def register_video_tools(mcp):
                 "message": "Error mirroring video"
             }
 
-    @mcp.tool(description="Use this tool for splitting video into multiple parts at specific timestamps, provide list of split times in seconds, if there are multiple steps to be done after splitting then make sure to return object and return path should be false else return path should be true")
-    def split_video_at_times(video_path:str, split_times:List[float], output_name:str, return_path:bool) -> Dict[str,Any]:
+    @mcp.tool(description="Use this tool for splitting video into multiple parts at specific timestamps, provide list of split times in seconds, if there are multiple steps to be done after splitting then make sure to return object and return path should be false else return path should be true. mode can be 'reencode' (default, frame accurate), 'copy' (no re-encoding, split points move back to the previous keyframe, needs a video file path) or 'smart' (frame accurate, only re-encodes the partial GOPs at each split point, needs a video file path); set snap_to_keyframes to snap split points to the nearest keyframe instead, the actual cut points are reported back")
+    def split_video_at_times(video_path:str, split_times:List[float], output_name:str, return_path:bool, mode:str = "reencode", snap_to_keyframes:bool = False) -> Dict[str,Any]:
         try:
-            output_path = get_output_path(output_name)
+            if mode not in ("reencode", "copy", "smart"):
+                return {
+                    "success": False,
+                    "error": "Mode must be 'reencode', 'copy' or 'smart'",
+                    "message": "Invalid mode parameter"
+                }
+            base_name, ext = os.path.splitext(output_name)
+            ext = ext or ".mp4"
             video = VideoStore.load(video_path)
+            requested_times = sorted(split_times)
+            # a split at 0, at or past the end, or twice at the same time would make an empty part
+            split_times = sorted({float(t) for t in split_times if 0 < t < video.duration})
+            if not split_times:
+                return {
+                    "success": False,
+                    "error": f"No split times between 0 and the video duration ({video.duration:.3f}s)",
+                    "message": "Invalid split times"
+                }
+
+            cut_points = None
+            if mode != "reencode" or snap_to_keyframes:
+                if not os.path.isfile(video_path):
+                    return {
+                        "success": False,
+                        "error": "Keyframe-aware splitting needs a video file path, not a stored object",
+                        "message": f"Invalid video path for {mode} mode"
+                    }
+                packets = get_video_packets(video_path)
+                keyframes = keyframes_from_packets(packets)
+                if mode == "copy" or snap_to_keyframes:
+                    direction = "nearest" if snap_to_keyframes else "previous"
+                    snapped = sorted({t for t in (snap_to_keyframe(t, keyframes, direction) for t in split_times)
+                                      if 0 < t < video.duration})
+                    if not snapped:
+                        return {
+                            "success": False,
+                            "error": "Every split time snaps to the start or end of the video",
+                            "message": "No keyframe to split at; use smart mode or split times further apart from the ends"
+                        }
+                else:
+                    snapped = split_times
+                cut_points = {
+                    "requested_split_times": requested_times,
+                    "actual_split_times": snapped
+                }
+                split_times = snapped
+
+            if mode in ("copy", "smart"):
+                boundaries = [0] + split_times + [None]
+                output_paths = []
+                reencoded_seconds = 0.0
+                for i in range(len(boundaries) - 1):
+                    segment_name = f"{base_name}_part_{i+1}{ext}"
+                    # stored segments are backed by private files, never ones in the output folder
+                    segment_path = get_output_path(segment_name) if return_path else object_file_path(segment_name)
+                    if mode == "copy":
+                        stream_copy_cut(video_path, boundaries[i], boundaries[i + 1], segment_path, packets)
+                    else:
+                        stats = smart_cut(video_path, boundaries[i], boundaries[i + 1], segment_path, packets)
+                        reencoded_seconds += stats["reencoded_seconds"] or 0.0
+                    output_paths.append(segment_path)
+                if mode == "smart":
+                    cut_points["reencoded_seconds"] = reencoded_seconds
+                if return_path:
+                    return {
+                        "success": True,
+                        "output_paths": output_paths,
+                        "cut_points": cut_points,
+                        "message": f"Video split successfully using {mode} mode"
+                    }
+                refs = [VideoStore.store(ReaderPool.video_clip(path), files=[path]) for path in output_paths]
+                return {
+                    "success": True,
+                    "output_objects": refs,
+                    "cut_points": cut_points
+                }
+
             segments = []
             split_times = [0] + split_times + [video.duration]
             
@@ -679,20 +1103,23 @@ def register_video_tools(mcp):
             if return_path:
                 output_paths = []
                 for i, segment in enumerate(segments):
-                    segment_path = os.path.join(output_path, f"{output_name}_part_{i+1}.mp4")
-                    segment.write_videofile(segment_path)
+                    segment_path = get_output_path(f"{base_name}_part_{i+1}{ext}")
+                    write_video(segment, segment_path)
                     output_paths.append(segment_path)
-                return {
+                result = {
                     "success": True,
                     "output_paths": output_paths,
                     "message": "Video split successfully"
                 }
             else:
                 refs = [VideoStore.store(segment) for segment in segments]
-                return {
+                result = {
                     "success": True,
                     "output_objects": refs
                 }
+            if cut_points:
+                result["cut_points"] = cut_points
+            return result
         except Exception as e:
             logger.error(f"Error splitting video at times {video_path}: {e}")
             return {
@@ -714,7 +1141,7 @@ def register_video_tools(mcp):
                 write_kwargs["bitrate"] = bitrate
                 
             if return_path:
-                video.write_videofile(output_path, **write_kwargs)
+                write_video(video, output_path, **write_kwargs)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -746,7 +1173,7 @@ def register_video_tools(mcp):
             final_video = CompositeVideoClip([base_video, overlay_positioned])
             
             if return_path:
-                final_video.write_videofile(output_path)
+                write_video(final_video, output_path)
                 return {
                     "success": True,
                     "output_path": output_path,
@@ -765,5 +1192,33 @@ def register_video_tools(mcp):
                 "error": str(e),
                 "error_type": type(e).__name__,
                 "message": "Error adding video overlay"
-            } 
-        
+            }
+
+    @mcp.tool(description="Use this tool to render a stored object to a file, provide the object reference and output name like final_video.mp4. Chains of trim, resize, crop, rotate, fade, mirror, grayscale and overlay steps are compiled into a single ffmpeg pass; set segments above 1 to split long chains into that many GOP-aligned segments encoded in parallel (default one pass, or VIDEO_MCP_RENDER_SEGMENTS)")
+    def render(video_ref:str, output_name:str, segments:Optional[int] = None) -> Dict[str,Any]:
+        try:
+            output_path = get_output_path(output_name)
+            graph = VideoStore.load_graph(video_ref)
+            if graph is not None:
+                return {
+                    "success": True,
+                    "output_path": output_path,
+                    "operations": [op["op"] for op in graph.ops],
+                    "message": "Edit chain rendered natively with ffmpeg",
+                    **_render_graph_cached(graph, output_path, segments)
+                }
+            video = VideoStore.load(video_ref)
+            write_video(video, output_path)
+            return {
+                "success": True,
+                "output_path": output_path,
+                "message": "Video rendered successfully"
+            }
+        except Exception as e:
+            logger.error(f"Error rendering video {video_ref}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "message": "Error rendering video"
+            }
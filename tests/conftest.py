@@ -0,0 +1,75 @@
+import asyncio
+import inspect
+import os
+import subprocess
+import tempfile
+
+import pytest
+from imageio_ffmpeg import get_ffmpeg_exe
+
+# keep the metadata database and render cache of test runs out of the user's home
+_STATE_DIR = tempfile.mkdtemp(prefix="video_mcp_tests_")
+os.environ.setdefault("VIDEO_MCP_METADATA_DB", os.path.join(_STATE_DIR, "metadata.sqlite"))
+os.environ.setdefault("VIDEO_MCP_CACHE_DIR", os.path.join(_STATE_DIR, "renders"))
+
+
+def encode_test_video(path, duration=4, size="160x120", rate=25, gop=None, audio=False):
+    """Encode a lavfi test pattern (with a sine tone when audio) into path"""
+    cmd = [get_ffmpeg_exe(), "-loglevel", "error", "-y",
+           "-f", "lavfi", "-i", f"testsrc=size={size}:rate={rate}:duration={duration}"]
+    if audio:
+        cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}", "-c:a", "aac", "-shortest"]
+    cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p"]
+    if gop:
+        # fixed GOP so keyframes land on known times
+        cmd += ["-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"]
+    subprocess.run(cmd + [str(path)], check=True)
+    return str(path)
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    """encode_test_video into tmp_path under name"""
+    return lambda name, **options: encode_test_video(tmp_path / name, **options)
+
+
+@pytest.fixture
+def sample_video(tmp_path):
+    return encode_test_video(tmp_path / "sample.mp4")
+
+
+@pytest.fixture
+def gop_video(tmp_path):
+    """8s, 25fps with a keyframe every second and an AAC track"""
+    return encode_test_video(tmp_path / "gop.mp4", duration=8, gop=25, audio=True)
+
+
+@pytest.fixture(scope="session")
+def mpegts_support(tmp_path_factory):
+    """Skip unless this ffmpeg build can read back MPEG-TS, the intermediate format of smart cuts"""
+    directory = tmp_path_factory.mktemp("mpegts")
+    piece = encode_test_video(directory / "piece.ts", duration=1)
+    remux = subprocess.run([get_ffmpeg_exe(), "-loglevel", "error", "-y", "-i", piece, "-c", "copy",
+                            str(directory / "piece.mp4")], capture_output=True)
+    if remux.returncode != 0:
+        pytest.skip(f"ffmpeg cannot read MPEG-TS here (exit code {remux.returncode})")
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "output"
+    directory.mkdir()
+    monkeypatch.setenv("VIDEO_MCP_OUTPUT_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture
+def call_tool(output_dir):
+    """Call a registered MCP tool by name the way the server does, writing into output_dir"""
+    from video_edit_mcp.main import mcp
+
+    def call(name, **kwargs):
+        result = mcp._tool_manager.get_tool(name).fn(**kwargs)
+        return asyncio.run(result) if inspect.iscoroutine(result) else result
+
+    return call
@@ -0,0 +1,59 @@
+import os
+import time
+
+from video_edit_mcp.main import mcp
+
+
+def _parameters(name):
+    return set(mcp._tool_manager.get_tool(name).parameters["properties"])
+
+
+def test_marked_tools_get_output_options_but_no_encode_options():
+    for name in ("extract_frames", "get_frames", "create_sprite_sheet"):
+        assert {"on_collision", "checksum", "background"} <= _parameters(name)
+        assert "crf" not in _parameters(name)
+    assert {"on_collision", "crf", "profile"} <= _parameters("trim_video")
+
+
+def test_sprite_sheet_follows_collision_policy(call_tool, sample_video):
+    options = dict(video_path=sample_video, output_prefix="sprite", frame_count=4, columns=2, rows=2, tile_width=40)
+    first = call_tool("create_sprite_sheet", **options)
+    assert first["success"], first
+    failed = call_tool("create_sprite_sheet", on_collision="fail", **options)
+    assert not failed["success"]
+    assert failed["error_type"] == "FileExistsError"
+    suffixed = call_tool("create_sprite_sheet", on_collision="suffix", checksum=True, **options)
+    assert suffixed["success"], suffixed
+    assert not set(suffixed["output_paths"]) & set(first["output_paths"])
+    assert set(suffixed["checksums"]) == set(suffixed["output_paths"])
+
+
+def test_extract_frames_claims_its_folder(call_tool, sample_video, output_dir):
+    folder = str(output_dir / "frames")
+    options = dict(video_path=sample_video, fps=1, output_folder_name=folder, image_format="jpeg")
+    assert call_tool("extract_frames", **options)["output_path"] == folder
+    suffixed = call_tool("extract_frames", on_collision="suffix", checksum=True, **options)
+    assert suffixed["output_path"] == folder + "_1"
+    assert len(suffixed["checksums"]) == suffixed["frame_count"] == 4
+    assert not call_tool("extract_frames", on_collision="fail", **options)["success"]
+
+
+def test_get_frames_npy_follows_collision_policy(call_tool, sample_video, output_dir):
+    ref = call_tool("extract_frames", video_path=sample_video, fps=2, return_path=False)["output_object"]
+    assert call_tool("get_frames", frames_ref=ref, npy_name="frames", limit=0)["success"]
+    assert not call_tool("get_frames", frames_ref=ref, npy_name="frames", limit=0, on_collision="fail")["success"]
+    # a thumbnail page writes nothing, so a fail policy has nothing to collide with
+    assert call_tool("get_frames", frames_ref=ref, limit=2, on_collision="fail")["success"]
+
+
+def test_sprite_sheet_runs_in_background(call_tool, sample_video):
+    queued = call_tool("create_sprite_sheet", video_path=sample_video, output_prefix="bg", frame_count=4,
+                       columns=2, rows=2, tile_width=40, background=True)
+    assert queued["job_id"]
+    for _ in range(200):
+        status = call_tool("get_job_status", job_id=queued["job_id"])
+        if status["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+    assert status["status"] == "succeeded", status
+    assert all(os.path.isfile(path) for path in status["result"]["output_paths"])
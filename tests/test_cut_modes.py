@@ -0,0 +1,90 @@
+import pytest
+
+from video_edit_mcp.ffmpeg_utils import get_video_packets, probe_media
+
+
+def _frames(path):
+    return len(get_video_packets(path))
+
+
+def test_copy_trim_starts_on_previous_keyframe(call_tool, gop_video):
+    result = call_tool("trim_video", video_path=gop_video, start_time=1.5, end_time=3.5,
+                       output_name="copy.mp4", return_path=True, mode="copy")
+    assert result["success"], result
+    assert result["cut_points"]["actual_start"] == pytest.approx(1.0)
+    assert result["cut_points"]["actual_end"] == pytest.approx(3.5)
+    packets = get_video_packets(result["output_path"])
+    assert packets[0][1]
+    assert len(packets) == pytest.approx(62, abs=1)
+
+
+def test_snap_to_keyframes_moves_both_cut_points(call_tool, gop_video):
+    result = call_tool("trim_video", video_path=gop_video, start_time=1.4, end_time=3.6,
+                       output_name="snapped.mp4", return_path=True, snap_to_keyframes=True)
+    assert result["success"], result
+    assert result["cut_points"]["actual_start"] == pytest.approx(1.0)
+    assert result["cut_points"]["actual_end"] == pytest.approx(4.0)
+    assert _frames(result["output_path"]) == 75
+
+
+def test_copy_split_moves_split_points_back_to_keyframes(call_tool, gop_video):
+    result = call_tool("split_video_at_times", video_path=gop_video, split_times=[2.5, 5.5],
+                       output_name="part.mp4", return_path=True, mode="copy")
+    assert result["success"], result
+    assert result["cut_points"]["actual_split_times"] == pytest.approx([2.0, 5.0])
+    assert [_frames(path) for path in result["output_paths"]] == [50, 75, 75]
+
+
+def test_smart_trim_is_frame_accurate(call_tool, gop_video, mpegts_support):
+    result = call_tool("trim_video", video_path=gop_video, start_time=1.52, end_time=3.52,
+                       output_name="smart.mp4", return_path=True, mode="smart")
+    assert result["success"], result
+    # only 1.52-2.0 and 3.0-3.52 are re-encoded, the GOP in between is copied
+    assert result["cut_points"]["reencoded_seconds"] == pytest.approx(1.0)
+    assert _frames(result["output_path"]) == 50
+
+
+def test_smart_split_keeps_every_frame(call_tool, gop_video, mpegts_support):
+    result = call_tool("split_video_at_times", video_path=gop_video, split_times=[2.52, 5.52],
+                       output_name="smart_part.mp4", return_path=True, mode="smart")
+    assert result["success"], result
+    assert [_frames(path) for path in result["output_paths"]] == [63, 75, 62]
+
+
+def test_reencode_split_normalises_split_times(call_tool, gop_video):
+    result = call_tool("split_video_at_times", video_path=gop_video, split_times=[5, 0, 2.5, 9, 5],
+                       output_name="norm.mp4", return_path=True)
+    assert result["success"], result
+    durations = [float(probe_media(path)["format"]["duration"]) for path in result["output_paths"]]
+    assert durations == pytest.approx([2.5, 2.5, 3.0], abs=0.1)
+
+
+def test_split_without_usable_times_fails(call_tool, gop_video):
+    result = call_tool("split_video_at_times", video_path=gop_video, split_times=[0, 8, 12],
+                       output_name="none.mp4", return_path=True, mode="smart")
+    assert not result["success"]
+    assert result["message"] == "Invalid split times"
+
+
+def test_merge_joins_matching_files_without_reencoding(call_tool, gop_video):
+    result = call_tool("merge_video", video_paths=[gop_video, gop_video], output_name="joined.mp4", return_path=True)
+    assert result["success"], result
+    assert result["merge_method"] == "concat_copy"
+    assert _frames(result["output_path"]) == 400
+
+
+def test_merge_reencodes_mismatched_files(call_tool, gop_video, sample_video):
+    result = call_tool("merge_video", video_paths=[gop_video, sample_video], output_name="mixed.mp4", return_path=True)
+    assert result["success"], result
+    assert result["merge_method"] == "reencode"
+    assert result["reencode_reason"]
+    assert float(probe_media(result["output_path"])["format"]["duration"]) == pytest.approx(12, abs=0.1)
+
+
+def test_merge_accepts_deprecated_two_video_form(call_tool, gop_video):
+    result = call_tool("merge_video", video_path=gop_video, video_path2=gop_video, output_name="legacy.mp4", return_path=True)
+    assert result["success"], result
+    assert _frames(result["output_path"]) == 400
+    both = call_tool("merge_video", video_paths=[gop_video, gop_video], video_path=gop_video,
+                     output_name="both.mp4", return_path=True)
+    assert not both["success"]
@@ -0,0 +1,77 @@
+import pytest
+
+from video_edit_mcp.edit_graph import EditGraph, compile_ffmpeg_args, optimize_graph, render_graph
+from video_edit_mcp.ffmpeg_utils import get_video_packets, probe_media
+
+
+def _streams(path, kind):
+    return [st for st in probe_media(path)["streams"] if st["codec_type"] == kind]
+
+
+def test_reencoded_trim_keeps_exact_frame_count(gop_video, tmp_path):
+    # 1.5s -> 3.5s cuts mid-GOP at 25fps, so a re-encode must produce exactly 50 frames
+    output = str(tmp_path / "trim.mp4")
+    render_graph(EditGraph.from_file(gop_video).then("trim", start=1.5, end=3.5), output)
+    assert len(get_video_packets(output)) == 50
+
+
+def test_chain_compiles_to_one_filter_chain(gop_video, tmp_path):
+    graph = (EditGraph.from_file(gop_video).then("trim", start=1, end=3).then("scale", width=80, height=60)
+             .then("gray").then("fadein", duration=0.5))
+    args = compile_ffmpeg_args(graph, str(tmp_path / "out.mp4"), str(tmp_path))
+    video_chains = [part for part in args[args.index("-filter_complex") + 1].split(";") if part.startswith("[0:v]")]
+    assert args.count("-i") == 1
+    assert len(video_chains) == 1
+    # the leading trim is applied as input seeking rather than as a filter
+    assert args[:2] == ["-ss", "1.000000"] and args[-3:-1] == ["-t", "2.000000"]
+    assert "scale=80:60,format=gray,fade=t=in" in video_chains[0]
+
+
+def test_render_keeps_audio(gop_video, tmp_path):
+    output = str(tmp_path / "scaled.mp4")
+    render_graph(EditGraph.from_file(gop_video).then("scale", width=80, height=60), output)
+    (video,), (audio,) = _streams(output, "video"), _streams(output, "audio")
+    assert (video["width"], video["height"]) == (80, 60)
+    assert audio["codec_name"] == "aac"
+    assert float(audio["duration"]) == pytest.approx(8, abs=0.1)
+
+
+def test_trimmed_render_trims_audio_too(gop_video, tmp_path):
+    output = str(tmp_path / "trimmed.mp4")
+    render_graph(EditGraph.from_file(gop_video).then("gray").then("trim", start=2, end=5), output)
+    (audio,) = _streams(output, "audio")
+    assert float(audio["duration"]) == pytest.approx(3, abs=0.1)
+
+
+def test_segmented_render_matches_one_pass_frame_count(gop_video, tmp_path, monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_SEGMENT_MIN_SECONDS", "2")
+    output = str(tmp_path / "segmented.mp4")
+    details = render_graph(EditGraph.from_file(gop_video).then("scale", width=80, height=60), output, segments=3)
+    assert details["segments"] == 3
+    assert len(get_video_packets(output)) == 200
+
+
+def test_geometry_run_fuses_into_one_crop_orient_scale_step(sample_video, tmp_path):
+    # 160x120 -> crop 120x100 -> resize 60x50 -> quarter turn -> mirror
+    graph = (EditGraph.from_file(sample_video).then("crop", x1=20, y1=10, x2=140, y2=110)
+             .then("scale", width=60, height=50).then("rotate", angle=90).then("hflip"))
+    optimized, fusions = optimize_graph(graph)
+    assert [op["op"] for op in optimized.ops] == ["transform"]
+    assert fusions == [{"fused": ["crop", "scale", "rotate", "hflip"],
+                        "into": "crop=120:100:20:10,transpose=clock_flip,scale=50:60"}]
+    args = compile_ffmpeg_args(optimized, str(tmp_path / "out.mp4"), str(tmp_path))
+    assert args[args.index("-filter_complex") + 1] == "[0:v]crop=120:100:20:10,transpose=clock_flip,scale=50:60,format=yuv420p[v1]"
+
+    output = str(tmp_path / "fused.mp4")
+    assert render_graph(graph, output)["output_size"] == [50, 60]
+    (video,) = _streams(output, "video")
+    assert (video["width"], video["height"]) == (50, 60)
+
+
+def test_odd_size_is_padded_and_reported(sample_video, tmp_path):
+    output = str(tmp_path / "odd.mp4")
+    details = render_graph(EditGraph.from_file(sample_video).then("scale", width=75, height=100), output)
+    (video,) = _streams(output, "video")
+    assert (video["width"], video["height"]) == (76, 100)
+    assert details["output_size"] == [76, 100]
+    assert "75x100" in details["padding"]
@@ -0,0 +1,28 @@
+import subprocess
+
+import numpy as np
+import pytest
+from imageio_ffmpeg import get_ffmpeg_exe
+
+from video_edit_mcp.frames import FrameSequence
+from video_edit_mcp.reader_pool import ReaderPool
+
+
+@pytest.fixture
+def rotated_video(make_video, tmp_path):
+    """160x120 stream flagged to display rotated by 90 degrees"""
+    source = make_video("upright.mp4", duration=2)
+    path = str(tmp_path / "rotated.mp4")
+    subprocess.run([get_ffmpeg_exe(), "-loglevel", "error", "-y", "-display_rotation", "90", "-i", source,
+                    "-c", "copy", path], check=True)
+    return path
+
+
+def test_seeking_and_decoding_return_the_same_frames(rotated_video):
+    clip = ReaderPool.video_clip(rotated_video)
+    seeked = FrameSequence(clip, times=[0.5, 1.5], seek_mode="seek")
+    decoded = FrameSequence(clip, times=[0.5, 1.5], seek_mode="decode")
+    assert seeked.seeks and not decoded.seeks
+    for (_, _, a), (_, _, b) in zip(seeked.frames(), decoded.frames()):
+        assert a.shape == b.shape == (clip.h, clip.w, 3)
+        assert np.abs(a.astype(int) - b).mean() < 2
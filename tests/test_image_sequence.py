@@ -0,0 +1,36 @@
+import os
+
+import pytest
+from PIL import Image
+
+from video_edit_mcp.ffmpeg_utils import get_video_packets, probe_media, read_frame_at
+from video_edit_mcp.image_sequence import encode_image_sequence, list_images, parse_size
+
+
+@pytest.fixture
+def png_sequence(tmp_path):
+    """12 white frames, landscape 100x50, named frame_1.png ... frame_12.png"""
+    folder = tmp_path / "frames"
+    folder.mkdir()
+    for n in range(1, 13):
+        Image.new("RGB", (100, 50), "white").save(folder / f"frame_{n}.png")
+    (folder / "notes.txt").write_text("not an image")
+    return str(folder)
+
+
+def test_natural_sort_orders_numbered_frames(png_sequence):
+    names = [os.path.basename(path) for path in list_images(png_sequence)]
+    assert names == [f"frame_{n}.png" for n in range(1, 13)]
+    assert os.path.basename(list_images(png_sequence, sort="name")[1]) == "frame_10.png"
+
+
+@pytest.mark.parametrize("resize_mode, corner_is_black", [("fit", True), ("fill", False), ("stretch", False)])
+def test_encoded_sequence_has_every_frame_at_the_target_size(png_sequence, tmp_path, resize_mode, corner_is_black):
+    output = str(tmp_path / f"{resize_mode}.mp4")
+    encode_image_sequence(list_images(png_sequence), 10, output, parse_size("64x64"), resize_mode)
+    (video,) = [st for st in probe_media(output)["streams"] if st["codec_type"] == "video"]
+    assert (video["width"], video["height"]) == (64, 64)
+    assert len(get_video_packets(output)) == 12
+    # fit letterboxes the 2:1 frames into the square, fill and stretch cover it
+    corner = read_frame_at(output, 0, (64, 64))[2, 2]
+    assert (corner.max() < 40) == corner_is_black
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from video_edit_mcp.jobs import Job, JobManager, check_cancelled
+
+
+def _wait(job, timeout=10):
+    deadline = time.monotonic() + timeout
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_submitted_job_reports_its_result():
+    job = JobManager.submit("double", lambda value: {"success": True, "value": value * 2}, {"value": 21})
+    assert JobManager.get(job.id) is job
+    assert _wait(job).status == "succeeded"
+    assert job.describe()["result"] == {"success": True, "value": 42}
+
+
+def test_failed_tool_result_fails_the_job():
+    job = _wait(JobManager.submit("broken", lambda: {"success": False, "error": "no input"}, {}))
+    assert job.status == "failed"
+    assert job.describe()["error"] == "no input"
+
+
+def test_cancel_stops_a_running_job():
+    started = threading.Event()
+
+    def work():
+        started.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    job = JobManager.submit("endless", work, {})
+    assert started.wait(5)
+    JobManager.cancel(job.id)
+    assert _wait(job).status == "cancelled"
+
+
+def test_unknown_job_id_raises():
+    with pytest.raises(KeyError):
+        JobManager.get("no-such-job")
+
+
+def test_prune_drops_the_jobs_that_finished_first(monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_JOBS_KEPT", "2")
+    jobs = [Job("render", {}, None) for _ in range(3)]
+    # finished in reverse order of submission
+    for job, finished_at in zip(jobs, (30.0, 20.0, 10.0)):
+        job.status, job.finished_at = "succeeded", finished_at
+    monkeypatch.setattr(JobManager, "_jobs", {job.id: job for job in jobs})
+    JobManager._prune()
+    assert list(JobManager._jobs) == [jobs[0].id, jobs[1].id]
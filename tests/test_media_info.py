@@ -0,0 +1,19 @@
+from video_edit_mcp.media_info import MetadataCache
+
+
+def test_video_info_skips_keyframes_by_default(call_tool, gop_video):
+    result = call_tool("get_video_info", video_path=gop_video)
+    assert result["success"], result
+    assert "keyframes" not in result["video_info"]
+    with_keyframes = call_tool("get_video_info", video_path=gop_video, include_keyframes=True)
+    assert with_keyframes["video_info"]["keyframes"]["count"] == 8
+
+
+def test_metadata_cache_counters_are_reported(call_tool, gop_video):
+    before = MetadataCache.info()
+    assert call_tool("get_video_info", video_path=gop_video)["metadata_cache"] == "miss"
+    assert call_tool("get_video_info", video_path=gop_video)["metadata_cache"] == "hit"
+    report = call_tool("check_render_cache")["metadata_cache"]
+    assert report["misses"] == before["misses"] + 1
+    assert report["memory_hits"] == before["memory_hits"] + 1
+    assert report["rows"] >= 1
@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+import pytest
+
+from video_edit_mcp.outputs import atomic_output, claim_output_path, output_call, result_checksums
+
+
+@pytest.fixture
+def taken(output_dir):
+    (output_dir / "clip.mp4").write_bytes(b"old")
+    return str(output_dir / "clip.mp4")
+
+
+def test_overwrite_reuses_the_name(taken):
+    with output_call("overwrite"):
+        assert claim_output_path("clip.mp4") == taken
+
+
+def test_suffix_skips_existing_and_claimed_names(taken, output_dir):
+    with output_call("suffix"):
+        first = claim_output_path("clip.mp4")
+        # the first name is reserved until this call ends, even before anything is written
+        second = claim_output_path("clip.mp4")
+    assert (first, second) == (str(output_dir / "clip_1.mp4"), str(output_dir / "clip_2.mp4"))
+    with output_call("suffix"):
+        assert claim_output_path("clip.mp4") == first
+
+
+def test_fail_refuses_existing_names(taken):
+    with output_call("fail"), pytest.raises(FileExistsError):
+        claim_output_path("clip.mp4")
+    with pytest.raises(ValueError):
+        with output_call("rename"):
+            pass
+
+
+def test_atomic_output_leaves_nothing_behind_on_failure(taken, output_dir):
+    with pytest.raises(RuntimeError):
+        with atomic_output(taken) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                f.write(b"half a render")
+            raise RuntimeError("encoder crashed")
+    assert os.listdir(output_dir) == ["clip.mp4"]
+    assert open(taken, "rb").read() == b"old"
+
+
+def test_atomic_output_replaces_on_success(taken, output_dir):
+    with atomic_output(taken) as tmp_path:
+        assert ".partial" in tmp_path and tmp_path.endswith(".mp4")
+        with open(tmp_path, "wb") as f:
+            f.write(b"new")
+    assert os.listdir(output_dir) == ["clip.mp4"]
+    assert open(taken, "rb").read() == b"new"
+
+
+def test_checksums_cover_files_and_folder_contents(taken, output_dir):
+    frames = output_dir / "frames"
+    frames.mkdir()
+    (frames / "frame_0000.png").write_bytes(b"frame")
+    checksums = result_checksums({"output_path": taken, "output_paths": [str(frames), "missing.mp4"]})
+    assert checksums == {taken: hashlib.sha256(b"old").hexdigest(),
+                         str(frames / "frame_0000.png"): hashlib.sha256(b"frame").hexdigest()}
+    assert result_checksums({"output_path": "missing.mp4"}) is None
+
+
+def test_tool_checksum_matches_the_written_file(call_tool, sample_video):
+    result = call_tool("resize_video", video_path=sample_video, size=[80, 60], output_name="small.mp4",
+                       return_path=True, checksum=True)
+    with open(result["output_path"], "rb") as f:
+        assert result["checksums"] == {result["output_path"]: hashlib.sha256(f.read()).hexdigest()}
+
+
+def test_failed_render_leaves_no_partial_file(call_tool, sample_video, output_dir):
+    # a crop larger than the 160x120 frame makes ffmpeg fail after the output was claimed
+    result = call_tool("crop_video", video_path=sample_video, x1=0, y1=0, x2=400, y2=400, output_name="crop.mp4",
+                       return_path=True)
+    assert not result["success"]
+    assert os.listdir(output_dir) == []
@@ -0,0 +1,92 @@
+import gc
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+
+
+def test_clear_while_reading_does_not_deadlock(sample_video):
+    # with one decoder allowed, reads stop decoders under the pool lock while holding their own;
+    # run in a child process so a deadlock fails the test instead of hanging the run
+    script = textwrap.dedent(f"""
+        import threading
+        import time
+        from video_edit_mcp.reader_pool import ReaderPool, _PooledVideoReader
+
+        # widen the window between a read taking its reader's lock and asking the pool for room
+        pick = _PooledVideoReader._pick
+        _PooledVideoReader._pick = lambda self, t: time.sleep(0.005) or pick(self, t)
+
+        def read():
+            for _ in range(20):
+                # loading again puts the file back in the pool after a clear; reading backwards
+                # needs a second decoder, which has to stop the first to stay under the cap
+                clip = ReaderPool.video_clip({sample_video!r})
+                for t in (3.0, 2.4, 1.8, 1.2, 0.6, 0.0):
+                    clip.get_frame(t)
+
+        def clear():
+            for _ in range(400):
+                ReaderPool.clear()
+                time.sleep(0.001)
+
+        threads = [threading.Thread(target=read), threading.Thread(target=clear)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ReaderPool.clear()
+    """)
+    env = {**os.environ, "VIDEO_MCP_MAX_DECODERS": "1", "PYTHONPATH": os.path.abspath(SRC)}
+    try:
+        result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        pytest.fail("reading a pooled clip while ReaderPool.clear() runs deadlocked")
+    assert result.returncode == 0, result.stderr.decode(errors="replace")
+
+
+def test_evicted_sources_still_count_against_the_decoder_cap(make_video, monkeypatch):
+    from video_edit_mcp.reader_pool import ReaderPool
+
+    monkeypatch.setenv("VIDEO_MCP_POOL_MAX_FILES", "1")
+    monkeypatch.setenv("VIDEO_MCP_MAX_DECODERS", "1")
+    first_path = make_video("first.mp4", duration=2)
+    second_path = make_video("second.mp4", duration=2)
+    ReaderPool.clear()
+    try:
+        first = ReaderPool.video_clip(first_path)
+        second = ReaderPool.video_clip(second_path)  # evicts the first file from the pool
+        first.get_frame(0.5)
+        second.get_frame(0.5)
+        assert first.reader.open_decoders() + second.reader.open_decoders() <= 1
+        assert ReaderPool.describe()["evicted_in_use"] == 1
+
+        del first
+        gc.collect()
+        assert ReaderPool.describe()["evicted_in_use"] == 0
+    finally:
+        ReaderPool.clear()
+
+
+def test_cached_frames_are_read_only(sample_video, monkeypatch):
+    import numpy as np
+    from video_edit_mcp.reader_pool import ReaderPool
+
+    monkeypatch.setenv("VIDEO_MCP_FRAME_CACHE_MB", "8")
+    ReaderPool.clear()
+    try:
+        clip = ReaderPool.video_clip(sample_video)
+        original = clip.get_frame(1.0).copy()
+        cached = clip.get_frame(1.0)
+        assert clip.reader.cache_stats()["hits"] == 1
+        with pytest.raises(ValueError):
+            cached[:] = 0
+        assert np.array_equal(clip.get_frame(1.0), original)
+        # effects build new frames from the cached ones as usual
+        assert clip.fl_image(lambda frame: 255 - frame).get_frame(1.0).flags.writeable
+    finally:
+        ReaderPool.clear()
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from video_edit_mcp.render_cache import RenderCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("VIDEO_MCP_CACHE_MAX_MB", "1")
+    return RenderCache
+
+
+def _render(path, size=1000):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def test_cache_is_off_unless_a_budget_is_set(tmp_path, monkeypatch):
+    monkeypatch.delenv("VIDEO_MCP_CACHE_MAX_MB", raising=False)
+    source = _render(tmp_path / "in.mp4")
+    assert not RenderCache.enabled()
+    assert RenderCache.key([source], {"op": "scale"}, str(tmp_path / "out.mp4")) is None
+
+
+def test_repeated_render_is_served_from_the_cache(cache, tmp_path):
+    source = _render(tmp_path / "in.mp4")
+    output = str(tmp_path / "out.mp4")
+    key = cache.key([source], {"op": "scale"}, output)
+    assert cache.fetch(key, output) is None
+    with open(_render(output), "rb") as f:
+        rendered = f.read()
+    cache.put(key, output, {"segments": 1})
+    os.remove(output)
+    assert cache.fetch(key, output) == {"segments": 1}
+    with open(output, "rb") as f:
+        assert f.read() == rendered
+    # a changed input or recipe is a different render
+    assert cache.key([source], {"op": "crop"}, output) != key
+    _render(source, 2000)
+    assert cache.key([source], {"op": "scale"}, output) != key
+
+
+def test_least_recently_used_entries_are_evicted(cache, tmp_path, monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_CACHE_MAX_MB", str(2500 / 1024 / 1024))
+    source = _render(tmp_path / "in.mp4")
+    keys = []
+    for n in range(3):
+        output = _render(tmp_path / f"out{n}.mp4")
+        keys.append(cache.key([source], {"n": n}, output))
+        cache.put(keys[-1], output)
+        # make the use order unambiguous on filesystems with coarse timestamps
+        media_path = cache._entry_paths(keys[-1], output)[0]
+        os.utime(media_path, (n, n))
+    assert cache.info()["entries"] == 2
+    assert cache.fetch(keys[0], str(tmp_path / "again.mp4")) is None
+    assert cache.fetch(keys[2], str(tmp_path / "again.mp4")) == {}
+
+
+def test_purge_removes_old_or_all_entries(cache, tmp_path):
+    source = _render(tmp_path / "in.mp4")
+    for n in range(2):
+        output = _render(tmp_path / f"out{n}.mp4")
+        key = cache.key([source], {"n": n}, output)
+        cache.put(key, output)
+        if n == 0:
+            os.utime(cache._entry_paths(key, output)[0], (0, 0))
+    assert cache.purge(older_than_hours=1)["removed_entries"] == 1
+    assert cache.purge() == {"removed_entries": 1, "freed_bytes": 1000}
+    assert cache.info()["entries"] == 0
+
+
+def test_render_tool_reports_cache_hits(cache, call_tool, sample_video):
+    options = dict(video_path=sample_video, size=[80, 60], output_name="small.mp4", return_path=True)
+    assert call_tool("resize_video", **options)["render_cache"] == "miss"
+    assert call_tool("resize_video", **options)["render_cache"] == "hit"
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+from moviepy.editor import ImageClip
+
+from video_edit_mcp.frames import FrameSequence
+from video_edit_mcp.reader_pool import ReaderPool
+from video_edit_mcp.utils import VideoStore
+
+
+def test_stored_frame_sequence_links_to_its_clip(call_tool, sample_video):
+    clip_ref = VideoStore.store(ReaderPool.video_clip(sample_video).subclip(0, 2))
+    frames_ref = VideoStore.store(FrameSequence(VideoStore.load(clip_ref), fps=2))
+    try:
+        assert VideoStore._meta[frames_ref]["parents"] == [clip_ref]
+        # releasing the clip keeps it while the extraction still reads from it
+        VideoStore.release(clip_ref)
+        assert clip_ref in VideoStore._store
+        assert call_tool("get_frames", frames_ref=frames_ref, limit=2)["success"]
+        VideoStore.release(frames_ref)
+        assert clip_ref not in VideoStore._store
+    finally:
+        VideoStore.clear()
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_STORE_MAX_ENTRIES", "3")
+    monkeypatch.setenv("VIDEO_MCP_STORE_TTL_SECONDS", "0")
+    VideoStore.clear()
+    yield VideoStore
+    VideoStore.clear()
+
+
+def _still(megabytes=1):
+    # a still held as one array of `megabytes` MB
+    return ImageClip(np.zeros((megabytes * 1024, 1024), dtype=np.uint8), duration=1)
+
+
+def test_least_recently_used_entry_is_evicted_first(store):
+    first, second, third = (store.store(_still()) for _ in range(3))
+    store.load(first)
+    fourth = store.store(_still())
+    assert set(store._store) == {first, third, fourth}
+    with pytest.raises(KeyError, match="max entries reached"):
+        store.load(second)
+
+
+def test_pinned_entries_are_never_evicted(store):
+    first = store.store(_still())
+    with store.pinned(first, "not-a-ref"):
+        for _ in range(4):
+            store.store(_still())
+        assert first in store._store
+    assert store._meta[first]["pins"] == 0
+    store.store(_still())
+    assert first not in store._store
+
+
+def test_memory_budget_evicts_until_the_store_fits(store, monkeypatch):
+    monkeypatch.setenv("VIDEO_MCP_STORE_MAX_ENTRIES", "64")
+    refs = [store.store(_still(3)) for _ in range(4)]
+    monkeypatch.setenv("VIDEO_MCP_STORE_MAX_MB", "7")
+    newest = store.store(_still(3))
+    # one pass evicts the three oldest stills: 6 MB left
+    assert list(store._store) == [refs[3], newest]
+    assert store.describe()["estimated_bytes"] <= 7 * 1024 * 1024